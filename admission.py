@@ -0,0 +1,117 @@
+# Contrôle d'admission des requêtes de prédiction : au plus max_in_flight requêtes traitées à la fois,
+# au plus max_queue en attente d'une place, pendant au plus queue_timeout secondes
+#
+# Une requête refusée reçoit aussitôt une réponse courte au lieu d'allonger la file :
+#   429  file d'attente pleine
+#   503  attente trop longue, ou échéance du client impossible à tenir
+# avec un délai Retry-After estimé à partir du temps de service moyen et de la file.
+#
+# Échéance optionnelle (instant time.monotonic()) : une requête qui finirait après son échéance, compte tenu
+# du temps de service moyen, est rejetée à l'arrivée ou pendant son attente plutôt que traitée pour rien.
+import math
+import threading
+import time
+
+# Poids de la dernière mesure dans la moyenne glissante du temps de service
+SERVICE_EWMA_ALPHA = 0.1
+
+
+# Requête refusée : statut HTTP, raison ('queue_full', 'timeout', 'deadline') et délai conseillé en secondes
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight, max_queue=64, queue_timeout=1.0):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight doit être supérieur ou égal à 1.")
+        self.max_in_flight = int(max_in_flight)
+        self.max_queue = max(int(max_queue), 0)
+        self.queue_timeout = max(float(queue_timeout), 0.0)
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        # Temps de service moyen (secondes), mis à jour à chaque libération
+        self.service_seconds = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = {'queue_full': 0, 'timeout': 0, 'deadline': 0}
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    # Délai conseillé avant une nouvelle tentative : temps d'écoulement estimé de la file, au moins une seconde
+    def _retry_after(self):
+        return max(1, math.ceil((self.waiting + self.in_flight) / self.max_in_flight * self.service_seconds))
+
+    def _refuser(self, status, reason, message):
+        self.shed[reason] += 1
+        return Rejected(status, reason, self._retry_after(), message)
+
+    # Attente d'une place ; retourne la durée d'attente en secondes ou lève Rejected
+    def acquire(self, deadline=None):
+        debut = time.monotonic()
+        with self._condition:
+            if deadline is not None and debut + self.service_seconds > deadline:
+                raise self._refuser(503, 'deadline', "Échéance de la requête impossible à tenir.")
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                self.admitted += 1
+                return 0.0
+            if self.waiting >= self.max_queue:
+                raise self._refuser(429, 'queue_full', "Serveur saturé : file d'attente pleine.")
+            limite = debut + self.queue_timeout
+            raison = 'timeout'
+            if deadline is not None and deadline - self.service_seconds < limite:
+                limite, raison = deadline - self.service_seconds, 'deadline'
+            self.waiting += 1
+            self.queued += 1
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    restant = limite - time.monotonic()
+                    if restant <= 0:
+                        raise self._refuser(503, raison, "Serveur saturé : délai d'attente dépassé."
+                                            if raison == 'timeout' else "Échéance de la requête dépassée pendant l'attente.")
+                    self._condition.wait(restant)
+                self.in_flight += 1
+                self.admitted += 1
+            finally:
+                self.waiting -= 1
+            attente = time.monotonic() - debut
+            self.wait_seconds_total += attente
+            self.wait_seconds_max = max(self.wait_seconds_max, attente)
+            return attente
+
+    # Libération de la place après traitement, avec la durée de service observée
+    def release(self, service_seconds=None):
+        with self._condition:
+            self.in_flight -= 1
+            if service_seconds is not None:
+                self.service_seconds += SERVICE_EWMA_ALPHA * (service_seconds - self.service_seconds)
+            self._condition.notify()
+
+    # Dans un processus enfant (fork) : condition neuve et aucune requête en cours
+    def after_fork(self):
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def stats(self):
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'queue_timeout_seconds': self.queue_timeout,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'shed': dict(self.shed),
+            'shed_total': sum(self.shed.values()),
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+            'mean_wait_ms': self.wait_seconds_total / self.queued * 1000 if self.queued else 0.0,
+            'service_ms': self.service_seconds * 1000,
+        }
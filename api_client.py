@@ -0,0 +1,191 @@
+# Client HTTP de l'API de prédiction côté listener : connexions keep-alive réutilisées (pool), délais de connexion
+# et de lecture, nouvelles tentatives bornées à délai exponentiel, et disjoncteur devant une API indisponible
+#
+# Une notation est idempotente : une requête échouée (connexion refusée ou coupée, délai dépassé, 502/503/504,
+# 429) est renvoyée au plus `retries` fois, après une attente tirée au hasard dans [0, backoff * 2^tentative]
+# (plafonnée à backoff_max) ; un Retry-After de l'API (contrôle d'admission) est respecté s'il tient sous
+# backoff_max, sinon la réponse est rendue telle quelle. Les erreurs côté client (400, 404, 415...) ne sont pas
+# renvoyées.
+#
+# Disjoncteur : après `failure_threshold` échecs consécutifs (tentatives épuisées), les appels échouent aussitôt
+# (CircuitOpen) pendant reset_timeout secondes ; un seul appel d'essai passe ensuite et referme le circuit s'il réussit.
+#
+# Réutilisation des connexions : rapport entre requêtes envoyées et connexions ouvertes par le pool. Le serveur doit
+# garder les connexions ouvertes (serve_api.py, --keepalive) ; le serveur de développement Flask les ferme.
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Codes renvoyés : surcharge ou indisponibilité passagère
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+
+# Appel refusé sans contacter l'API : disjoncteur ouvert
+class CircuitOpen(requests.RequestException):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.reset_timeout = float(reset_timeout)
+        self.state = 'closed'
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._ouvert_le = 0.0
+        self._essai_en_cours = False
+        self._verrou = threading.Lock()
+
+    # Autorisation d'un appel ; en demi-ouverture, un seul appel d'essai à la fois
+    def allow(self):
+        with self._verrou:
+            if self.state == 'open' and time.monotonic() - self._ouvert_le >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'closed' or (self.state == 'half_open' and not self._essai_en_cours):
+                self._essai_en_cours = self.state == 'half_open'
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._verrou:
+            self.state = 'closed'
+            self.failures = 0
+            self._essai_en_cours = False
+
+    def record_failure(self):
+        with self._verrou:
+            self.failures += 1
+            self._essai_en_cours = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opened += 1
+                self.state = 'open'
+                self._ouvert_le = time.monotonic()
+
+    def retry_in(self):
+        return max(self.reset_timeout - (time.monotonic() - self._ouvert_le), 0.0) if self.state == 'open' else 0.0
+
+    def stats(self):
+        return {'state': self.state, 'consecutive_failures': self.failures, 'opened': self.opened,
+                'rejected': self.rejected}
+
+
+class ApiClient:
+    def __init__(self, url, connect_timeout=0.5, read_timeout=2.0, retries=2, backoff=0.05, backoff_max=1.0,
+                 pool_size=8, breaker=None):
+        self.url = url
+        self.timeout = (float(connect_timeout), float(read_timeout))
+        self.retries = max(int(retries), 0)
+        self.backoff = float(backoff)
+        self.backoff_max = float(backoff_max)
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.session = requests.Session()
+        # Nouvelles tentatives gérées ici (délai, Retry-After, disjoncteur), pas par urllib3
+        self._adaptateur = HTTPAdapter(pool_connections=1, pool_maxsize=max(int(pool_size), 1), max_retries=0)
+        self.session.mount('http://', self._adaptateur)
+        self.session.mount('https://', self._adaptateur)
+        self.requests = 0
+        self.attempts = 0
+        self.retried = 0
+        self.failures = 0
+        self.errors = {}
+        self._verrou = threading.Lock()
+
+    def _compter(self, **increments):
+        with self._verrou:
+            for nom, valeur in increments.items():
+                setattr(self, nom, getattr(self, nom) + valeur)
+
+    def _erreur(self, nature):
+        with self._verrou:
+            self.errors[nature] = self.errors.get(nature, 0) + 1
+
+    # Attente avant la tentative suivante (tentative = 0, 1, ...) : Retry-After s'il est fourni, sinon tirage
+    def _attente(self, tentative, reponse=None):
+        if reponse is not None and reponse.headers.get('Retry-After'):
+            try:
+                return float(reponse.headers['Retry-After'])
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** tentative))
+
+    # POST JSON avec nouvelles tentatives ; retourne la dernière réponse, ou lève la dernière exception réseau
+    # (CircuitOpen si le disjoncteur est ouvert). Chaque appel admis enregistre exactement un résultat auprès du
+    # disjoncteur, y compris sur une exception imprévue (corps non sérialisable, KeyboardInterrupt pendant une
+    # attente) : un appel d'essai en demi-ouverture ne peut pas rester en suspens et bloquer les suivants.
+    def post(self, json=None, params=None, url=None):
+        if not self.breaker.allow():
+            raise CircuitOpen(f"API indisponible : nouvel essai dans {self.breaker.retry_in():.1f} s.")
+        self._compter(requests=1)
+        try:
+            reponse = self._envoyer(json, params, url or self.url)
+        except BaseException:
+            self._compter(failures=1)
+            self.breaker.record_failure()
+            raise
+        if reponse.status_code in RETRY_STATUSES:
+            # Tentatives épuisées (ou Retry-After trop long) : réponse rendue telle quelle, échec compté
+            self._compter(failures=1)
+            self.breaker.record_failure()
+        else:
+            # Réponse définitive (succès ou erreur côté client) : l'API répond, le circuit se referme
+            self.breaker.record_success()
+        return reponse
+
+    # Envoi avec nouvelles tentatives, sans toucher au disjoncteur ; retourne la dernière réponse ou lève la
+    # dernière exception réseau
+    def _envoyer(self, json, params, url):
+        tentative = 0
+        while True:
+            self._compter(attempts=1)
+            reponse, erreur = None, None
+            try:
+                reponse = self.session.post(url, json=json, params=params, timeout=self.timeout)
+                if reponse.status_code not in RETRY_STATUSES:
+                    return reponse
+                self._erreur(str(reponse.status_code))
+            except requests.ConnectionError as e:
+                erreur = e
+                self._erreur('connect_timeout' if isinstance(e, requests.ConnectTimeout) else 'connection')
+            except requests.Timeout as e:
+                erreur = e
+                self._erreur('read_timeout')
+            # Autres erreurs (URL invalide, corps non sérialisable...) : pas de nouvelle tentative
+            attente = self._attente(tentative, reponse)
+            if tentative >= self.retries or attente > self.backoff_max:
+                if erreur is not None:
+                    raise erreur
+                return reponse
+            tentative += 1
+            self._compter(retried=1)
+            time.sleep(attente)
+
+    # Connexions ouvertes et requêtes envoyées par le pool (compteurs d'urllib3)
+    def _pool(self):
+        connexions = requetes = 0
+        pools = self._adaptateur.poolmanager.pools
+        for pool in [pools[cle] for cle in pools.keys()]:
+            connexions += pool.num_connections
+            requetes += pool.num_requests
+        return connexions, requetes
+
+    def close(self):
+        self.session.close()
+
+    def stats(self):
+        connexions, requetes = self._pool()
+        return {
+            'requests': self.requests,
+            'attempts': self.attempts,
+            'retries': self.retried,
+            'failures': self.failures,
+            'errors': dict(self.errors),
+            'connections_opened': connexions,
+            'connection_reuse_ratio': 1 - connexions / requetes if requetes else 0.0,
+            'breaker': self.breaker.stats(),
+        }
@@ -1,43 +1,867 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 # Importation de Flask pour créer une application web, request pour gérer les requêtes HTTP, et jsonify pour retourner des réponses JSON
+import atexit
+import csv
+import functools
+import io
 import joblib
-import pandas as pd
+import os
+import random
+import threading
+import time
+import warnings
+import numpy as np
+from micro_batch import MicroBatcher
+from admission import AdmissionController, Rejected
+from request_journal import RequestJournal
+from fast_forest import ARTIFACT_DIR, FastForest, load_artifact
+from prediction_cache import MODEL_FILES, RegionCache, QuantizedCache, parse_resolutions
+from model_store import LoadedModel, ModelNotReady, ModelStore, file_version
+from model_registry import ModelRegistry, ShadowScorer, UnknownModel
+from feature_schema import FEATURES as SCHEMA, FEATURE_NAMES as FEATURES, SchemaError, build_row, build_matrix, check_model_features
+import payload_codecs
+from payload_codecs import UnsupportedMediaType
+import metrics
 # Initialisation de l'application Flask avec le nom du module courant
 app = Flask(__name__)
 
-model = joblib.load('modele_final.pkl')
-print("✅ Modèle chargé avec succès.")
-# Lecture de la moyenne enregistrée (y_mean) à partir du fichier 'y_mean.txt'
-with open('y_mean.txt', 'r') as f:
-    y_mean = float(f.read())
-# Affichage de la valeur de y_mean pour confirmer son chargement
-print(f"✅ Moyenne y_mean chargée : {y_mean}")
+# Métriques exposées sur '/metrics' (format texte Prometheus)
+REGISTRY = metrics.Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    'density_api_stage_seconds', "Durée de chaque étape du traitement d'une requête", ('endpoint', 'stage'))
+REQUESTS = REGISTRY.counter('density_api_requests_total', "Requêtes traitées par route et code HTTP", ('endpoint', 'status'))
+IN_FLIGHT = REGISTRY.gauge('density_api_in_flight_requests', "Requêtes en cours de traitement")
+MODEL_LOAD_SECONDS = REGISTRY.gauge('density_api_model_load_seconds', "Durée du dernier chargement du modèle en service")
+MODEL_WARMUP_SECONDS = REGISTRY.gauge('density_api_model_warmup_seconds', "Durée du préchauffage du modèle en service")
+MODEL_RELOADS = REGISTRY.counter('density_api_model_reloads_total', "Rechargements à chaud du modèle par résultat", ('result',))
+MODEL_INFO = REGISTRY.gauge('density_api_model_info', "Version du modèle en service (1) et versions remplacées (0)", ('version',))
+REGISTRY.gauge_function('process_resident_memory_bytes', "Mémoire résidente du processus", metrics.process_rss_bytes)
+STAGES = ('parse', 'input', 'predict', 'serialize')
+_STAGES_PREDICT = [STAGE_SECONDS.labels('/predict', stage) for stage in STAGES]
+_STAGES_BATCH = [STAGE_SECONDS.labels('/predict/batch', stage) for stage in STAGES]
+STREAM_ROWS = REGISTRY.counter('density_api_stream_rows_total', "Lignes reçues sur '/predict/stream' par résultat", ('result',))
+STREAM_ROWS_PER_SECOND = REGISTRY.gauge('density_api_stream_rows_per_second', "Débit du dernier flux '/predict/stream' terminé")
+_STREAM_OK = STREAM_ROWS.labels('ok')
+UNIT_MODEL_LOADS = REGISTRY.counter('density_api_registry_loads_total', "Chargements de modèles d'unités", ('unit',))
+UNIT_MODEL_EVICTIONS = REGISTRY.counter('density_api_registry_evictions_total', "Modèles d'unités retirés de la mémoire (LRU)", ('unit',))
+SHADOW_ROWS = REGISTRY.counter('density_api_shadow_rows_total', "Lignes notées par la version candidate (mode shadow)", ('unit',))
+SHADOW_ABS_DIFF = REGISTRY.histogram(
+    'density_api_shadow_abs_diff', "Écart absolu entre version candidate et version servie", ('unit',),
+    buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0))
+SHADOW_SECONDS = REGISTRY.histogram('density_api_shadow_seconds', "Durée de la notation shadow d'une requête", ('unit',))
+_STREAM_ERREURS = STREAM_ROWS.labels('error')
+SHED_REQUESTS = REGISTRY.counter('density_api_shed_requests_total', "Requêtes refusées par le contrôle d'admission", ('reason',))
+QUEUE_WAIT_SECONDS = REGISTRY.histogram('density_api_queue_wait_seconds', "Attente d'une place avant traitement (requêtes admises)")
+
+# Journalisation échantillonnée des requêtes (API_LOG_SAMPLE entre 0 et 1, désactivée par défaut) :
+# la sortie standard ne fait plus partie du chemin critique ; les erreurs sont toujours affichées
+LOG_SAMPLE_RATE = float(os.environ.get('API_LOG_SAMPLE', '0'))
+
+def echantillonner():
+    return LOG_SAMPLE_RATE >= 1.0 or (LOG_SAMPLE_RATE > 0.0 and random.random() < LOG_SAMPLE_RATE)
+
+# Moteur d'inférence à tableaux plats optionnel (activé par API_FAST_FOREST=1), identique bit à bit au modèle
+FAST_FOREST_ENABLED = os.environ.get('API_FAST_FOREST', '0') == '1'
+# Cache exact par région de la forêt (activé par API_REGION_CACHE=1) ; il s'appuie sur la forêt compilée
+REGION_CACHE_ENABLED = os.environ.get('API_REGION_CACHE', '0') == '1'
+REGION_CACHE_SIZE = int(os.environ.get('API_REGION_CACHE_SIZE', '64'))
+# Bande d'incertitude entre arbres sur demande (?uncertainty=1, quantiles par ?quantiles=0.05,0.95) ; activée par
+# API_UNCERTAINTY=1, qui compile la forêt en tableaux plats au chargement (toujours disponible avec un artefact)
+UNCERTAINTY_ENABLED = os.environ.get('API_UNCERTAINTY', '0') == '1'
+UNCERTAINTY_QUANTILES = os.environ.get('API_UNCERTAINTY_QUANTILES', '0.05,0.95')
+# Artefact projetable en mémoire (API_MODEL_ARTIFACT=modele_final_arrays, créé par `python fast_forest.py export`) :
+# chargement en quelques millisecondes et une seule copie physique des arbres pour tous les processus de la machine
+MODEL_ARTIFACT = os.environ.get('API_MODEL_ARTIFACT', '')
+
+# Cache approximatif sur les valeurs arrondies des capteurs (activé par API_QCACHE=1)
+QCACHE_ENABLED = os.environ.get('API_QCACHE', '0') == '1'
+
+# Taille des blocs prédits d'un seul appel vectorisé sur '/predict/stream' (mémoire constante quelle que soit la taille du flux)
+STREAM_CHUNK_ROWS = int(os.environ.get('API_STREAM_CHUNK_ROWS', '1024'))
+
+# Rechargement à chaud : surveillance des fichiers du modèle (API_MODEL_WATCH=1, période API_MODEL_WATCH_INTERVAL en s)
+# et route '/admin/reload', protégée par l'en-tête X-Admin-Token si API_ADMIN_TOKEN est défini.
+# Avec plusieurs workers (serve_api.py), '/admin/reload' n'atteint qu'un seul worker : utiliser la surveillance,
+# qui recharge chaque worker (chacun garde alors sa propre copie du modèle), ou redémarrer le maître (kill -HUP recrée
+# les workers depuis la copie préchargée du maître, sans relire modele_final.pkl).
+MODEL_WATCH_ENABLED = os.environ.get('API_MODEL_WATCH', '0') == '1'
+MODEL_WATCH_INTERVAL = float(os.environ.get('API_MODEL_WATCH_INTERVAL', '2'))
+ADMIN_TOKEN = os.environ.get('API_ADMIN_TOKEN', '')
+
+# Le modèle reçoit des tableaux NumPy construits selon le schéma : l'ordre des colonnes est vérifié à chaque chargement
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+# Chargement complet d'une version du modèle (artefact ou pickle + y_mean), avec ses caches. Sans répertoire :
+# modèle par défaut (fichiers à la racine ou API_MODEL_ARTIFACT) ; avec un répertoire de version du registre :
+# son artefact modele_final_arrays/ s'il existe, sinon ses fichiers modele_final.pkl et y_mean.txt
+def charger_modele(repertoire='', version=None):
+    debut = time.perf_counter()
+    artefact = os.path.join(repertoire, ARTIFACT_DIR) if repertoire else MODEL_ARTIFACT
+    if artefact and os.path.isdir(artefact):
+        # Les sources enregistrées dans l'artefact sont relatives à la racine : vérifiées pour le modèle par défaut seulement
+        forest = load_artifact(artefact, check_sources=not repertoire)
+        check_model_features(forest)
+        model = None
+        y_mean = forest.y_mean
+        sources = [os.path.join(artefact, nom) for nom in sorted(os.listdir(artefact))]
+        print(f"✅ Artefact {artefact} projeté en mémoire : {forest.n_trees} arbres, y_mean = {y_mean}")
+    else:
+        sources = [os.path.join(repertoire, nom) for nom in MODEL_FILES]
+        model = joblib.load(sources[0])
+        print(f"✅ Modèle {sources[0]} chargé avec succès." if repertoire else "✅ Modèle chargé avec succès.")
+        check_model_features(model)
+        # Lecture de la moyenne enregistrée (y_mean) à partir du fichier 'y_mean.txt'
+        with open(sources[1], 'r') as f:
+            y_mean = float(f.read())
+        # Affichage de la valeur de y_mean pour confirmer son chargement
+        print(f"✅ Moyenne y_mean chargée : {y_mean}")
+        forest = FastForest.from_pipeline(model, y_mean) if FAST_FOREST_ENABLED or REGION_CACHE_ENABLED or UNCERTAINTY_ENABLED else None
+        if forest is not None:
+            print(f"✅ Forêt compilée en tableaux plats : {forest.n_trees} arbres, {len(forest.value)} nœuds")
+    return LoadedModel(
+        version or file_version(sources),
+        model=model,
+        forest=forest,
+        y_mean=y_mean,
+        region_cache=RegionCache(forest, REGION_CACHE_SIZE) if REGION_CACHE_ENABLED else None,
+        quantized_cache=QuantizedCache(
+            parse_resolutions(os.environ.get('API_QCACHE_RESOLUTIONS', '')),
+            max_size=int(os.environ.get('API_QCACHE_SIZE', '4096')),
+            ttl=float(os.environ.get('API_QCACHE_TTL', '60')),
+            # Vidé quand les fichiers de ce modèle changent (ceux de la version de l'unité, pas ceux du modèle par défaut)
+            watch_files=sources,
+        ) if QCACHE_ENABLED else None,
+        load_seconds=time.perf_counter() - debut,
+        sources=sources,
+    )
+
+# Lot de préchauffage : les API_WARMUP_ROWS premières lectures valides de API_WARMUP_FILE, lues une seule fois ;
+# au plus API_WARMUP_MAX_ROUNDS tours, régime établi à API_WARMUP_TOLERANCE près (rapport de latences).
+# Sans régime établi, '/readyz' reste à 503 ('warming') : au premier chargement, les tours se poursuivent en arrière-plan
+# (au plus API_WARMUP_RETRIES séries) ; lors d'un rechargement, le modèle en service, déjà chaud, est conservé.
+# API_WARMUP_ALLOW_UNSTEADY=1 sert quand même le modèle et le déclare prêt.
+WARMUP_FILE = os.environ.get('API_WARMUP_FILE', 'sensors_data.csv')
+WARMUP_ROWS = int(os.environ.get('API_WARMUP_ROWS', '32'))
+WARMUP_MAX_ROUNDS = int(os.environ.get('API_WARMUP_MAX_ROUNDS', '10'))
+WARMUP_TOLERANCE = float(os.environ.get('API_WARMUP_TOLERANCE', '1.5'))
+WARMUP_RETRIES = int(os.environ.get('API_WARMUP_RETRIES', '10'))
+WARMUP_ALLOW_UNSTEADY = os.environ.get('API_WARMUP_ALLOW_UNSTEADY', '0') == '1'
+_lot_prechauffage = None
+
+def lot_prechauffage():
+    global _lot_prechauffage
+    if _lot_prechauffage is None:
+        lignes = []
+        try:
+            with open(WARMUP_FILE, 'r', newline='', encoding='utf-8') as f:
+                for enregistrement in csv.DictReader(f):
+                    if len(lignes) >= WARMUP_ROWS:
+                        break
+                    try:
+                        lignes.append(build_row({nom: float(enregistrement.get(nom)) for nom in FEATURES}))
+                    except (TypeError, ValueError):
+                        continue
+        except OSError as e:
+            print(f"⚠️ Lot de préchauffage indisponible ({WARMUP_FILE}) : {e}")
+        _lot_prechauffage = np.array(lignes).reshape(-1, len(FEATURES))
+    return _lot_prechauffage
+
+# Bornes et milieu des plages du schéma, suivis du lot de lectures réelles
+def lignes_prechauffage():
+    X = np.array([[f.minimum for f in SCHEMA], [(f.minimum + f.maximum) / 2 for f in SCHEMA], [f.maximum for f in SCHEMA]])
+    return np.vstack([X, lot_prechauffage()])
+
+# Préchauffage avant mise en service : bornes et milieu des plages du schéma, par les chemins ligne et matrice ;
+# une prédiction non finie fait refuser la nouvelle version
+def prechauffer(modele):
+    X = lignes_prechauffage()[:3]
+    predictions = np.append(predire_matrice(X, modele), [predire_ligne_directe(row, modele) for row in X])
+    if not np.isfinite(predictions).all():
+        raise ValueError(f"Préchauffage : prédictions non finies {predictions.tolist()}")
+    tours_prechauffage(modele)
+
+# Lot de lectures réelles rejoué par tours (lot complet puis ligne par ligne) jusqu'au régime établi : le premier
+# appel d'un tour n'est plus plus lent que la médiane du tour, et cette médiane ne baisse plus d'un tour à l'autre.
+# Le bilan est enregistré dans modele.warmup (cumulé sur les séries successives) ; retourne True au régime établi
+def tours_prechauffage(modele):
+    X = lignes_prechauffage()
+    premier = modele.warmup.get('first_call_ms', 0.0) / 1000 or None
+    tours_precedents = modele.warmup.get('rounds', 0)
+    precedente = None
+    stable = False
+    for tour in range(1, max(WARMUP_MAX_ROUNDS, 1) + 1):
+        predire_matrice(X, modele)
+        durees = []
+        for row in X:
+            debut = time.perf_counter()
+            predire_ligne_directe(row, modele)
+            durees.append(time.perf_counter() - debut)
+        premier = durees[0] if premier is None else premier
+        mediane = float(np.median(durees))
+        if precedente is not None and durees[0] <= WARMUP_TOLERANCE * mediane and mediane * WARMUP_TOLERANCE >= precedente:
+            stable = True
+            break
+        precedente = mediane
+    modele.warmup = {'rows': len(X), 'rounds': tours_precedents + tour, 'steady': stable,
+                     'first_call_ms': premier * 1000, 'steady_call_ms': mediane * 1000}
+    print(f"🔥 Préchauffage : {len(X)} lignes, {tours_precedents + tour} tour(s), 1er appel {premier * 1000:.2f} ms → "
+          f"{mediane * 1000:.2f} ms" + ("" if stable else " (régime non stabilisé)"))
+    return stable
+
+# Modèle prêt à recevoir du trafic : préchauffé jusqu'au régime établi (ou API_WARMUP_ALLOW_UNSTEADY=1)
+def modele_pret(modele):
+    return modele is not None and (modele.warmup.get('steady', True) or WARMUP_ALLOW_UNSTEADY)
+
+# Préchauffage du modèle par défaut : sans régime établi, un rechargement est refusé (le modèle en service reste),
+# et un premier chargement est servi mais non déclaré prêt, le préchauffage se poursuivant en arrière-plan
+def prechauffer_service(modele):
+    prechauffer(modele)
+    if modele_pret(modele):
+        return
+    if store.current is not None:
+        raise ValueError(f"régime non établi après {modele.warmup['rounds']} tours de préchauffage")
+    poursuivre_prechauffage(modele)
+
+def poursuivre_prechauffage(modele):
+    # Arrêt au régime établi ou si un autre modèle a pris la place (lancé avant le remplacement : current peut être None)
+    def poursuivre():
+        for _ in range(max(WARMUP_RETRIES, 0)):
+            if store.current not in (None, modele) or tours_prechauffage(modele):
+                return
+        print(f"⚠️ Modèle {modele.version} non déclaré prêt : régime non établi après {modele.warmup['rounds']} tours "
+              f"(API_WARMUP_ALLOW_UNSTEADY=1 pour le servir quand même)")
+    threading.Thread(target=poursuivre, name='model-warmup', daemon=True).start()
+
+# Publication des métriques après chaque remplacement
+def apres_remplacement(ancien, nouveau, raison):
+    MODEL_LOAD_SECONDS.set(nouveau.load_seconds)
+    MODEL_WARMUP_SECONDS.set(nouveau.warmup_seconds)
+    if ancien is not None:
+        MODEL_INFO.labels(ancien.version).set(0)
+        MODEL_RELOADS.labels('ok').inc()
+        print(f"🔄 Modèle remplacé ({raison}) : {ancien.version} → {nouveau.version} "
+              f"(chargement {nouveau.load_seconds:.2f} s, préchauffage {nouveau.warmup_seconds * 1000:.1f} ms)")
+    else:
+        print(f"✅ Modèle {nouveau.version} en service ({raison}) : chargement {nouveau.load_seconds:.2f} s, "
+              f"préchauffage {nouveau.warmup_seconds * 1000:.1f} ms")
+    MODEL_INFO.labels(nouveau.version).set(1)
+
+def apres_echec(erreur, raison):
+    MODEL_RELOADS.labels('error').inc()
+    print(f"❌ Chargement du modèle refusé ({raison}) : {erreur}")
+
+# Regroupement optionnel des requêtes '/predict' concurrentes (activé par API_MICROBATCH=1)
+MICROBATCH_ENABLED = os.environ.get('API_MICROBATCH', '0') == '1'
+MICROBATCH_MAX_ROWS = int(os.environ.get('API_MICROBATCH_MAX_ROWS', '64'))
+MICROBATCH_WAIT_MS = float(os.environ.get('API_MICROBATCH_WAIT_MS', '2'))
+
+# Prédiction vectorisée d'une liste de couples (modèle, ligne) déjà validés, utilisée par le micro-batcher ;
+# les lignes sont regroupées par modèle (unités différentes, lot à cheval sur un remplacement), un appel par modèle
+def predire_lignes(elements):
+    modele = elements[0][0]
+    if all(m is modele for m, _ in elements):
+        return predire_matrice(np.vstack([row for _, row in elements]), modele).tolist()
+    groupes = {}
+    for i, (m, _) in enumerate(elements):
+        groupes.setdefault(id(m), (m, []))[1].append(i)
+    resultats = [None] * len(elements)
+    for m, indices in groupes.values():
+        for i, p in zip(indices, predire_matrice(np.vstack([elements[i][1] for i in indices]), m).tolist()):
+            resultats[i] = p
+    return resultats
+
+# Prédiction d'une ligne par la forêt compilée ou le modèle scikit-learn
+def predire_ligne_directe(row, modele):
+    if modele.forest is not None:
+        # Forêt compilée : parcours direct des tableaux
+        return modele.forest.predict_one(row)
+    # Utilisation du modèle pour prédire et ajout de la moyenne y_mean à la prédiction
+    return float(modele.model.predict(row[None, :])[0] + modele.y_mean)
+
+# Prédiction d'une ligne validée par le premier mécanisme activé (cache par région, regroupement, forêt, modèle)
+def predire_ligne(row, modele):
+    if modele.region_cache is not None:
+        # Cache par région : réponse exacte sans parcours des arbres si la région est connue
+        return modele.region_cache.predict_one(row)
+    if batcher is not None:
+        # Mode regroupé : la ligne est prédite avec les autres requêtes concurrentes
+        return batcher.predict((modele, row))
+    return predire_ligne_directe(row, modele)
+
+# Prédiction d'une matrice (n, 4) ordonnée selon le schéma, par le cache par région, la forêt compilée ou le modèle scikit-learn
+def predire_matrice(X, modele):
+    if modele.region_cache is not None:
+        return modele.region_cache.predict_many(X)
+    if modele.forest is not None:
+        return modele.forest.predict_many(X)
+    return modele.model.predict(X) + modele.y_mean
+
+# Chargement initial : synchrone par défaut (le processus ne sert qu'une fois le premier modèle chargé et préchauffé) ;
+# avec API_BACKGROUND_LOAD=1, dans un thread : '/healthz' répond aussitôt, '/readyz' et les prédictions renvoient
+# 503 jusqu'à la fin du préchauffage (ignoré par serve_api.py, qui charge le modèle avant de créer les workers)
+BACKGROUND_LOAD = os.environ.get('API_BACKGROUND_LOAD', '0') == '1'
+store = ModelStore(charger_modele, prechauffer_service,
+                   watch_files=[os.path.join(MODEL_ARTIFACT, 'meta.json')] if MODEL_ARTIFACT else MODEL_FILES,
+                   on_swap=apres_remplacement, on_failure=apres_echec)
+REGISTRY.gauge_function('density_api_model_ready', "Modèle chargé et préchauffé (1) ou non (0)", lambda: modele_pret(store.current))
+REGISTRY.gauge_function('density_api_model_swap_seconds',
+                        "Durée du dernier remplacement du modèle, du début du chargement à sa première requête notée",
+                        lambda: store.last_swap_seconds)
+if BACKGROUND_LOAD:
+    store.reload_async('démarrage')
+else:
+    store.load()
+if MODEL_WATCH_ENABLED:
+    store.watch(MODEL_WATCH_INTERVAL)
+
+# Registre des modèles par unité de concentration (voir model_registry.py) : routage par '/units/<unité>/predict',
+# paramètre ?unit= ou champ 'unit' du corps ; sans unité, le modèle par défaut ci-dessus répond.
+# Au plus API_REGISTRY_MAX_MODELS modèles en mémoire (et API_REGISTRY_MAX_MB Mo si non nul), éviction LRU.
+MODELS_DIR = os.environ.get('API_MODELS_DIR', 'models')
+
+def charger_modele_unite(repertoire, version):
+    modele = charger_modele(repertoire, version)
+    debut = time.perf_counter()
+    prechauffer(modele)
+    modele.warmup_seconds = time.perf_counter() - debut
+    return modele
+
+def apres_chargement_unite(unite, version, modele):
+    UNIT_MODEL_LOADS.labels(unite).inc()
+    print(f"✅ Modèle {unite}/{version} chargé ({modele.load_seconds:.2f} s), {len(unit_models)} en mémoire")
+
+def apres_eviction_unite(unite, version, modele):
+    UNIT_MODEL_EVICTIONS.labels(unite).inc()
+    print(f"♻️ Modèle {unite}/{version} retiré de la mémoire")
+
+unit_models = ModelRegistry(
+    charger_modele_unite,
+    root=MODELS_DIR,
+    max_models=int(os.environ.get('API_REGISTRY_MAX_MODELS', '4')),
+    max_bytes=int(float(os.environ.get('API_REGISTRY_MAX_MB', '0')) * 1024 * 1024),
+    on_load=apres_chargement_unite,
+    on_evict=apres_eviction_unite,
+)
+REGISTRY.gauge_function('density_api_registry_models_resident', "Modèles d'unités en mémoire", lambda: len(unit_models))
+REGISTRY.gauge_function('density_api_registry_resident_bytes', "Mémoire estimée des modèles d'unités", lambda: unit_models.resident_bytes)
+
+# Mode shadow : si models/<unité>/shadow désigne une version candidate, les mêmes entrées sont notées par
+# cette version dans un thread séparé, après la réponse ; seul l'écart avec la version servie est enregistré
+def noter_ombre(unite, version, X, predictions):
+    debut = time.perf_counter()
+    candidate = unit_models.get(unite, version)
+    ecarts = np.abs(np.asarray(predire_matrice(X, candidate)) - predictions)
+    serie = SHADOW_ABS_DIFF.labels(unite)
+    for ecart in ecarts.tolist():
+        serie.observe(ecart)
+    SHADOW_ROWS.labels(unite).inc(len(ecarts))
+    SHADOW_SECONDS.labels(unite).observe(time.perf_counter() - debut)
+
+shadow = ShadowScorer(noter_ombre, max_queue=int(os.environ.get('API_SHADOW_QUEUE', '1024')))
+
+# Modèle d'une requête : par défaut, ou version active (ou ?version=) de l'unité demandée ; retourne aussi la
+# version candidate à noter en mode shadow
+def modele_pour(unite):
+    if not unite:
+        return store.require(), None
+    version = request.args.get('version')
+    active, candidate = unit_models.resolve(unite)
+    return unit_models.get(unite, version or active), (candidate if version in (None, active) else None)
+
+# Unité demandée : segment d'URL, paramètre ?unit= ou champ 'unit' d'un corps objet
+def unite_demandee(unite, data):
+    if unite:
+        return unite
+    if request.args.get('unit'):
+        return request.args['unit']
+    if isinstance(data, dict) and isinstance(data.get('unit'), str):
+        return data['unit']
+    return None
+
+# Contrôle d'admission optionnel de '/predict' et '/predict/batch' (activé par API_MAX_IN_FLIGHT=<N>, voir admission.py) :
+# au plus N requêtes traitées à la fois par processus, API_MAX_QUEUE en attente pendant au plus API_QUEUE_TIMEOUT_MS ;
+# au-delà, réponse immédiate 429 (file pleine) ou 503 (attente ou échéance dépassée) avec Retry-After
+MAX_IN_FLIGHT = int(os.environ.get('API_MAX_IN_FLIGHT', '0'))
+admission = AdmissionController(
+    MAX_IN_FLIGHT,
+    max_queue=int(os.environ.get('API_MAX_QUEUE', '64')),
+    queue_timeout=float(os.environ.get('API_QUEUE_TIMEOUT_MS', '1000')) / 1000.0,
+) if MAX_IN_FLIGHT > 0 else None
+if admission is not None:
+    REGISTRY.gauge_function('density_api_queued_requests', "Requêtes en attente d'admission", lambda: admission.waiting)
+
+# Journal des requêtes de notation optionnel (activé par API_JOURNAL=1, voir request_journal.py) : horodatage, route,
+# code HTTP, latence, version du modèle, entrées et sortie de chaque requête '/predict' et '/predict/batch', écrits par
+# lots dans API_JOURNAL_PATH par un thread dédié (format jsonl ou binary) ; file pleine : attente d'au plus
+# API_JOURNAL_BLOCK_MS puis abandon compté. Rotation à API_JOURNAL_ROTATE_MB Mo ou toutes les API_JOURNAL_ROTATE_SECONDS.
+journal = RequestJournal(
+    os.environ.get('API_JOURNAL_PATH', 'requests.jsonl'),
+    format_=os.environ.get('API_JOURNAL_FORMAT', 'jsonl'),
+    max_queue=int(os.environ.get('API_JOURNAL_QUEUE', '10000')),
+    batch_size=int(os.environ.get('API_JOURNAL_BATCH', '512')),
+    flush_interval=float(os.environ.get('API_JOURNAL_FLUSH_MS', '500')) / 1000.0,
+    rotate_bytes=int(float(os.environ.get('API_JOURNAL_ROTATE_MB', '64')) * 1024 * 1024),
+    rotate_seconds=float(os.environ.get('API_JOURNAL_ROTATE_SECONDS', '0')),
+    block_timeout=float(os.environ.get('API_JOURNAL_BLOCK_MS', '50')) / 1000.0,
+    fsync=os.environ.get('API_JOURNAL_FSYNC', '0') == '1',
+) if os.environ.get('API_JOURNAL', '0') == '1' else None
+if journal is not None:
+    # Les enregistrements en attente sont écrits à l'arrêt du processus
+    atexit.register(journal.close)
+    REGISTRY.gauge_function('density_api_journal_queue_depth', "Enregistrements du journal en attente d'écriture", lambda: journal.stats()['queue_depth'])
+    REGISTRY.gauge_function('density_api_journal_dropped', "Enregistrements du journal abandonnés (file pleine)", lambda: journal.dropped)
+
+# Champs du journal de la requête courante (entrées, sortie, version, unité), enregistrés par compter_reponse
+def noter_journal(**champs):
+    if journal is not None:
+        g.setdefault('journal', {}).update(champs)
+
+# Création du micro-batcher uniquement si le regroupement est activé
+batcher = MicroBatcher(predire_lignes, MICROBATCH_MAX_ROWS, MICROBATCH_WAIT_MS) if MICROBATCH_ENABLED else None
+
+# Les threads ne survivent pas à un fork (workers de serve_api.py) : le micro-batcher, la surveillance
+# des fichiers et la notation shadow sont recréés dans chaque enfant
+def _apres_fork():
+    global batcher
+    if batcher is not None:
+        batcher = MicroBatcher(predire_lignes, MICROBATCH_MAX_ROWS, MICROBATCH_WAIT_MS)
+    store.after_fork()
+    # Préchauffage poursuivi dans chaque worker si le régime n'était pas établi dans le maître
+    if store.current is not None and not modele_pret(store.current):
+        poursuivre_prechauffage(store.current)
+    if admission is not None:
+        admission.after_fork()
+    if journal is not None:
+        journal.after_fork()
+    unit_models.after_fork()
+    shadow.after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_apres_fork)
+
+# Lecture du corps dans le format annoncé par Content-Type (JSON par défaut, binaire brut ou MessagePack)
+def lire_corps():
+    format_ = payload_codecs.negotiate(request.mimetype)
+    return format_, payload_codecs.decode(format_, request.get_data(cache=False))
+
+# Quantiles demandés par ?uncertainty=1 (liste ?quantiles=, sinon API_UNCERTAINTY_QUANTILES), ou None sans demande
+def quantiles_demandes(modele):
+    if request.args.get('uncertainty', '0') in ('0', '', 'false'):
+        return None
+    if modele.forest is None:
+        raise SchemaError("Bande d'incertitude indisponible : démarrer l'API avec API_UNCERTAINTY=1.")
+    try:
+        texte = request.args.get('quantiles', UNCERTAINTY_QUANTILES)
+        quantiles = np.array([float(q) for q in texte.split(',') if q.strip()])
+    except ValueError:
+        raise SchemaError(f"Quantiles invalides : {texte}") from None
+    if ((quantiles < 0) | (quantiles > 1)).any():
+        raise SchemaError(f"Les quantiles doivent être entre 0 et 1, reçu : {texte}")
+    return quantiles
+
+# Réponse dans le format de la requête : float64 bruts pour le binaire, sinon objet {'Densité_Sortie': ..., 'model_version': ...} ;
+# la version du modèle utilisé est aussi renvoyée dans l'en-tête X-Model-Version. Avec une bande d'incertitude
+# (quantiles, écart-type, bornes), l'objet reçoit 'Densité_Sortie_std' et 'Densité_Sortie_quantiles', et le binaire
+# une matrice (n, 2 + nombre de quantiles) dont les colonnes sont décrites par l'en-tête X-Uncertainty-Columns
+def repondre(format_, predictions, modele, unite=None, bande=None):
+    store.mark_served(modele)
+    entetes = {'X-Model-Version': modele.version}
+    if unite:
+        entetes['X-Model-Unit'] = unite
+    if format_ == payload_codecs.OCTET_STREAM:
+        if bande is not None:
+            quantiles, ecart, bornes = bande
+            predictions = np.column_stack([predictions, np.atleast_1d(ecart), *np.reshape(bornes, (len(quantiles), -1))])
+            entetes['X-Uncertainty-Columns'] = ','.join(['mean', 'std'] + [f'q{q:g}' for q in quantiles])
+        corps, type_ = payload_codecs.encode_raw(predictions)
+    else:
+        objet = {'Densité_Sortie': predictions, 'model_version': modele.version}
+        if bande is not None:
+            quantiles, ecart, bornes = bande
+            objet['Densité_Sortie_std'] = np.asarray(ecart).tolist()
+            objet['Densité_Sortie_quantiles'] = {f'{q:g}': b.tolist() for q, b in zip(quantiles, bornes)}
+        if unite:
+            objet['unit'] = unite
+        corps, type_ = payload_codecs.encode(format_, objet)
+    return Response(corps, content_type=type_, headers=entetes)
+
+# Réponse d'erreur : MessagePack pour un client MessagePack, JSON sinon (un corps binaire ne peut pas porter de message)
+def repondre_erreur(format_, message, statut, entetes=None):
+    if format_ == payload_codecs.MSGPACK:
+        corps, type_ = payload_codecs.encode(format_, {'error': message})
+        return Response(corps, status=statut, content_type=type_, headers=entetes)
+    return jsonify({'error': message}), statut, entetes or {}
+
+# Modèle pas encore en service : 503, à réessayer dans une seconde
+def repondre_indisponible(format_, erreur):
+    print(f"⏳ {erreur}")
+    return repondre_erreur(format_, str(erreur), 503, {'Retry-After': '1'})
+
+# Échéance fixée par le client (instant time.monotonic()) : en-tête X-Request-Timeout-Ms (budget relatif à la réception)
+# ou X-Request-Deadline (instant absolu, secondes depuis l'époque Unix) ; la plus proche des deux, None sans en-tête
+def echeance_demandee():
+    maintenant = time.monotonic()
+    echeances = []
+    try:
+        if request.headers.get('X-Request-Timeout-Ms'):
+            echeances.append(maintenant + float(request.headers['X-Request-Timeout-Ms']) / 1000.0)
+        if request.headers.get('X-Request-Deadline'):
+            echeances.append(maintenant + float(request.headers['X-Request-Deadline']) - time.time())
+    except ValueError:
+        raise SchemaError("En-têtes X-Request-Timeout-Ms et X-Request-Deadline : nombre attendu.") from None
+    return min(echeances) if echeances else None
+
+# Passage par le contrôle d'admission (s'il est activé) avant le traitement de la requête ; l'attente est renvoyée
+# dans l'en-tête X-Queue-Wait-Ms
+def admettre(route):
+    @functools.wraps(route)
+    def route_admise(*args, **kwargs):
+        if admission is None:
+            return route(*args, **kwargs)
+        try:
+            format_ = payload_codecs.negotiate(request.mimetype)
+        except UnsupportedMediaType:
+            format_ = None
+        try:
+            attente = admission.acquire(echeance_demandee())
+        except SchemaError as e:
+            return repondre_erreur(format_, str(e), 400)
+        except Rejected as e:
+            SHED_REQUESTS.labels(e.reason).inc()
+            return repondre_erreur(format_, str(e), e.status, {'Retry-After': str(e.retry_after)})
+        QUEUE_WAIT_SECONDS.observe(attente)
+        debut = time.perf_counter()
+        try:
+            response = app.make_response(route(*args, **kwargs))
+        finally:
+            admission.release(time.perf_counter() - debut)
+        response.headers['X-Queue-Wait-Ms'] = f'{attente * 1000:.3f}'
+        return response
+    return route_admise
+
+# Comptage des requêtes en cours et des réponses par route et code HTTP
+@app.before_request
+def debut_requete():
+    IN_FLIGHT.inc()
+    g.debut = time.perf_counter()
+
+@app.after_request
+def compter_reponse(response):
+    REQUESTS.labels(request.url_rule.rule if request.url_rule else 'inconnue', str(response.status_code)).inc()
+    if journal is not None and request.endpoint in ('predict', 'predict_batch'):
+        journal.record(time.time(), request.url_rule.rule, response.status_code, time.perf_counter() - g.debut,
+                       batch=request.endpoint == 'predict_batch', **g.get('journal', {}))
+    return response
+
+@app.teardown_request
+def fin_requete(exc):
+    IN_FLIGHT.dec()
 
 # Définition d'une route '/predict' qui accepte les requêtes POST pour effectuer des prédictions
 @app.route('/predict', methods=['POST'])
-def predict():
+@app.route('/units/<unite>/predict', methods=['POST'])
+@admettre
+def predict(unite=None):
+    format_ = None
+    try:
+        t0 = time.perf_counter()
+        # Récupération des données envoyées dans la requête POST, dans le format négocié
+        format_, data = lire_corps()
+        t1 = time.perf_counter()
+        noter_journal(inputs=data)
+        # Modèle de l'unité demandée (ou par défaut), fixé pour toute la requête : un remplacement concurrent ne l'affecte pas
+        unite = unite_demandee(unite, data)
+        modele, candidate = modele_pour(unite)
+        # Affichage échantillonné des données reçues pour le suivi
+        journaliser = echantillonner()
+        if journaliser:
+            print(f"📥 Données reçues : {data}")
+        if format_ == payload_codecs.OCTET_STREAM:
+            # Corps binaire : exactement une ligne de 4 float64, déjà validée par le décodage
+            if len(data) != 1:
+                raise SchemaError(f"'/predict' attend une seule ligne, reçu : {len(data)} (utiliser '/predict/batch').")
+            row = data[0]
+        else:
+            # Validation et conversion directe en ligne float64 selon le schéma déclaré
+            row = build_row(data)
+        quantiles = quantiles_demandes(modele)
+        t2 = time.perf_counter()
+        bande = None
+        if quantiles is not None:
+            # Bande d'incertitude : moyenne, écart-type et quantiles en un seul parcours des arbres
+            prediction, ecart, bornes = modele.forest.predict_uncertainty(row, quantiles)
+            bande = (quantiles, ecart, bornes)
+        elif modele.quantized_cache is not None:
+            # Cache approximatif : les lectures arrondies déjà vues ne sont pas recalculées
+            prediction = modele.quantized_cache.get_or_compute(row, lambda r: predire_ligne(r, modele))
+        else:
+            prediction = predire_ligne(row, modele)
+        t3 = time.perf_counter()
+        if journaliser:
+            print(f"📤 Prédiction retournée : {prediction}")
+        # Retour de la prédiction dans le format de la requête (clé 'Densité_Sortie' en JSON / MessagePack)
+        response = repondre(format_, [prediction] if format_ == payload_codecs.OCTET_STREAM else prediction, modele, unite, bande)
+        noter_journal(model_version=modele.version, unit=unite, output=prediction)
+        t4 = time.perf_counter()
+        for serie, duree in zip(_STAGES_PREDICT, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            serie.observe(duree)
+        if candidate is not None:
+            shadow.submit(unite, candidate, row[None, :].copy(), np.array([prediction]))
+        return response
+    except ModelNotReady as e:
+        return repondre_indisponible(format_, e)
+    except UnknownModel as e:
+        print(f"❌ Modèle introuvable : {e}")
+        return repondre_erreur(format_, str(e), 404)
+    except UnsupportedMediaType as e:
+        print(f"❌ Format refusé : {e}")
+        return repondre_erreur(format_, str(e), 415)
+    except SchemaError as e:
+        # Entrée manquante, non numérique ou hors plage : erreur côté client
+        print(f"❌ Données invalides : {e}")
+        return repondre_erreur(format_, str(e), 400)
+    except Exception as e:
+        # Gestion des erreurs : affichage de l'erreur pour le suivi
+        print(f"❌ Erreur : {e}")
+        # Retour d'une réponse avec le message d'erreur et un code d'erreur HTTP 500
+        return repondre_erreur(format_, str(e), 500)
+
+# Définition d'une route '/predict/batch' qui prédit un lot complet de mesures en un seul appel au modèle
+@app.route('/predict/batch', methods=['POST'])
+@app.route('/units/<unite>/predict/batch', methods=['POST'])
+@admettre
+def predict_batch(unite=None):
+    format_ = None
+    try:
+        t0 = time.perf_counter()
+        # Récupération du lot envoyé dans la requête POST, dans le format négocié
+        format_, data = lire_corps()
+        t1 = time.perf_counter()
+        noter_journal(inputs=data)
+        unite = unite_demandee(unite, data)
+        modele, candidate = modele_pour(unite)
+        # Validation et conversion du lot en matrice float64 selon le schéma déclaré
+        # (le corps binaire est déjà une matrice validée, vue sans copie sur les octets reçus)
+        input_data = data if format_ == payload_codecs.OCTET_STREAM else build_matrix(data)
+        quantiles = quantiles_demandes(modele)
+        t2 = time.perf_counter()
+    except ModelNotReady as e:
+        return repondre_indisponible(format_, e)
+    except UnknownModel as e:
+        print(f"❌ Modèle introuvable : {e}")
+        return repondre_erreur(format_, str(e), 404)
+    except UnsupportedMediaType as e:
+        print(f"❌ Format refusé : {e}")
+        return repondre_erreur(format_, str(e), 415)
+    except SchemaError as e:
+        # Lot mal formé : erreur côté client
+        print(f"❌ Lot invalide : {e}")
+        return repondre_erreur(format_, str(e), 400)
     try:
-        # Récupération des données JSON envoyées dans la requête POST
-        data = request.get_json()
-        # Affichage des données reçues pour le suivi
-        print(f"📥 Données reçues : {data}")
-        # Conversion des données JSON en DataFrame pandas pour compatibilité avec le modèle
-        input_data = pd.DataFrame([data])
-        # Utilisation du modèle pour prédire et ajout de la moyenne y_mean à la prédiction
-        prediction = model.predict(input_data) + y_mean
-        # Affichage de la prédiction pour le suivi
-        print(f"📤 Prédiction retournée : {prediction[0]}")
-        # Retour de la prédiction sous forme de JSON avec la clé 'Densité_Sortie'
-        return jsonify({'Densité_Sortie': prediction[0]})
+        # Un seul appel vectorisé au modèle pour toutes les lignes, dans l'ordre d'entrée
+        bande = None
+        if quantiles is not None:
+            # Bande d'incertitude : un seul parcours vectorisé des arbres pour tout le lot
+            predictions, ecart, bornes = modele.forest.predict_uncertainty(input_data.reshape(-1, len(FEATURES)), quantiles)
+            bande = (quantiles, ecart, bornes)
+        else:
+            predictions = predire_matrice(input_data, modele) if len(input_data) else np.empty(0)
+        t3 = time.perf_counter()
+        # Affichage échantillonné de la taille du lot pour le suivi
+        if echantillonner():
+            print(f"📤 Lot de {len(input_data)} prédictions retourné")
+        # Retour des prédictions dans le format de la requête (liste sous la clé 'Densité_Sortie' en JSON / MessagePack)
+        response = repondre(format_, predictions if format_ == payload_codecs.OCTET_STREAM else [float(p) for p in predictions], modele, unite, bande)
+        noter_journal(model_version=modele.version, unit=unite, output=predictions)
+        t4 = time.perf_counter()
+        for serie, duree in zip(_STAGES_BATCH, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            serie.observe(duree)
+        if candidate is not None and len(input_data):
+            shadow.submit(unite, candidate, input_data, np.asarray(predictions))
+        return response
     except Exception as e:
         # Gestion des erreurs : affichage de l'erreur pour le suivi
         print(f"❌ Erreur : {e}")
-        # Retour d'une réponse JSON avec le message d'erreur et un code d'erreur HTTP 500
-        return jsonify({'error': str(e)}), 500
+        # Retour d'une réponse avec le message d'erreur et un code d'erreur HTTP 500
+        return repondre_erreur(format_, str(e), 500)
+
+# Notation en flux d'un corps NDJSON (un enregistrement par ligne) : les lignes sont lues au fil de l'eau,
+# prédites par blocs de STREAM_CHUNK_ROWS dans une matrice réutilisée, et chaque bloc est renvoyé dès qu'il est prêt
+def noter_flux(lignes, taille_bloc, resume, modele):
+    X = np.empty((taille_bloc, len(FEATURES)), dtype=np.float64)
+    sorties = [None] * taille_bloc
+    n_lignes = n_erreurs = 0
+    debut = time.perf_counter()
+
+    # Prédiction du bloc courant : une ligne de sortie par ligne d'entrée, dans l'ordre, erreurs comprises
+    def vider(n, n_valides):
+        predictions = predire_matrice(X[:n_valides], modele) if n_valides else ()
+        valeurs = iter(predictions)
+        morceaux = []
+        for sortie in sorties[:n]:
+            objet = {'Densité_Sortie': float(next(valeurs))} if sortie is None else sortie
+            morceaux.append(payload_codecs.encode(payload_codecs.JSON, objet)[0])
+        morceaux.append(b'')
+        return b'\n'.join(morceaux)
+
+    store.mark_served(modele)
+    n = n_valides = 0
+    for numero, brute in enumerate(lignes):
+        if not brute.strip():
+            continue
+        try:
+            build_row(payload_codecs.decode(payload_codecs.JSON, brute), out=X[n_valides])
+            sorties[n] = None
+            n_valides += 1
+        except SchemaError as e:
+            sorties[n] = {'error': str(e), 'ligne': numero}
+            n_erreurs += 1
+        n += 1
+        n_lignes += 1
+        if n == taille_bloc:
+            yield vider(n, n_valides)
+            n = n_valides = 0
+    if n:
+        yield vider(n, n_valides)
+
+    duree = time.perf_counter() - debut
+    debit = n_lignes / duree if duree > 0 else 0.0
+    _STREAM_OK.inc(n_lignes - n_erreurs)
+    _STREAM_ERREURS.inc(n_erreurs)
+    STREAM_ROWS_PER_SECOND.set(debit)
+    print(f"📤 Flux terminé : {n_lignes} lignes ({n_erreurs} invalides) en {duree:.2f} s, {debit:.0f} lignes/s")
+    if resume:
+        yield payload_codecs.encode(payload_codecs.JSON, {'summary': {
+            'rows': n_lignes, 'errors': n_erreurs, 'seconds': duree, 'rows_per_second': debit,
+            'model_version': modele.version}})[0] + b'\n'
+
+# Définition d'une route '/predict/stream' : NDJSON en entrée, NDJSON en réponse découpée (chunked)
+# Paramètres : ?chunk=<lignes par bloc> (défaut API_STREAM_CHUNK_ROWS), ?summary=1 pour une dernière ligne de bilan
+# Les réponses partent avant la fin de l'envoi : le client doit lire pendant qu'il envoie, par exemple
+#   curl -N -H 'Transfer-Encoding: chunked' --data-binary @export.ndjson 'http://127.0.0.1:5000/predict/stream?summary=1'
+@app.route('/predict/stream', methods=['POST'])
+@app.route('/units/<unite>/predict/stream', methods=['POST'])
+def predict_stream(unite=None):
+    try:
+        taille_bloc = int(request.args.get('chunk', STREAM_CHUNK_ROWS))
+        if taille_bloc < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': "Le paramètre 'chunk' doit être un entier positif."}), 400
+    resume = request.args.get('summary', '0') not in ('0', '', 'false')
+    # Le corps est lu pendant l'envoi de la réponse : il n'est jamais chargé en entier ; le tampon de 64 Kio
+    # évite la lecture octet par octet de request.stream lors du découpage en lignes
+    lignes = io.BufferedReader(request.stream, 65536)
+    # Tout le flux est noté par le modèle en service à son ouverture (unité par l'URL ou ?unit=)
+    unite = unite_demandee(unite, None)
+    try:
+        modele, _ = modele_pour(unite)
+    except ModelNotReady as e:
+        return repondre_indisponible(None, e)
+    except UnknownModel as e:
+        return jsonify({'error': str(e)}), 404
+    entetes = {'X-Model-Version': modele.version, **({'X-Model-Unit': unite} if unite else {})}
+    return Response(stream_with_context(noter_flux(lignes, taille_bloc, resume, modele)),
+                    content_type='application/x-ndjson', headers=entetes)
+
+# Sonde de vivacité : le processus répond, y compris pendant le chargement du modèle
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok', 'loading': store.loading})
+
+# Sonde de disponibilité : 200 une fois un modèle chargé et préchauffé jusqu'au régime établi, 503 avant
+# ('loading', 'warming', ou 'failed' si le premier chargement a échoué), avec les durées de chargement et de préchauffage
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    modele = store.current
+    if modele is None:
+        etat = 'failed' if store.last_error is not None and not store.loading else 'loading'
+        return jsonify({'status': etat, 'error': store.last_error}), 503, {'Retry-After': '1'}
+    if not modele_pret(modele):
+        return jsonify({'status': 'warming', **modele.describe()}), 503, {'Retry-After': '1'}
+    return jsonify({'status': 'ready', **modele.describe()})
+
+# Métriques au format texte Prometheus
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+# Statistiques du micro-batcher (profondeur de file, taille des lots)
+@app.route('/stats/microbatch', methods=['GET'])
+def microbatch_stats():
+    if batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **batcher.stats()})
+
+# Statistiques du contrôle d'admission (requêtes en cours, en attente, refusées par raison, attente cumulée)
+@app.route('/stats/admission', methods=['GET'])
+def admission_stats():
+    if admission is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **admission.stats()})
+
+# Statistiques du journal des requêtes (file, enregistrements écrits et abandonnés, rotations)
+@app.route('/stats/journal', methods=['GET'])
+def journal_stats():
+    if journal is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **journal.stats()})
+
+# Statistiques des caches (succès, échecs, évictions, latence économisée)
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    modele = store.current
+    if modele is None:
+        return jsonify({'model_version': None})
+    return jsonify({
+        'model_version': modele.version,
+        'region': {'enabled': True, **modele.region_cache.stats()} if modele.region_cache is not None else {'enabled': False},
+        'quantized': {'enabled': True, **modele.quantized_cache.stats()} if modele.quantized_cache is not None else {'enabled': False},
+    })
+
+# Modèles d'unités en mémoire, versions actives et candidates, et file de notation shadow
+@app.route('/stats/registry', methods=['GET'])
+def registry_stats():
+    unites = {}
+    for unite in unit_models.units():
+        try:
+            active, candidate = unit_models.resolve(unite)
+            unites[unite] = {'active': active, 'shadow': candidate, 'versions': unit_models.versions(unite)}
+        except UnknownModel as e:
+            unites[unite] = {'error': str(e)}
+    return jsonify({'units': unites, **unit_models.stats(), 'shadow': shadow.stats()})
+
+# Vérification du jeton d'administration (API_ADMIN_TOKEN) ; sans jeton configuré, les routes restent ouvertes
+def admin_autorise():
+    return not ADMIN_TOKEN or request.headers.get('X-Admin-Token', '') == ADMIN_TOKEN
+
+# Modèle en service et état des rechargements
+@app.route('/admin/model', methods=['GET'])
+def admin_model():
+    if not admin_autorise():
+        return jsonify({'error': "Jeton d'administration invalide."}), 403
+    return jsonify(store.stats())
+
+# Rechargement à chaud de modele_final.pkl et y_mean.txt (ou de l'artefact) : chargement et préchauffage en
+# arrière-plan puis remplacement atomique ; ?wait=1 attend la fin et renvoie la nouvelle version
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    if not admin_autorise():
+        return jsonify({'error': "Jeton d'administration invalide."}), 403
+    precedente = store.current.version if store.current is not None else None
+    if request.args.get('wait', '0') not in ('0', '', 'false'):
+        try:
+            nouveau = store.load('admin')
+        except Exception as e:
+            return jsonify({'error': str(e), 'version': precedente}), 500
+        return jsonify({'status': 'swapped', 'previous_version': precedente, **nouveau.describe()})
+    if not store.reload_async('admin'):
+        return jsonify({'status': 'already_loading', 'version': precedente}), 409
+    return jsonify({'status': 'loading', 'version': precedente}), 202
 
 # Vérification que le script est exécuté directement (et non importé comme module)
 if __name__ == '__main__':
     # Affichage d'un message pour indiquer le démarrage du serveur Flask
     print("🚀 Lancement du serveur Flask sur http://127.0.0.1:5000 ...")
     # Démarrage du serveur Flask sur l'hôte '0.0.0.0' (accessible depuis l'extérieur) et le port 5000 avec le mode debug activé
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -11,6 +11,9 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 from reportlab.lib import colors
 import io
 import os
+import warnings
+from fast_forest import FastForest, load_artifact
+from feature_schema import SchemaError, build_row, check_model_features
 
 # Vérification des dépendances requises
 required = ['streamlit', 'pandas', 'joblib', 'numpy', 'plotly', 'matplotlib', 'reportlab']
@@ -152,9 +155,26 @@ st.markdown(theme_css, unsafe_allow_html=True)
 # Titre
 st.markdown("<h1 class='title'>🔮 Density Prediction Dashboard</h1>", unsafe_allow_html=True)
 
+# Artefact projetable en mémoire optionnel (APP_MODEL_ARTIFACT=modele_final_arrays, créé par `python fast_forest.py export`)
+MODEL_ARTIFACT = os.environ.get("APP_MODEL_ARTIFACT", "")
+
+@st.cache_resource
+def open_artifact(directory, meta_mtime):
+    return load_artifact(directory)
+
 # Chargement du modèle et de y_mean
+forest = None
 try:
-    model = joblib.load("modele_final.pkl")
+    if MODEL_ARTIFACT:
+        # Tableaux projetés en mémoire : pas de dé-sérialisation du pickle à chaque exécution du script
+        model = None
+        forest = open_artifact(MODEL_ARTIFACT, os.path.getmtime(os.path.join(MODEL_ARTIFACT, "meta.json")))
+        check_model_features(forest)
+    else:
+        model = joblib.load("modele_final.pkl")
+        # Le modèle reçoit une ligne NumPy construite selon le schéma : l'ordre des colonnes est vérifié ici
+        check_model_features(model)
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
 except Exception as e:
     st.markdown(f"<p class='error'>❌ Erreur lors du chargement du modèle : {e}</p>", unsafe_allow_html=True)
     st.markdown("<script>showToast('Erreur lors du chargement du modèle', 'error');</script>", unsafe_allow_html=True)
@@ -168,6 +188,17 @@ except Exception as e:
     st.markdown("<script>showToast('Erreur lors du chargement de y_mean', 'error');</script>", unsafe_allow_html=True)
     st.stop()
 
+# Moteur d'inférence à tableaux plats optionnel (APP_FAST_FOREST=1), compilé une seule fois par processus
+@st.cache_resource
+def compile_forest(_model, model_mtime, y_mean):
+    return FastForest.from_pipeline(_model, y_mean)
+
+if model is not None and os.environ.get("APP_FAST_FOREST", "0") == "1":
+    try:
+        forest = compile_forest(model, os.path.getmtime("modele_final.pkl"), y_mean)
+    except Exception as e:
+        st.markdown(f"<p class='error'>❌ Erreur lors de la compilation de la forêt : {e}</p>", unsafe_allow_html=True)
+
 # Mise en page avec barre latérale et contenu principal
 col1, col2 = st.columns([1, 3])
 
@@ -215,21 +246,25 @@ with col1:
     if st.button("🔮 Prédire", key="predict_button"):
         with st.spinner("Calcul de la prédiction..."):
             try:
-                # Création du DataFrame pour la prédiction
-                X = pd.DataFrame([{
-                    'Débit_Acide_m3h': debit_acide,
-                    'Débit_Vapeur_kgh': debit_vapeur,
-                    'Température_Évaporateur_C': temperature,
-                    'Vide_Bouilleur_torr': vide,
-                }])
-
-                # Vérification des entrées invalides
-                if X.isna().any().any() or np.isinf(X).any().any():
-                    st.markdown("<p class='error'>❌ Données d'entrée invalides (NaN ou infini).</p>", unsafe_allow_html=True)
+                # Construction de la ligne d'entrée validée selon le schéma (NaN, infini et plages)
+                try:
+                    X = build_row({
+                        'Débit_Acide_m3h': debit_acide,
+                        'Débit_Vapeur_kgh': debit_vapeur,
+                        'Température_Évaporateur_C': temperature,
+                        'Vide_Bouilleur_torr': vide,
+                    })
+                except SchemaError as e:
+                    X = None
+                    st.markdown(f"<p class='error'>❌ Données d'entrée invalides : {e}</p>", unsafe_allow_html=True)
                     st.markdown("<script>showToast('Données d\\'entrée invalides', 'error');</script>", unsafe_allow_html=True)
-                else:
-                    # Prédiction
-                    y_pred = model.predict(X)[0] + y_mean
+
+                if X is not None:
+                    # Prédiction (forêt compilée si activée, sinon modèle scikit-learn)
+                    if forest is not None:
+                        y_pred = forest.predict_one(X)
+                    else:
+                        y_pred = model.predict(X[None, :])[0] + y_mean
                     st.markdown(f"<p class='prediction'>✅ Densité prédite : {y_pred:.6f} kg/m³</p>", unsafe_allow_html=True)
                     st.markdown("<script>showToast('Prédiction réussie !', 'success');</script>", unsafe_allow_html=True)
                     
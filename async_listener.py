@@ -0,0 +1,235 @@
+# Listener MQTT asynchrone : la réception des lectures est découplée de leur notation
+#
+#   boucle réseau paho → file bornée asyncio → LISTENER_WORKERS tâches de notation → publication non bloquante
+#
+# La boucle réseau de paho (son propre thread) ne fait que numéroter le message et le déposer dans la file : une
+# réponse lente de l'API ne retarde plus les keepalives, les acquittements ni les messages suivants. File pleine :
+# le nouveau message est abandonné et compté (LISTENER_QUEUE_POLICY=drop_oldest abandonne plutôt le plus ancien).
+# Chaque tâche note une lecture à la fois, dans un pool de threads, avec un délai maximal LISTENER_TIMEOUT_MS ; au-delà,
+# une erreur est publiée (le thread termine l'appel en arrière-plan et son résultat est ignoré).
+#
+# Chaque lecture est notée (par le modèle de son unité avec LISTENER_UNIT_MODELS=1) et publiée dès que la prédiction
+# est prête, sur le topic de l'unité (LISTENER_TOPIC à '+', voir mqtt_listener.py), éventuellement dans le désordre :
+# chaque publication porte 'seq', le numéro de réception du message, pour rétablir l'ordre (une erreur publiée porte
+# aussi son 'seq' ; un numéro absent est celui d'un message abandonné, file pleine).
+# La notation est celle de mqtt_listener.py : modèle embarqué (LISTENER_EMBEDDED=1), frontal binaire
+# (LISTENER_SOCKET) ou API HTTP, et cache approximatif LISTENER_QCACHE.
+#
+# Suivi : profondeur de la file et durée de chaque étape (file, notation, publication, total) affichées toutes les
+# LISTENER_STATS_INTERVAL secondes, et exposées au format Prometheus sur http://0.0.0.0:<LISTENER_METRICS_PORT>/metrics
+# (et en JSON sur /stats) si le port est défini.
+#
+#   python async_listener.py
+#   LISTENER_WORKERS=16 LISTENER_TIMEOUT_MS=500 LISTENER_METRICS_PORT=9101 python async_listener.py
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paho.mqtt.client as mqtt
+
+import metrics
+import mqtt_listener as listener
+
+QUEUE_SIZE = int(os.environ.get('LISTENER_QUEUE_SIZE', '1000'))
+QUEUE_POLICY = os.environ.get('LISTENER_QUEUE_POLICY', 'drop_new')
+WORKERS = int(os.environ.get('LISTENER_WORKERS', '8'))
+TIMEOUT_MS = float(os.environ.get('LISTENER_TIMEOUT_MS', '2000'))
+STATS_INTERVAL = float(os.environ.get('LISTENER_STATS_INTERVAL', '10'))
+METRICS_PORT = int(os.environ.get('LISTENER_METRICS_PORT', '0'))
+QUEUE_POLICIES = ('drop_new', 'drop_oldest')
+STAGES = ('queue', 'score', 'publish', 'total')
+
+REGISTRY = metrics.Registry()
+STAGE_SECONDS = REGISTRY.histogram('density_listener_stage_seconds', "Durée de chaque étape du traitement d'un message", ('stage',))
+MESSAGES = REGISTRY.counter('density_listener_messages_total', "Messages par résultat", ('result',))
+REGISTRY.gauge_function('process_resident_memory_bytes', "Mémoire résidente du processus", metrics.process_rss_bytes)
+
+
+class AsyncBridge:
+    # publish(topic, texte) : publication non bloquante ; score(data, unité) : notation bloquante par le modèle de
+    # l'unité, retourne (résultat, succès)
+    # extra_stats() : compteurs ajoutés à stats() (client HTTP de l'API)
+    def __init__(self, publish, score, workers=8, max_queue=1000, timeout=2.0, policy='drop_new', extra_stats=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Politique de file inconnue : {policy} (attendu : {', '.join(QUEUE_POLICIES)})")
+        self.publish = publish
+        self.score = score
+        self.workers = max(int(workers), 1)
+        self.max_queue = max(int(max_queue), 1)
+        self.timeout = float(timeout)
+        self.policy = policy
+        self.extra_stats = extra_stats
+        self.seq = 0
+        self.received = 0
+        self.dropped = 0
+        self.published = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.max_depth = 0
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.stage_max = dict.fromkeys(STAGES, 0.0)
+        self._series = {etape: STAGE_SECONDS.labels(etape) for etape in STAGES}
+        self._boucle = None
+        self._file = None
+        self._arret = None
+
+    # Depuis le thread réseau de paho : numérotation dans l'ordre de réception puis dépôt dans la boucle asyncio ;
+    # la lecture sera notée par le modèle de unit ('' : modèle par défaut) et sa prédiction publiée sur topic
+    def submit(self, payload, topic, unit=''):
+        self.seq += 1
+        self._boucle.call_soon_threadsafe(self._deposer, self.seq, payload, topic, unit, time.perf_counter())
+
+    def _deposer(self, seq, payload, topic, unit, recu):
+        self.received += 1
+        if self._file.full():
+            if self.policy == 'drop_new':
+                self._abandonner()
+                return
+            self._file.get_nowait()
+            self._file.task_done()
+            self._abandonner()
+        self._file.put_nowait((seq, payload, topic, unit, recu))
+        self.max_depth = max(self.max_depth, self._file.qsize())
+
+    def _abandonner(self):
+        self.dropped += 1
+        MESSAGES.labels('dropped').inc()
+
+    async def _travailler(self, executeur):
+        while True:
+            seq, payload, topic, unit, recu = await self._file.get()
+            debut = time.perf_counter()
+            try:
+                data = json.loads(payload)
+                result, ok = await asyncio.wait_for(
+                    self._boucle.run_in_executor(executeur, self.score, data, unit), self.timeout)
+                resultat = 'ok' if ok else 'error'
+            except asyncio.TimeoutError:
+                result, ok, resultat = {'error': f"Délai de notation dépassé ({self.timeout * 1000:.0f} ms)."}, False, 'timeout'
+                self.timeouts += 1
+            except Exception as e:
+                result, ok, resultat = {'error': str(e)}, False, 'error'
+            note = time.perf_counter()
+            try:
+                self.publish(topic, json.dumps({**result, 'seq': seq}))
+                self.published += 1
+            except Exception as e:
+                resultat = 'error'
+                print(f"❌ Publication du message {seq} impossible : {e}")
+            fin = time.perf_counter()
+            self.errors += not ok
+            MESSAGES.labels(resultat).inc()
+            for etape, duree in zip(STAGES, (debut - recu, note - debut, fin - note, fin - recu)):
+                self._series[etape].observe(duree)
+                self.stage_seconds[etape] += duree
+                self.stage_max[etape] = max(self.stage_max[etape], duree)
+            self._file.task_done()
+
+    async def _afficher(self, intervalle):
+        while True:
+            await asyncio.sleep(intervalle)
+            print(f"📊 {self.stats()}")
+
+    # Boucle principale : tâches de notation jusqu'à stop(), puis traitement des messages restants (au plus drain s)
+    async def run(self, stats_interval=0.0, drain=5.0):
+        self._boucle = asyncio.get_running_loop()
+        self._file = asyncio.Queue(self.max_queue)
+        self._arret = asyncio.Event()
+        # Sans attente des threads à l'arrêt : un appel bloqué au-delà de son délai ne retient pas le processus
+        executeur = ThreadPoolExecutor(self.workers, thread_name_prefix='listener-score')
+        taches = [asyncio.create_task(self._travailler(executeur)) for _ in range(self.workers)]
+        if stats_interval > 0:
+            taches.append(asyncio.create_task(self._afficher(stats_interval)))
+        try:
+            await self._arret.wait()
+            try:
+                await asyncio.wait_for(self._file.join(), drain)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Arrêt avec {self._file.qsize()} message(s) non traité(s)")
+        finally:
+            for tache in taches:
+                tache.cancel()
+            await asyncio.gather(*taches, return_exceptions=True)
+            executeur.shutdown(wait=False, cancel_futures=True)
+
+    # Arrêt depuis n'importe quel thread
+    def stop(self):
+        if self._boucle is not None:
+            self._boucle.call_soon_threadsafe(self._arret.set)
+
+    def ready(self):
+        return self._file is not None
+
+    def stats(self):
+        traites = self.published or 1
+        return {
+            'received': self.received,
+            'queue_depth': self._file.qsize() if self._file is not None else 0,
+            'max_queue': self.max_queue,
+            'max_depth': self.max_depth,
+            'dropped': self.dropped,
+            'published': self.published,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'stage_mean_ms': {etape: self.stage_seconds[etape] / traites * 1000 for etape in STAGES},
+            'stage_max_ms': {etape: self.stage_max[etape] * 1000 for etape in STAGES},
+            **(self.extra_stats() if self.extra_stats is not None else {}),
+        }
+
+
+def main():
+    if listener.EMBEDDED_ENABLED:
+        listener.charger_modele_embarque()
+    client = mqtt.Client()
+    bridge = AsyncBridge(
+        client.publish,
+        lambda data, unite: listener.predire_lecture(data, unite)[:2],
+        workers=WORKERS, max_queue=QUEUE_SIZE, timeout=TIMEOUT_MS / 1000, policy=QUEUE_POLICY,
+        extra_stats=lambda: {'http': listener.api_client.stats()},
+    )
+    REGISTRY.gauge_function('density_listener_queue_depth', "Messages en attente de notation", lambda: bridge.stats()['queue_depth'])
+    REGISTRY.gauge_function('density_listener_dropped_total', "Messages abandonnés (file pleine)", lambda: bridge.dropped)
+
+    def on_connect(client, userdata, flags, rc):
+        print(f"Connecté au broker MQTT avec code {rc}")
+        client.subscribe(listener.SENSOR_TOPIC)
+
+    def on_message(client, userdata, msg):
+        unite = listener.unite_du_topic(msg.topic)
+        bridge.submit(msg.payload, listener.topic_prediction(unite), unite)
+
+    # Arrêt : plus de nouveaux messages, puis traitement de ceux déjà en file
+    def arreter():
+        client.disconnect()
+        bridge.stop()
+
+    async def demarrer():
+        boucle = asyncio.get_running_loop()
+        for signal_ in (signal.SIGINT, signal.SIGTERM):
+            boucle.add_signal_handler(signal_, arreter)
+        tache = asyncio.create_task(bridge.run(STATS_INTERVAL))
+        while not bridge.ready():
+            await asyncio.sleep(0)
+        client.on_connect = on_connect
+        client.on_message = on_message
+        client.connect(listener.MQTT_BROKER, listener.MQTT_PORT, 60)
+        client.loop_start()
+        print(f"🚀 Listener asynchrone : {bridge.workers} tâches de notation, file de {bridge.max_queue} messages, "
+              f"délai {bridge.timeout * 1000:.0f} ms")
+        await tache
+
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT, REGISTRY, bridge.stats, name='listener-metrics')
+    try:
+        asyncio.run(demarrer())
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        print(f"🛑 Arrêt : {bridge.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Banc d'essai en boucle fermée de l'API de prédiction : N clients concurrents envoient
+# des lectures de sensors_data.csv pendant une durée fixe.
+#
+#   python bench_api.py --url http://127.0.0.1:5000/predict --concurrency 8 --duration 10
+#   python bench_api.py --socket /tmp/density_api.sock --pipeline 16     # frontal binaire (serve_socket.py)
+#   python bench_api.py --compare --socket /tmp/density_api.sock         # Flask puis frontal binaire
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+from feature_schema import SchemaError, build_row
+from inference_socket import InferenceClient, RemoteError
+
+
+# Appel HTTP sur une session keep-alive : None si la requête a réussi, sinon le code d'erreur
+def appel_http(url):
+    session = requests.Session()
+
+    def appel(lignes):
+        erreurs = []
+        for ligne in lignes:
+            reponse = session.post(url, json=ligne, timeout=10)
+            if reponse.status_code != 200:
+                erreurs.append(reponse.status_code)
+        return erreurs
+    return appel
+
+
+# Appel du frontal binaire sur une connexion persistante ; les lignes d'un même appel partent en pipeline
+# (une trame par lecture, conversion du dict par build_row comme dans mqtt_listener.py)
+def appel_socket(adresse, pipeline):
+    client = InferenceClient(adresse, timeout=10, window=pipeline)
+
+    def appel(lignes):
+        try:
+            client.predict_pipelined([build_row(ligne) for ligne in lignes])
+            return []
+        except SchemaError:
+            return [400]
+        except RemoteError:
+            return [500]
+    return appel
+
+
+# Boucle d'un client : appels successifs de `pipeline` lectures ; chaque lecture compte pour une requête
+def client(fabrique, lignes, fin, latences, erreurs, decalage, pipeline=1):
+    appel = fabrique()
+    i = decalage
+    while time.perf_counter() < fin:
+        lot = [lignes[(i + k) % len(lignes)] for k in range(pipeline)]
+        debut = time.perf_counter()
+        try:
+            erreurs.extend(appel(lot))
+        except (requests.RequestException, OSError) as e:
+            erreurs.append(type(e).__name__)
+        latences.extend([time.perf_counter() - debut] * pipeline)
+        i += pipeline
+
+
+def run(url, concurrency, duration, csv_path='sensors_data.csv', warmup=1.0, socket_address=None, pipeline=1):
+    lignes = pd.read_csv(csv_path).to_dict('records')
+    if socket_address:
+        fabrique = lambda: appel_socket(socket_address, pipeline)
+    else:
+        fabrique, pipeline = lambda: appel_http(url), 1
+    # Échauffement pour exclure les premiers appels (allocations paresseuses, connexions)
+    fin = time.perf_counter() + warmup
+    client(fabrique, lignes, fin, [], [], 0, pipeline)
+    latences, erreurs = [], []
+    debut = time.perf_counter()
+    fin = debut + duration
+    threads = [threading.Thread(target=client, args=(fabrique, lignes, fin, latences, erreurs, k * 7, pipeline))
+               for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ecoule = time.perf_counter() - debut
+    ms = np.array(latences) * 1000.0
+    return {
+        'url': socket_address or url,
+        'concurrency': concurrency,
+        'pipeline': pipeline,
+        'requests': len(latences),
+        'errors': len(erreurs),
+        'rps': len(latences) / ecoule,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else None,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else None,
+        'max_ms': float(ms.max()) if len(ms) else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Banc d'essai de l'API de prédiction")
+    parser.add_argument('--url', default='http://127.0.0.1:5000/predict')
+    parser.add_argument('--socket', help="Adresse du frontal binaire (chemin de socket Unix ou hôte:port) au lieu de --url")
+    parser.add_argument('--pipeline', type=int, default=1, help="Lectures envoyées sans attendre les réponses (--socket)")
+    parser.add_argument('--compare', action='store_true', help="Mesure --url puis --socket avec les mêmes paramètres")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--csv', default='sensors_data.csv')
+    parser.add_argument('--json', action='store_true', help="Sortie JSON au lieu du tableau")
+    args = parser.parse_args()
+    if args.compare and not args.socket:
+        parser.error("--compare nécessite --socket")
+    cibles = [None, args.socket] if args.compare else [args.socket]
+    resultats = [run(args.url, args.concurrency, args.duration, args.csv, socket_address=cible, pipeline=args.pipeline)
+                 for cible in cibles]
+    if args.json:
+        for resultat in resultats:
+            print(json.dumps(resultat))
+    else:
+        print(f"{'cible':<32} {'requêtes':>10} {'erreurs':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for resultat in resultats:
+            print(f"{resultat['url'][-32:]:<32} {resultat['requests']:>10} {resultat['errors']:>8} {resultat['rps']:>9.1f} "
+                  f"{resultat['p50_ms']:>8.2f} {resultat['p99_ms']:>8.2f} {resultat['max_ms']:>8.2f}")
@@ -0,0 +1,138 @@
+# Banc d'essai du trajet lecture capteur → prédiction publiée de mqtt_listener.py, sans broker : les messages
+# (lectures de sensors_data.csv encodées en JSON comme par simulate_sensors.py) sont passés un à un à on_message,
+# et un client d'enregistrement horodate chaque publication. Le trajet par le broker, identique dans tous les
+# modes, n'est pas compté ; la sortie console du listener est redirigée vers /dev/null.
+#
+#   python bench_listener.py --messages 2000                             # API (déjà lancée) puis modèle embarqué
+#   python bench_listener.py --modes http,socket,embedded --socket /tmp/density_api.sock
+#   python bench_listener.py --modes embedded --json
+#   python bench_listener.py --modes http,embedded --batch-sizes 1,16,64,256 --messages 20000   # arriéré regroupé
+import argparse
+import contextlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import mqtt_listener as listener
+from inference_socket import InferenceClient
+from micro_batch import MicroBatcher
+
+MODES = ('http', 'socket', 'embedded')
+
+
+# Client MQTT réduit à la publication, horodatée
+class RecordingClient:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload):
+        self.published.append((time.perf_counter(), topic, payload))
+
+
+class Message:
+    def __init__(self, payload, topic=listener.SENSOR_TOPIC):
+        self.payload = payload
+        self.topic = topic
+
+
+# Configuration du listener pour un mode ; retourne la durée de préparation (chargement du modèle embarqué)
+def configurer(mode, socket_address=None):
+    listener.forest = None
+    listener.socket_client = None
+    debut = time.perf_counter()
+    if mode == 'embedded':
+        listener.charger_modele_embarque()
+        if listener.forest is None:
+            raise SystemExit("Modèle embarqué indisponible.")
+    elif mode == 'socket':
+        listener.socket_client = InferenceClient(socket_address)
+    return time.perf_counter() - debut
+
+
+# Messages passés un à un à on_message ; latence = de la réception à la publication. Avec batch_rows, les messages
+# sont regroupés (LISTENER_MICROBATCH) et envoyés d'un coup, comme un arriéré rejoué : on_message rend la main
+# aussitôt et le débit est mesuré jusqu'à la dernière publication.
+def run(mode, payloads, messages, warmup=50, socket_address=None, batch_rows=0, batch_wait_ms=20.0):
+    preparation = configurer(mode, socket_address)
+    listener.batcher = MicroBatcher(listener.predire_lot, batch_rows, batch_wait_ms) if batch_rows else None
+    client = RecordingClient()
+    recus, erreurs = [], 0
+    with open(os.devnull, 'w') as muet, contextlib.redirect_stdout(muet):
+        for i in range(warmup):
+            listener.on_message(client, None, Message(payloads[i % len(payloads)]))
+        attendre(client, warmup)
+        client.published.clear()
+        debut = time.perf_counter()
+        for i in range(messages):
+            recus.append(time.perf_counter())
+            listener.on_message(client, None, Message(payloads[i % len(payloads)]))
+        # Sans regroupement, une exception dans on_message ne publie rien : ces messages comptent comme erreurs
+        attendre(client, messages)
+        ecoule = (client.published[-1][0] if client.published else time.perf_counter()) - debut
+    publies = len(client.published)
+    erreurs = messages - publies + sum('error' in json.loads(payload) for _, _, payload in client.published)
+    ms = (np.array([t for t, _, _ in client.published]) - np.array(recus[:publies])) * 1000.0
+    resultat = {
+        'mode': mode,
+        'batch_rows': batch_rows,
+        'messages': messages,
+        'errors': erreurs,
+        'setup_s': preparation,
+        'msg_per_s': messages / ecoule,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else None,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else None,
+        'max_ms': float(ms.max()) if len(ms) else None,
+    }
+    if listener.batcher is not None:
+        listener.batcher.close()
+        stats = listener.batcher.stats()
+        resultat['batches'] = {cle: stats[cle] for cle in ('batches', 'batch_size_mean', 'batch_size_max', 'flush_reasons')}
+        listener.batcher = None
+    if mode == 'http':
+        resultat['http'] = listener.api_client.stats()
+    return resultat
+
+
+# Attente des publications (immédiates sans regroupement), au plus 60 s
+def attendre(client, n, limite=60.0):
+    fin = time.perf_counter() + limite
+    while len(client.published) < n and time.perf_counter() < fin:
+        time.sleep(0.001)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Banc d'essai du listener MQTT : API vs. modèle embarqué")
+    parser.add_argument('--modes', default='http,embedded', help=f"Modes mesurés, parmi {', '.join(MODES)}")
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--csv', default='sensors_data.csv')
+    parser.add_argument('--socket', default='/tmp/density_api.sock', help="Adresse du frontal binaire (mode socket)")
+    parser.add_argument('--batch-sizes', default='0',
+                        help="Tailles maximales de lot à mesurer, séparées par des virgules (0 = sans regroupement)")
+    parser.add_argument('--batch-wait-ms', type=float, default=20.0)
+    parser.add_argument('--json', action='store_true', help="Sortie JSON au lieu du tableau")
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    inconnus = set(modes) - set(MODES)
+    if inconnus:
+        parser.error(f"Modes inconnus : {', '.join(sorted(inconnus))}")
+    payloads = [json.dumps(ligne).encode('utf-8') for ligne in pd.read_csv(args.csv).to_dict('records')]
+    tailles = [int(taille) for taille in args.batch_sizes.split(',') if taille.strip()]
+    resultats = [run(mode, payloads, args.messages, args.warmup, args.socket, taille, args.batch_wait_ms)
+                 for mode in modes for taille in tailles]
+    if args.json:
+        for resultat in resultats:
+            print(json.dumps(resultat))
+    else:
+        print(f"{'mode':<10} {'lot':>5} {'messages':>9} {'erreurs':>8} {'msg/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'prépa. s':>9} {'lot moyen':>10}")
+        for r in resultats:
+            moyen = r['batches']['batch_size_mean'] if 'batches' in r else 1
+            print(f"{r['mode']:<10} {r['batch_rows'] or '-':>5} {r['messages']:>9} {r['errors']:>8} {r['msg_per_s']:>9.1f} "
+                  f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['max_ms']:>8.2f} {r['setup_s']:>9.2f} {moyen:>10.1f}")
+        for r in resultats:
+            if 'http' in r:
+                print(f"Client HTTP : {r['http']}")
@@ -0,0 +1,318 @@
+# Compaction de la forêt après entraînement, sous un budget de précision
+#
+# Trois réductions, dans cet ordre :
+#   1. fusion des sous-arbres dont les feuilles diffèrent d'au plus une tolérance (kg/m³) : le nœud devient une
+#      feuille portant sa propre valeur (moyenne des échantillons du sous-arbre)
+#   2. seuils et valeurs stockés en float32 (les sommes restent en float64, voir fast_forest._float_array)
+#   3. sélection d'un sous-ensemble d'arbres : ordre glouton par fidélité à la forêt complète sur l'ensemble
+#      d'entraînement, puis le plus petit préfixe dont le RMSE sur l'ensemble de test reste sous le budget
+#
+# Le budget (--max-rmse-increase, en kg/m³) porte sur le RMSE de l'ensemble de test du notebook (même découpage,
+# même graine). Cet ensemble n'a pas servi à l'entraînement ni à l'ordre des arbres, mais c'est sur lui que sont
+# choisis le nombre d'arbres et la tolérance : le RMSE compacté rapporté est donc optimiste, pas une estimation
+# indépendante (une partie de l'entraînement ne conviendrait pas, la forêt l'a déjà vue). Parmi les tolérances
+# essayées, la configuration retenue est celle qui respecte le budget avec le moins de nœuds.
+#
+#   python compact_forest.py --max-rmse-increase 0.1                        # → modele_compact_arrays/
+#   python compact_forest.py --max-rmse-increase 0.25 --tolerances 0,1,2 --json compaction.json
+#   API_MODEL_ARTIFACT=modele_compact_arrays python serve_api.py            # service de la forêt compactée
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+
+from fast_forest import FastForest, load_artifact, save_artifact
+
+COMPACT_DIR = 'modele_compact_arrays'
+DEFAULT_TOLERANCES = (0.0, 0.25, 0.5, 1.0, 2.0)
+
+
+# Découpage identique à random_forest.ipynb : cible centrée, 20 % de test, random_state=42
+def load_split(path='donnees_nettoyees.xlsx', feature_names=None, y_mean=0.0, test_size=0.2, random_state=42):
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    donnees = pd.read_excel(path)
+    X = donnees[list(feature_names)].to_numpy(dtype=np.float64)
+    y = donnees['Densité_Sortie'].to_numpy(dtype=np.float64) - y_mean
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    return X_train, X_test, y_train + y_mean, y_test + y_mean
+
+
+def rmse(prediction, reference):
+    return float(np.sqrt(np.mean((np.asarray(prediction) - reference) ** 2)))
+
+
+# Bornes [début, fin) de chaque arbre dans les tableaux plats (les arbres sont contigus, dans l'ordre des racines)
+def _bornes_arbres(forest):
+    racines = forest.roots.tolist()
+    return list(zip(racines, racines[1:] + [len(forest.value)]))
+
+
+# Un arbre dont les sous-arbres d'amplitude <= tolérance deviennent des feuilles, renuméroté en préordre.
+# Retourne (feature, threshold, left, right, value, profondeur) en indices locaux à l'arbre.
+def collapse_tree(forest, debut, fin, tolerance):
+    n = fin - debut
+    gauche = (forest.left[debut:fin] - debut).tolist()
+    droite = (forest.right[debut:fin] - debut).tolist()
+    valeur = np.asarray(forest.value[debut:fin], dtype=np.float64)
+    # Amplitude des feuilles de chaque sous-arbre : les enfants ont un indice supérieur au parent
+    # (numérotation de scikit-learn), un seul parcours à rebours suffit
+    mini = valeur.tolist()
+    maxi = list(mini)
+    for i in range(n - 1, -1, -1):
+        g, d = gauche[i], droite[i]
+        if g != i:
+            mini[i] = min(mini[g], mini[d])
+            maxi[i] = max(maxi[g], maxi[d])
+    # Parcours en préordre depuis la racine, arrêté aux sous-arbres fusionnés
+    ordre, feuilles, profondeur = [], [], 0
+    pile = [(0, 0)]
+    while pile:
+        i, p = pile.pop()
+        ordre.append(i)
+        feuille = gauche[i] == i or maxi[i] - mini[i] <= tolerance
+        feuilles.append(feuille)
+        if feuille:
+            profondeur = max(profondeur, p)
+        else:
+            pile.append((droite[i], p + 1))
+            pile.append((gauche[i], p + 1))
+    ordre = np.array(ordre, dtype=np.intp)
+    feuilles = np.array(feuilles)
+    position = np.empty(n, dtype=np.intp)
+    position[ordre] = np.arange(len(ordre))
+    propres = np.arange(len(ordre))
+    return (
+        np.where(feuilles, 0, forest.feature[debut + ordre]),
+        np.where(feuilles, np.inf, forest.threshold[debut + ordre]),
+        np.where(feuilles, propres, position[np.asarray(gauche)[ordre]]),
+        np.where(feuilles, propres, position[np.asarray(droite)[ordre]]),
+        valeur[ordre],
+        profondeur,
+    )
+
+
+# Forêt à partir d'arbres en indices locaux, dans l'ordre donné ; seuils et valeurs en float32 si demandé
+def assemble(arbres, y_mean, feature_names, dtype=np.float32):
+    decalages = np.cumsum([0] + [len(arbre[4]) for arbre in arbres])
+    return FastForest(
+        np.concatenate([arbre[0] for arbre in arbres]),
+        np.concatenate([arbre[1] for arbre in arbres]).astype(dtype),
+        np.concatenate([arbre[2] + decalage for arbre, decalage in zip(arbres, decalages)]),
+        np.concatenate([arbre[3] + decalage for arbre, decalage in zip(arbres, decalages)]),
+        np.concatenate([arbre[4] for arbre in arbres]).astype(dtype),
+        decalages[:-1], max(arbre[5] for arbre in arbres), y_mean, feature_names,
+    )
+
+
+# Valeur de chaque arbre pour chaque ligne, forme (n_trees, n), en float64
+def tree_values(forest, X):
+    return forest.value[forest._leaves(X)].astype(np.float64)
+
+
+# Ordre glouton des arbres : à chaque étape, celui dont l'ajout rapproche le plus la moyenne des arbres retenus
+# de la cible (la forêt complète sur l'ensemble d'entraînement)
+def greedy_order(valeurs, cible):
+    restants = list(range(len(valeurs)))
+    somme = np.zeros(valeurs.shape[1])
+    ordre = []
+    for k in range(1, len(valeurs) + 1):
+        erreurs = (((somme + valeurs[restants]) / k - cible) ** 2).mean(axis=1)
+        choisi = restants.pop(int(np.argmin(erreurs)))
+        ordre.append(choisi)
+        somme += valeurs[choisi]
+    return ordre
+
+
+# RMSE de test de chaque préfixe de l'ordre (k = 1..n_trees arbres)
+def prefix_rmse(valeurs, ordre, y_mean, y):
+    moyennes = np.cumsum(valeurs[ordre], axis=0) / np.arange(1, len(ordre) + 1)[:, None] + y_mean
+    return np.sqrt(((moyennes - y) ** 2).mean(axis=1))
+
+
+# Essai d'une tolérance : plus petit nombre d'arbres qui tient le budget, ou None si aucun ne le tient
+def try_tolerance(forest, tolerance, X_train, X_test, y_test, cible, limite):
+    arbres = [collapse_tree(forest, debut, fin, tolerance) for debut, fin in _bornes_arbres(forest)]
+    reduite = assemble(arbres, forest.y_mean, forest.feature_names)
+    ordre = greedy_order(tree_values(reduite, X_train), cible)
+    erreurs = prefix_rmse(tree_values(reduite, X_test), ordre, forest.y_mean, y_test)
+    tenus = np.flatnonzero(erreurs <= limite)
+    if not len(tenus):
+        return None
+    # Le préfixe de k arbres tient le budget ; on garde aussi la suite de l'ordre pour ajuster k si besoin
+    k = int(tenus[0]) + 1
+    return {
+        'tolerance': tolerance,
+        'arbres': [arbres[i] for i in ordre],
+        'k': k,
+        'n_nodes': sum(len(arbres[i][4]) for i in ordre[:k]),
+        'rmse': float(erreurs[k - 1]),
+    }
+
+
+def compact(forest, X_train, X_test, y_test, max_rmse_increase, tolerances=DEFAULT_TOLERANCES, verbose=True):
+    base = rmse(forest.predict_many(X_test), y_test)
+    limite = base + max_rmse_increase
+    cible = tree_values(forest, X_train).mean(axis=0)
+    essais = []
+    for tolerance in tolerances:
+        essai = try_tolerance(forest, tolerance, X_train, X_test, y_test, cible, limite)
+        if verbose:
+            print(f"🔧 Tolérance {tolerance:g} kg/m³ : "
+                  + (f"{essai['k']} arbres, {essai['n_nodes']} nœuds, RMSE {essai['rmse']:.4f}" if essai
+                     else "budget dépassé même avec tous les arbres"))
+        if essai:
+            essais.append(essai)
+    if not essais:
+        raise ValueError(f"Aucune compaction ne tient le budget (RMSE de référence {base:.4f}, limite {limite:.4f}).")
+    retenu = min(essais, key=lambda essai: (essai['n_nodes'], -essai['tolerance']))
+    # Contrôle sur la forêt réellement assemblée (arrondis float32 de l'accumulation) : un arbre de plus si besoin
+    k = retenu['k']
+    while True:
+        compacte = assemble(retenu['arbres'][:k], forest.y_mean, forest.feature_names)
+        erreur = rmse(compacte.predict_many(X_test), y_test)
+        if erreur <= limite or k == len(retenu['arbres']):
+            break
+        k += 1
+    rapport = {
+        'max_rmse_increase': max_rmse_increase,
+        'tolerance': retenu['tolerance'],
+        'tolerances': list(tolerances),
+        'n_trees': k,
+        'rmse_full': base,
+        'rmse_compact': erreur,
+        'dtype': 'float32',
+    }
+    return compacte, rapport
+
+
+# Mesures d'un modèle : latence médiane d'une ligne et d'un lot, en ms
+def _latence_ligne(predire, X, repetitions=200):
+    durees = []
+    for i in range(repetitions):
+        ligne = X[i % len(X)]
+        debut = time.perf_counter()
+        predire(ligne)
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees) * 1000)
+
+
+def _latence_lot(predire, X, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        predire(X)
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees) * 1000)
+
+
+def _taille_repertoire(repertoire):
+    return sum(os.path.getsize(os.path.join(repertoire, nom)) for nom in os.listdir(repertoire))
+
+
+def _chrono(fonction, repetitions=3):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees) * 1000)
+
+
+def _structure(forest):
+    return {'trees': forest.n_trees, 'nodes': int(len(forest.value)), 'max_depth': forest.max_depth}
+
+
+# Taille, temps de chargement, latences et RMSE : scikit-learn (pickle), FastForest complète (tableaux en mémoire,
+# compilée depuis le pickle), FastForest compactée (artefact sur disque)
+def measure(model, forest, compacte, repertoire, X_test, y_test, model_path, lot_rows=10000):
+    import pandas as pd
+    X_lot = np.resize(X_test, (lot_rows, X_test.shape[1]))
+    y_mean = forest.y_mean
+    # scikit-learn reçoit des DataFrame nommés, comme à l'entraînement (lignes préparées hors mesure)
+    tableau_test = pd.DataFrame(X_test, columns=forest.feature_names)
+    tableau_lot = pd.DataFrame(X_lot, columns=forest.feature_names)
+    lignes_test = [tableau_test.iloc[[i]] for i in range(50)]
+    lignes = {
+        'sklearn': {
+            'trees': forest.n_trees, 'nodes': int(len(forest.value)), 'max_depth': forest.max_depth,
+            'bytes': os.path.getsize(model_path),
+            'load_ms': _chrono(lambda: joblib.load(model_path)),
+            'single_ms': _latence_ligne(lambda ligne: model.predict(ligne)[0] + y_mean, lignes_test, 50),
+            'batch_ms': _latence_lot(lambda X: model.predict(X) + y_mean, tableau_lot),
+            'rmse': rmse(model.predict(tableau_test) + y_mean, y_test),
+        },
+        'fast_forest': {
+            **_structure(forest),
+            'bytes': sum(getattr(forest, nom).nbytes for nom in ('feature', 'threshold', 'left', 'right', 'value')),
+            'load_ms': _chrono(lambda: FastForest.from_pipeline(joblib.load(model_path), y_mean)),
+            'single_ms': _latence_ligne(forest.predict_one, X_test),
+            'batch_ms': _latence_lot(forest.predict_many, X_lot),
+            'rmse': rmse(forest.predict_many(X_test), y_test),
+        },
+        'compact': {
+            **_structure(compacte),
+            'bytes': _taille_repertoire(repertoire),
+            'load_ms': _chrono(lambda: load_artifact(repertoire, mmap=False, check_sources=False)),
+            'single_ms': _latence_ligne(compacte.predict_one, X_test),
+            'batch_ms': _latence_lot(compacte.predict_many, X_lot),
+            'rmse': rmse(compacte.predict_many(X_test), y_test),
+        },
+    }
+    # Écart maximal à la forêt complète sur l'ensemble de test
+    lignes['compact']['max_abs_diff'] = float(np.abs(compacte.predict_many(X_test) - forest.predict_many(X_test)).max())
+    return lignes
+
+
+def print_table(lignes, lot_rows):
+    print(f"{'modèle':<12} {'arbres':>6} {'nœuds':>8} {'prof.':>5} {'taille Mo':>10} {'charg. ms':>10} "
+          f"{'1 ligne ms':>10} {f'{lot_rows} l. ms':>10} {'RMSE':>8}")
+    for nom, ligne in lignes.items():
+        print(f"{nom:<12} {ligne['trees']:>6} {ligne['nodes']:>8} {ligne['max_depth']:>5} {ligne['bytes'] / 1e6:>10.2f} "
+              f"{ligne['load_ms']:>10.2f} {ligne['single_ms']:>10.3f} {ligne['batch_ms']:>10.1f} {ligne['rmse']:>8.4f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compaction de la forêt sous un budget de RMSE")
+    parser.add_argument('--max-rmse-increase', type=float, required=True,
+                        help="Hausse maximale du RMSE de test admise, en kg/m³")
+    parser.add_argument('--tolerances', default=','.join(f"{t:g}" for t in DEFAULT_TOLERANCES),
+                        help="Tolérances de fusion des sous-arbres à essayer, en kg/m³, séparées par des virgules")
+    parser.add_argument('--model', default='modele_final.pkl')
+    parser.add_argument('--y-mean', default='y_mean.txt')
+    parser.add_argument('--data', default='donnees_nettoyees.xlsx', help="Données du notebook (découpage identique)")
+    parser.add_argument('--output', default=COMPACT_DIR, help="Répertoire de l'artefact compacté")
+    parser.add_argument('--batch-rows', type=int, default=10000, help="Taille du lot pour la latence en lot")
+    parser.add_argument('--json', help="Écrit le rapport complet dans ce fichier")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tolerances = [float(t) for t in args.tolerances.split(',') if t.strip()]
+    model = joblib.load(args.model)
+    with open(args.y_mean, 'r') as f:
+        y_mean = float(f.read())
+    forest = FastForest.from_pipeline(model, y_mean)
+    X_train, X_test, _, y_test = load_split(args.data, forest.feature_names, y_mean)
+    print(f"📦 Forêt complète : {forest.n_trees} arbres, {len(forest.value)} nœuds, profondeur {forest.max_depth}")
+
+    debut = time.perf_counter()
+    compacte, rapport = compact(forest, X_train, X_test, y_test, args.max_rmse_increase, tolerances)
+    print(f"✅ Compaction en {time.perf_counter() - debut:.1f} s : tolérance {rapport['tolerance']:g} kg/m³, "
+          f"{rapport['n_trees']} arbres, RMSE {rapport['rmse_full']:.4f} → {rapport['rmse_compact']:.4f}")
+    save_artifact(compacte, args.output, source_files=(args.model, args.y_mean), extra_meta={'compaction': rapport})
+    print(f"💾 Artefact écrit dans {args.output}")
+
+    lignes = measure(model, forest, compacte, args.output, X_test, y_test, args.model, args.batch_rows)
+    print_table(lignes, args.batch_rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'compaction': rapport, 'models': lignes}, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == '__main__':
+    main()
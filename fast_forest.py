@@ -0,0 +1,393 @@
+# Moteur d'inférence RandomForest à tableaux plats (sans DataFrame ni dispatch scikit-learn)
+#
+# Le Pipeline(StandardScaler, RandomForestRegressor) est compilé en tableaux NumPy contigus :
+# la normalisation est repliée dans les seuils de chaque nœud, qui s'expriment alors
+# directement dans l'unité des capteurs. Les résultats sont identiques bit à bit à
+# model.predict(X) + y_mean.
+import json
+import os
+
+import joblib
+import numpy as np
+
+from feature_schema import FEATURE_NAMES
+
+# Taille des blocs de lignes parcourus simultanément par predict_many
+CHUNK_ROWS = 4096
+
+# Artefact projetable en mémoire : un fichier .npy non compressé par tableau + meta.json
+ARTIFACT_DIR = 'modele_final_arrays'
+ARTIFACT_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+ARTIFACT_FORMAT = 1
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+_SIGN_BIT = np.int64(-0x8000000000000000)
+
+
+# Conversion float64 -> entier ordonné (x < y  <=>  clé(x) < clé(y)) pour la dichotomie sur les flottants
+def _float_to_key(x):
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits >= 0, bits, -(bits & _SIGN_MASK))
+
+
+def _key_to_float(key):
+    bits = np.where(key >= 0, key, (-key) | _SIGN_BIT)
+    return bits.astype(np.int64).view(np.float64)
+
+
+# Seuil brut c tel que  x <= c  <=>  float32((x - mean) / scale) <= t  pour tout x fini.
+# C'est exactement le test effectué par scikit-learn (normalisation en float64, puis
+# conversion en float32 dans l'arbre) ; le prédicat étant monotone, on recherche par
+# dichotomie le plus grand flottant qui le vérifie.
+def _fold_thresholds(threshold, mean, scale):
+    def predicat(x):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return ((x - mean) / scale).astype(np.float32).astype(np.float64) <= threshold
+
+    estimation = threshold * scale + mean
+    ecart = np.abs(estimation) * 1e-6 + 1e-6
+    bas = estimation - ecart
+    haut = estimation + ecart
+    # Élargissement de l'encadrement jusqu'à avoir predicat(bas) vrai et predicat(haut) faux
+    while True:
+        ok_bas = predicat(bas)
+        ok_haut = ~predicat(haut)
+        if ok_bas.all() and ok_haut.all():
+            break
+        ecart = ecart * 2.0
+        bas = np.where(ok_bas, bas, estimation - ecart)
+        haut = np.where(ok_haut, haut, estimation + ecart)
+    cle_bas = _float_to_key(bas)
+    cle_haut = _float_to_key(haut)
+    while True:
+        actifs = cle_haut - cle_bas > 1
+        if not actifs.any():
+            break
+        milieu = cle_bas + (cle_haut - cle_bas) // 2
+        vrai = predicat(_key_to_float(milieu))
+        cle_bas = np.where(actifs & vrai, milieu, cle_bas)
+        cle_haut = np.where(actifs & ~vrai, milieu, cle_haut)
+    return _key_to_float(cle_bas)
+
+
+# Tableaux conservés tels quels s'ils ont déjà le bon type (évite de recopier un tableau projeté en mémoire).
+# Les indices restent en intp : NumPy convertirait sinon à chaque indexation, ce qui double la latence.
+def _index_array(a):
+    a = np.asarray(a)
+    return a if a.dtype == np.intp and a.flags.c_contiguous else np.ascontiguousarray(a, dtype=np.intp)
+
+
+# Seuils et valeurs en float64, ou en float32 pour une forêt compactée (voir compact_forest.py) : les comparaisons
+# et les sommes se font toujours en float64
+def _float_array(a):
+    a = np.asarray(a)
+    return a if a.dtype in (np.float64, np.float32) and a.flags.c_contiguous else np.ascontiguousarray(a, dtype=np.float64)
+
+
+# Quantiles par colonne avec interpolation linéaire (méthode par défaut de np.quantile), par un seul tri :
+# plusieurs fois plus rapide que np.quantile sur les petites matrices (n_trees, n) du chemin unitaire
+def _linear_quantiles(valeurs, quantiles):
+    tries = np.sort(valeurs, axis=0)
+    position = quantiles * (len(tries) - 1)
+    bas = np.floor(position).astype(np.intp)
+    haut = np.minimum(bas + 1, len(tries) - 1)
+    fraction = (position - bas)[:, None]
+    return tries[bas] + (tries[haut] - tries[bas]) * fraction
+
+
+class FastForest:
+    # Tableaux plats de tous les arbres concaténés ; une feuille boucle sur elle-même (seuil +inf)
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, y_mean, feature_names):
+        self.feature = _index_array(feature)
+        self.threshold = _float_array(threshold)
+        self.left = _index_array(left)
+        self.right = _index_array(right)
+        self.value = _float_array(value)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.y_mean = float(y_mean)
+        self.feature_names = list(feature_names)
+        self.n_trees = len(self.roots)
+        self.n_features = len(self.feature_names)
+
+    # Compilation d'un Pipeline(StandardScaler, RandomForestRegressor) ou d'une forêt seule
+    @classmethod
+    def from_pipeline(cls, model, y_mean):
+        if hasattr(model, 'named_steps'):
+            etapes = list(model.named_steps.values())
+            scaler, rf = (etapes[0], etapes[-1]) if len(etapes) == 2 else (None, etapes[-1])
+            if len(etapes) > 2:
+                raise ValueError("Seuls les pipelines (scaler, forêt) ou (forêt) sont pris en charge.")
+        else:
+            scaler, rf = None, model
+        if not hasattr(rf, 'estimators_'):
+            raise ValueError("Le modèle doit être une forêt aléatoire entraînée.")
+        if getattr(rf, 'n_outputs_', 1) != 1:
+            raise ValueError("Seules les forêts à une seule sortie sont prises en charge.")
+
+        noms = getattr(model, 'feature_names_in_', None)
+        if noms is None:
+            noms = getattr(rf, 'feature_names_in_', FEATURE_NAMES)
+        n_features = len(noms)
+        moyenne = np.zeros(n_features)
+        echelle = np.ones(n_features)
+        if scaler is not None:
+            if getattr(scaler, 'mean_', None) is not None:
+                moyenne = np.asarray(scaler.mean_, dtype=np.float64)
+            if getattr(scaler, 'scale_', None) is not None:
+                echelle = np.asarray(scaler.scale_, dtype=np.float64)
+
+        features, seuils, gauches, droits, valeurs, racines = [], [], [], [], [], []
+        decalage = 0
+        profondeur = 0
+        for estimateur in rf.estimators_:
+            arbre = estimateur.tree_
+            n = arbre.node_count
+            feuille = arbre.children_left == -1
+            indices = np.arange(n) + decalage
+            feature = np.where(feuille, 0, arbre.feature)
+            seuil = np.full(n, np.inf)
+            internes = ~feuille
+            seuil[internes] = _fold_thresholds(
+                arbre.threshold[internes], moyenne[feature[internes]], echelle[feature[internes]]
+            )
+            features.append(feature)
+            seuils.append(seuil)
+            gauches.append(np.where(feuille, indices, arbre.children_left + decalage))
+            droits.append(np.where(feuille, indices, arbre.children_right + decalage))
+            valeurs.append(arbre.value[:, 0, 0])
+            racines.append(decalage)
+            profondeur = max(profondeur, arbre.max_depth)
+            decalage += n
+
+        return cls(
+            np.concatenate(features), np.concatenate(seuils), np.concatenate(gauches),
+            np.concatenate(droits), np.concatenate(valeurs), np.array(racines),
+            profondeur, y_mean, noms,
+        )
+
+    # Indices des feuilles atteintes : forme (n_trees,) pour une ligne, (n_trees, n) pour une matrice
+    def _leaves(self, X):
+        noeuds = np.repeat(self.roots[:, None], X.shape[0], axis=1) if X.ndim == 2 else self.roots.copy()
+        colonnes = np.arange(X.shape[0]) if X.ndim == 2 else None
+        for _ in range(self.max_depth):
+            f = self.feature[noeuds]
+            x = X[colonnes, f] if X.ndim == 2 else X[f]
+            noeuds = np.where(x <= self.threshold[noeuds], self.left[noeuds], self.right[noeuds])
+        return noeuds
+
+    # Prédiction d'une seule ligne (séquence de n_features valeurs dans l'ordre d'entraînement)
+    def predict_one(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape != (self.n_features,):
+            raise ValueError(f"Une ligne doit contenir {self.n_features} valeurs.")
+        if not np.isfinite(x).all():
+            raise ValueError("Les valeurs d'entrée doivent être finies (ni NaN ni infini).")
+        # cumsum additionne dans l'ordre des arbres, comme l'accumulation de scikit-learn
+        total = np.cumsum(self.value[self._leaves(x)], dtype=np.float64)[-1]
+        return float(total / self.n_trees + self.y_mean)
+
+    # Prédiction d'une ligne accompagnée de la région constante qui la contient : pour tout x'
+    # vérifiant lo < x' <= hi (composante par composante), les feuilles atteintes sont les mêmes
+    # dans tous les arbres, donc la prédiction est exactement identique
+    def predict_one_region(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape != (self.n_features,):
+            raise ValueError(f"Une ligne doit contenir {self.n_features} valeurs.")
+        if not np.isfinite(x).all():
+            raise ValueError("Les valeurs d'entrée doivent être finies (ni NaN ni infini).")
+        # Chemin parcouru dans chaque arbre : variable testée, seuil et direction à chaque niveau
+        chemin_f = np.empty((self.max_depth, self.n_trees), dtype=np.intp)
+        chemin_seuil = np.empty((self.max_depth, self.n_trees))
+        chemin_gauche = np.empty((self.max_depth, self.n_trees), dtype=bool)
+        noeuds = self.roots.copy()
+        for niveau in range(self.max_depth):
+            f = self.feature[noeuds]
+            seuil = self.threshold[noeuds]
+            gauche = x[f] <= seuil
+            chemin_f[niveau] = f
+            chemin_seuil[niveau] = seuil
+            chemin_gauche[niveau] = gauche
+            noeuds = np.where(gauche, self.left[noeuds], self.right[noeuds])
+        # Intersection des boîtes : les feuilles (seuil +inf, toujours à gauche) ne restreignent rien
+        lo = np.empty(self.n_features)
+        hi = np.empty(self.n_features)
+        for k in range(self.n_features):
+            meme_variable = chemin_f == k
+            hi[k] = np.min(chemin_seuil, where=meme_variable & chemin_gauche, initial=np.inf)
+            lo[k] = np.max(chemin_seuil, where=meme_variable & ~chemin_gauche, initial=-np.inf)
+        total = np.cumsum(self.value[noeuds], dtype=np.float64)[-1]
+        return float(total / self.n_trees + self.y_mean), lo, hi
+
+    # Prédiction vectorisée d'une matrice (n, n_features)
+    def predict_many(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"La matrice doit avoir la forme (n, {self.n_features}).")
+        if not np.isfinite(X).all():
+            raise ValueError("Les valeurs d'entrée doivent être finies (ni NaN ni infini).")
+        resultat = np.empty(X.shape[0])
+        for debut in range(0, X.shape[0], CHUNK_ROWS):
+            bloc = X[debut:debut + CHUNK_ROWS]
+            valeurs = self.value[self._leaves(bloc)]
+            total = np.zeros(bloc.shape[0])
+            for ligne in valeurs:
+                total += ligne
+            resultat[debut:debut + CHUNK_ROWS] = total / self.n_trees + self.y_mean
+        return resultat
+
+    # Dispersion entre arbres en un seul parcours : les valeurs des feuilles atteintes (n_trees, n) servent
+    # à la fois à la moyenne (identique bit à bit à predict_many), à l'écart-type et aux quantiles demandés.
+    # Retourne (moyenne (n,), écart-type (n,), quantiles (len(quantiles), n)) ; scalaires pour une ligne.
+    # Il s'agit de la dispersion des arbres, pas d'un intervalle de prédiction calibré.
+    def predict_uncertainty(self, X, quantiles=(0.05, 0.95)):
+        X = np.asarray(X, dtype=np.float64)
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if quantiles.ndim != 1 or ((quantiles < 0) | (quantiles > 1)).any():
+            raise ValueError("Les quantiles doivent être une liste de valeurs entre 0 et 1.")
+        if X.ndim == 1:
+            # Une ligne : même parcours et même sommation que predict_one
+            if X.shape != (self.n_features,):
+                raise ValueError(f"Une ligne doit contenir {self.n_features} valeurs.")
+            if not np.isfinite(X).all():
+                raise ValueError("Les valeurs d'entrée doivent être finies (ni NaN ni infini).")
+            valeurs = self.value[self._leaves(X)].astype(np.float64, copy=False)
+            moyenne = float(np.cumsum(valeurs)[-1] / self.n_trees + self.y_mean)
+            bornes = _linear_quantiles(valeurs[:, None], quantiles)[:, 0] + self.y_mean if len(quantiles) else np.empty(0)
+            return moyenne, float(valeurs.std()), bornes
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"La matrice doit avoir la forme (n, {self.n_features}).")
+        if not np.isfinite(X).all():
+            raise ValueError("Les valeurs d'entrée doivent être finies (ni NaN ni infini).")
+        moyenne = np.empty(X.shape[0])
+        ecart_type = np.empty(X.shape[0])
+        bornes = np.empty((len(quantiles), X.shape[0]))
+        for debut in range(0, X.shape[0], CHUNK_ROWS):
+            bloc = X[debut:debut + CHUNK_ROWS]
+            valeurs = self.value[self._leaves(bloc)].astype(np.float64, copy=False)
+            total = np.zeros(bloc.shape[0])
+            for ligne in valeurs:
+                total += ligne
+            moyenne[debut:debut + CHUNK_ROWS] = total / self.n_trees + self.y_mean
+            ecart_type[debut:debut + CHUNK_ROWS] = valeurs.std(axis=0)
+            if len(quantiles):
+                bornes[:, debut:debut + CHUNK_ROWS] = _linear_quantiles(valeurs, quantiles) + self.y_mean
+        return moyenne, ecart_type, bornes
+
+
+# Chargement du modèle et de y_mean puis compilation en FastForest
+def load_fast_forest(model_path='modele_final.pkl', y_mean_path='y_mean.txt'):
+    model = joblib.load(model_path)
+    with open(y_mean_path, 'r') as f:
+        y_mean = float(f.read())
+    return FastForest.from_pipeline(model, y_mean)
+
+
+# Signature (mtime, taille) d'un fichier source, pour détecter un artefact périmé
+def _file_signature(path):
+    try:
+        etat = os.stat(path)
+        return [etat.st_mtime_ns, etat.st_size]
+    except OSError:
+        return None
+
+
+# Export de la forêt en tableaux .npy non compressés, à côté de y_mean et de la liste des variables.
+# L'écriture se fait dans un répertoire temporaire renommé à la fin, pour ne jamais exposer un artefact partiel.
+def save_artifact(forest, directory=ARTIFACT_DIR, source_files=('modele_final.pkl', 'y_mean.txt'), extra_meta=None):
+    temporaire = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(temporaire, exist_ok=True)
+    for nom in ARTIFACT_ARRAYS:
+        np.save(os.path.join(temporaire, f"{nom}.npy"), getattr(forest, nom), allow_pickle=False)
+    meta = {
+        'format': ARTIFACT_FORMAT,
+        'y_mean': forest.y_mean,
+        'feature_names': forest.feature_names,
+        'max_depth': forest.max_depth,
+        'n_trees': forest.n_trees,
+        'n_nodes': int(len(forest.value)),
+        'sources': {chemin: _file_signature(chemin) for chemin in source_files},
+        **(extra_meta or {}),
+    }
+    with open(os.path.join(temporaire, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    if os.path.isdir(directory):
+        ancien = f"{directory}.old-{os.getpid()}"
+        os.replace(directory, ancien)
+        os.replace(temporaire, directory)
+        for fichier in os.listdir(ancien):
+            os.remove(os.path.join(ancien, fichier))
+        os.rmdir(ancien)
+    else:
+        os.replace(temporaire, directory)
+    return directory
+
+
+# Chargement de l'artefact ; avec mmap=True les tableaux sont projetés en lecture seule, et tous
+# les processus d'une même machine partagent une seule copie physique des arbres (cache de pages)
+def load_artifact(directory=ARTIFACT_DIR, mmap=True, check_sources=True):
+    with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"Format d'artefact non pris en charge : {meta.get('format')}")
+    if check_sources:
+        perimes = [chemin for chemin, signature in meta.get('sources', {}).items()
+                   if signature is not None and _file_signature(chemin) not in (None, signature)]
+        if perimes:
+            print(f"⚠️ Artefact {directory} plus ancien que {perimes} : relancer l'export.")
+    tableaux = {
+        nom: np.load(os.path.join(directory, f"{nom}.npy"), mmap_mode='r' if mmap else None, allow_pickle=False)
+        for nom in ARTIFACT_ARRAYS
+    }
+    return FastForest(
+        max_depth=meta['max_depth'], y_mean=meta['y_mean'], feature_names=meta['feature_names'], **tableaux
+    )
+
+
+# Vérification de l'égalité bit à bit avec scikit-learn : python fast_forest.py [verify] [sensors_data.csv]
+# Export de l'artefact projetable en mémoire :           python fast_forest.py export [modele_final_arrays]
+if __name__ == '__main__':
+    import sys
+    import time
+    import pandas as pd
+
+    commande = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in ('verify', 'export') else 'verify'
+    arguments = sys.argv[2:] if len(sys.argv) > 1 and sys.argv[1] in ('verify', 'export') else sys.argv[1:]
+
+    if commande == 'export':
+        repertoire = arguments[0] if arguments else ARTIFACT_DIR
+        debut = time.perf_counter()
+        forest = load_fast_forest()
+        save_artifact(forest, repertoire)
+        print(f"✅ Artefact écrit dans {repertoire} en {time.perf_counter() - debut:.3f} s")
+        debut = time.perf_counter()
+        load_artifact(repertoire)
+        print(f"⏱️ Chargement de l'artefact : {(time.perf_counter() - debut) * 1000:.2f} ms")
+        sys.exit(0)
+
+    fichier = arguments[0] if arguments else 'sensors_data.csv'
+    model = joblib.load('modele_final.pkl')
+    with open('y_mean.txt', 'r') as f:
+        y_mean = float(f.read())
+    debut = time.perf_counter()
+    forest = FastForest.from_pipeline(model, y_mean)
+    print(f"✅ Forêt compilée en {time.perf_counter() - debut:.3f} s ({forest.n_trees} arbres, {len(forest.value)} nœuds)")
+
+    donnees = pd.read_csv(fichier)[forest.feature_names]
+    reference = model.predict(donnees) + y_mean
+    X = donnees.to_numpy(dtype=np.float64)
+    lot = forest.predict_many(X)
+    unitaires = np.array([forest.predict_one(ligne) for ligne in X])
+    print(f"🔎 predict_many identique : {np.array_equal(lot, reference)}")
+    print(f"🔎 predict_one identique : {np.array_equal(unitaires, reference)}")
+
+    ligne = donnees.iloc[[0]]
+    debut = time.perf_counter()
+    for _ in range(100):
+        model.predict(ligne)
+    sklearn_ms = (time.perf_counter() - debut) * 10
+    debut = time.perf_counter()
+    for _ in range(100):
+        forest.predict_one(X[0])
+    rapide_ms = (time.perf_counter() - debut) * 10
+    print(f"⏱️ Une ligne : scikit-learn {sklearn_ms:.3f} ms, FastForest {rapide_ms:.3f} ms")
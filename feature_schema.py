@@ -0,0 +1,138 @@
+# Schéma déclaré des entrées du modèle : ordre des variables, type et plages valides
+#
+# Les plages reprennent celles du validateur JavaScript de app_prediction.py. Les
+# fonctions de construction transforment directement un dict (ou une charge JSON) en
+# ligne / matrice float64 préallouée, en validant chaque valeur au passage, sans pandas.
+import json
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Description d'une variable d'entrée (bornes incluses)
+Feature = namedtuple('Feature', ['name', 'minimum', 'maximum', 'unit'])
+
+FEATURES = (
+    Feature('Débit_Acide_m3h', 0.0, 100.0, 'm³/h'),
+    Feature('Débit_Vapeur_kgh', 0.0, 10000.0, 'kg/h'),
+    Feature('Température_Évaporateur_C', 0.0, 200.0, '°C'),
+    Feature('Vide_Bouilleur_torr', 0.0, 760.0, 'Torr'),
+)
+FEATURE_NAMES = [f.name for f in FEATURES]
+N_FEATURES = len(FEATURES)
+DTYPE = np.float64
+
+_MINIMUMS = np.array([f.minimum for f in FEATURES], dtype=DTYPE)
+_MAXIMUMS = np.array([f.maximum for f in FEATURES], dtype=DTYPE)
+
+
+# Erreur levée pour toute entrée manquante, non numérique ou hors plage
+class SchemaError(ValueError):
+    pass
+
+
+# Décodage d'une charge JSON brute (str ou bytes) ; les objets Python passent tels quels
+def _decode(payload):
+    if isinstance(payload, (bytes, bytearray, str)):
+        try:
+            return json.loads(payload)
+        except ValueError as e:
+            raise SchemaError(f"JSON invalide : {e}") from None
+    return payload
+
+
+# Validation d'une valeur scalaire pour une variable donnée
+def _check_value(feature, value, ligne=None):
+    ou = f" (ligne {ligne})" if ligne is not None else ""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise SchemaError(f"'{feature.name}'{ou} doit être un nombre, reçu : {value!r}")
+    value = float(value)
+    if not math.isfinite(value):
+        raise SchemaError(f"'{feature.name}'{ou} doit être fini (ni NaN ni infini).")
+    if value < feature.minimum or value > feature.maximum:
+        raise SchemaError(
+            f"'{feature.name}'{ou} doit être entre {feature.minimum:g} et {feature.maximum:g} {feature.unit}, reçu : {value}"
+        )
+    return value
+
+
+# Remplissage d'une ligne depuis un dict ; les clés manquantes sont toutes signalées ensemble
+def _fill_row(record, out, ligne=None):
+    if not isinstance(record, dict):
+        raise SchemaError("Chaque enregistrement doit être un objet JSON.")
+    manquantes = [f.name for f in FEATURES if f.name not in record]
+    if manquantes:
+        ou = f" (ligne {ligne})" if ligne is not None else ""
+        raise SchemaError(f"Variables manquantes{ou} : {manquantes}")
+    for i, feature in enumerate(FEATURES):
+        out[i] = _check_value(feature, record[feature.name], ligne)
+    return out
+
+
+# Construction d'une ligne float64 de forme (N_FEATURES,) à partir d'un dict ou d'un JSON
+def build_row(payload, out=None):
+    if out is None:
+        out = np.empty(N_FEATURES, dtype=DTYPE)
+    return _fill_row(_decode(payload), out)
+
+
+# Construction d'une matrice float64 (n, N_FEATURES) à partir d'une liste
+# d'enregistrements ou d'un objet de colonnes (un tableau par variable)
+def build_matrix(payload, out=None):
+    data = _decode(payload)
+    if isinstance(data, list):
+        if out is None:
+            out = np.empty((len(data), N_FEATURES), dtype=DTYPE)
+        for ligne, record in enumerate(data):
+            _fill_row(record, out[ligne], ligne)
+        return out
+    if isinstance(data, dict):
+        manquantes = [f.name for f in FEATURES if f.name not in data]
+        if manquantes:
+            raise SchemaError(f"Colonnes manquantes : {manquantes}")
+        colonnes = [data[f.name] for f in FEATURES]
+        if not all(isinstance(valeurs, list) for valeurs in colonnes):
+            raise SchemaError("Chaque colonne du lot doit être une liste de valeurs.")
+        n = len(colonnes[0])
+        if any(len(valeurs) != n for valeurs in colonnes):
+            raise SchemaError("Toutes les colonnes du lot doivent avoir la même longueur.")
+        if out is None:
+            out = np.empty((n, N_FEATURES), dtype=DTYPE)
+        for i, valeurs in enumerate(colonnes):
+            # Colonne imbriquée ou irrégulière ([[1, 2]], [1, [2]]) : refusée avant toute copie dans la matrice
+            try:
+                tableau = np.asarray(valeurs)
+            except ValueError:
+                tableau = None
+            if n and (tableau is None or tableau.ndim != 1 or tableau.shape[0] != n):
+                raise SchemaError(f"'{FEATURES[i].name}' doit être une liste plate de {n} nombres.")
+            if n and tableau.dtype.kind not in 'iuf':
+                raise SchemaError(f"'{FEATURES[i].name}' doit contenir uniquement des nombres.")
+            out[:, i] = tableau
+        return check_matrix(out)
+    raise SchemaError("Le lot doit être une liste d'enregistrements ou un objet de colonnes.")
+
+
+# Validation vectorisée d'une matrice déjà numérique (formes, valeurs finies et plages)
+def check_matrix(X):
+    if X.ndim != 2 or X.shape[1] != N_FEATURES:
+        raise SchemaError(f"La matrice doit avoir la forme (n, {N_FEATURES}).")
+    if not np.isfinite(X).all():
+        raise SchemaError("Les valeurs d'entrée doivent être finies (ni NaN ni infini).")
+    hors_plage = (X < _MINIMUMS) | (X > _MAXIMUMS)
+    if hors_plage.any():
+        ligne, colonne = np.argwhere(hors_plage)[0]
+        feature = FEATURES[colonne]
+        raise SchemaError(
+            f"'{feature.name}' (ligne {ligne}) doit être entre {feature.minimum:g} et {feature.maximum:g} {feature.unit}, reçu : {X[ligne, colonne]}"
+        )
+    return X
+
+
+# Vérification, au chargement, que le modèle (scikit-learn ou forêt compilée) attend les variables dans l'ordre du schéma
+def check_model_features(model):
+    noms = getattr(model, 'feature_names_in_', None)
+    if noms is None:
+        noms = getattr(model, 'feature_names', None)
+    if noms is not None and list(noms) != FEATURE_NAMES:
+        raise SchemaError(f"Le modèle attend {list(noms)}, le schéma déclare {FEATURE_NAMES}.")
@@ -0,0 +1,232 @@
+# Protocole binaire de l'API de prédiction sur socket Unix ou TCP (serveur : serve_socket.py) et client
+#
+# Une connexion est persistante et transporte une suite de trames ; le client peut envoyer plusieurs
+# requêtes sans attendre les réponses (pipelining), qui reviennent dans l'ordre d'envoi.
+#
+#   requête  : uint32 n (little-endian) puis n x 4 float64 little-endian (ordre du schéma)
+#   réponse  : int32 n puis n float64 little-endian
+#   erreur   : int32 négatif (-1 données invalides, -2 erreur serveur) puis uint32 longueur et message UTF-8
+#
+# Après une erreur -1 ou -2 la connexion reste utilisable ; le serveur ferme la connexion sur une trame
+# illisible (n supérieur à MAX_ROWS ou corps tronqué).
+#
+#   from inference_socket import InferenceClient
+#   with InferenceClient('/tmp/density_api.sock') as client:        # ou '127.0.0.1:5001' en TCP
+#       client.predict_one(build_row(data))
+import selectors
+import socket
+import struct
+
+import numpy as np
+
+from feature_schema import N_FEATURES, SchemaError
+
+DEFAULT_ADDRESS = '/tmp/density_api.sock'
+REQUEST_HEADER = struct.Struct('<I')
+RESPONSE_HEADER = struct.Struct('<i')
+MESSAGE_HEADER = struct.Struct('<I')
+RAW_DTYPE = np.dtype('<f8')
+ROW_BYTES = RAW_DTYPE.itemsize * N_FEATURES
+# Nombre maximal de lignes par trame (32 Mo de données)
+MAX_ROWS = 1 << 20
+STATUS_INVALID = -1
+STATUS_ERROR = -2
+
+
+# Erreur signalée par le serveur (hors données invalides, qui lèvent SchemaError)
+class RemoteError(RuntimeError):
+    pass
+
+
+# Adresse 'hôte:port' (TCP) ou chemin de socket Unix
+def parse_address(adresse):
+    hote, separateur, port = adresse.rpartition(':')
+    if separateur and port.isdigit() and '/' not in adresse:
+        return socket.AF_INET, (hote or '127.0.0.1', int(port))
+    return socket.AF_UNIX, adresse
+
+
+# Trame de requête : en-tête et matrice (n, 4) en float64 little-endian
+def encode_request(X):
+    X = np.ascontiguousarray(X, dtype=RAW_DTYPE).reshape(-1, N_FEATURES)
+    if len(X) > MAX_ROWS:
+        raise ValueError(f"Au plus {MAX_ROWS} lignes par trame, reçu : {len(X)}.")
+    return REQUEST_HEADER.pack(len(X)) + X.tobytes()
+
+
+def encode_response(predictions):
+    valeurs = np.ascontiguousarray(predictions, dtype=RAW_DTYPE)
+    return RESPONSE_HEADER.pack(len(valeurs)) + valeurs.tobytes()
+
+
+def encode_error(statut, message):
+    corps = message.encode('utf-8')
+    return RESPONSE_HEADER.pack(statut) + MESSAGE_HEADER.pack(len(corps)) + corps
+
+
+# Lecture d'exactement `taille` octets sur un flux bufferisé ; None si le flux se termine avant
+def read_exact(flux, taille):
+    donnees = flux.read(taille)
+    if donnees is None or len(donnees) < taille:
+        return None
+    return donnees
+
+
+# Décodage de la réponse qui commence à `debut` dans le tampon : (tableau (n,) ou exception, fin de la réponse),
+# ou None si elle n'est pas encore entièrement reçue
+def decode_response(tampon, debut=0):
+    if len(tampon) < debut + RESPONSE_HEADER.size:
+        return None
+    (n,) = RESPONSE_HEADER.unpack_from(tampon, debut)
+    debut += RESPONSE_HEADER.size
+    if n < 0:
+        if len(tampon) < debut + MESSAGE_HEADER.size:
+            return None
+        (longueur,) = MESSAGE_HEADER.unpack_from(tampon, debut)
+        debut += MESSAGE_HEADER.size
+        if len(tampon) < debut + longueur:
+            return None
+        message = bytes(tampon[debut:debut + longueur]).decode('utf-8', 'replace')
+        return (SchemaError(message) if n == STATUS_INVALID else RemoteError(message)), debut + longueur
+    fin = debut + n * RAW_DTYPE.itemsize
+    if len(tampon) < fin:
+        return None
+    return np.frombuffer(bytes(tampon[debut:fin]), dtype=RAW_DTYPE), fin
+
+
+# Client à connexion persistante, ouverte à la première requête et rouverte une fois si le serveur l'a fermée
+# (les prédictions sont sans effet de bord : une requête interrompue peut être renvoyée). Non partagé entre threads.
+class InferenceClient:
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5.0, window=64):
+        self.address = address
+        self.timeout = timeout
+        # Nombre de trames en vol au plus lors d'un envoi en pipeline
+        self.window = int(window)
+        self._famille, self._cible = parse_address(address)
+        self._socket = None
+        self._selecteur = None
+        self.requests = 0
+        self.reconnects = 0
+
+    def connect(self):
+        if self._socket is None:
+            s = socket.socket(self._famille, socket.SOCK_STREAM)
+            try:
+                s.settimeout(self.timeout)
+                if self._famille == socket.AF_INET:
+                    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                s.connect(self._cible)
+            except OSError:
+                s.close()
+                raise
+            self._socket = s
+            self._selecteur = selectors.DefaultSelector()
+            self._selecteur.register(s, selectors.EVENT_READ)
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            self._selecteur.close()
+            self._socket.close()
+            self._socket = None
+            self._selecteur = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Lecture des octets disponibles à la suite du tampon
+    def _recevoir(self, recu):
+        donnees = self._socket.recv(1 << 20)
+        if not donnees:
+            raise ConnectionError("Connexion fermée par le serveur.")
+        recu += donnees
+
+    # Décodage des réponses complètes du tampon (retirées du tampon), ajoutées aux résultats ; retourne la première
+    # erreur de données rencontrée (None à sa place dans les résultats)
+    @staticmethod
+    def _decoder(recu, resultats, erreur):
+        debut = 0
+        while True:
+            reponse = decode_response(recu, debut)
+            if reponse is None:
+                break
+            valeur, debut = reponse
+            if isinstance(valeur, Exception):
+                resultats.append(None)
+                erreur = erreur or valeur
+            else:
+                resultats.append(valeur)
+        del recu[:debut]
+        return erreur
+
+    # Envoi des trames (au plus `window` en vol) et lecture des réponses au fil de l'envoi, dans l'ordre : le client
+    # lit dès que le serveur répond, si bien qu'aucun des deux ne reste bloqué sur un tampon de socket plein, quelle
+    # que soit la taille des trames. Une trame seule part d'un envoi bloquant (le serveur la lit en entier avant de
+    # répondre). Une erreur de données est levée après lecture de toutes les réponses, pour laisser la connexion dans
+    # un état cohérent. Sans réponse ni place pour envoyer pendant `timeout` : socket.timeout.
+    def _echanger(self, trames):
+        resultats = []
+        erreur = None
+        recu = bytearray()
+        if len(trames) == 1:
+            self._socket.sendall(trames[0])
+            while not resultats:
+                self._recevoir(recu)
+                erreur = self._decoder(recu, resultats, erreur)
+        envoi = memoryview(b'')
+        suivante = len(resultats)
+        ecriture = False
+        while len(resultats) < len(trames):
+            if not envoi and suivante < len(trames) and suivante - len(resultats) < self.window:
+                fin = min(len(resultats) + self.window, len(trames))
+                envoi = memoryview(b''.join(trames[suivante:fin]))
+                suivante = fin
+            if ecriture != bool(envoi):
+                ecriture = bool(envoi)
+                self._selecteur.modify(self._socket, selectors.EVENT_READ | (selectors.EVENT_WRITE if ecriture else 0))
+            evenements = self._selecteur.select(self.timeout)
+            if not evenements:
+                raise socket.timeout("Délai dépassé en attente du serveur.")
+            masque = evenements[0][1]
+            if masque & selectors.EVENT_WRITE:
+                envoi = envoi[self._socket.send(envoi):]
+            if masque & selectors.EVENT_READ:
+                self._recevoir(recu)
+                erreur = self._decoder(recu, resultats, erreur)
+        if ecriture:
+            self._selecteur.modify(self._socket, selectors.EVENT_READ)
+        if erreur is not None:
+            raise erreur
+        return resultats
+
+    def _envoyer(self, trames):
+        self.connect()
+        try:
+            return self._echanger(trames)
+        except socket.timeout:
+            # Réponses en retard : la connexion est désynchronisée et abandonnée
+            self.close()
+            raise
+        except OSError:
+            # Connexion perdue (serveur redémarré, connexion inactive fermée) : une seule nouvelle tentative
+            self.close()
+            self.reconnects += 1
+            self.connect()
+            return self._echanger(trames)
+        finally:
+            self.requests += len(trames)
+
+    # Prédictions d'une matrice (n, 4) ordonnée selon le schéma
+    def predict(self, X):
+        return self._envoyer([encode_request(X)])[0]
+
+    # Prédiction d'une ligne float64 (voir feature_schema.build_row)
+    def predict_one(self, row):
+        return float(self.predict(row)[0])
+
+    # Plusieurs matrices envoyées à la suite sans attendre les réponses ; une réponse par matrice
+    def predict_pipelined(self, matrices):
+        return self._envoyer([encode_request(X) for X in matrices])
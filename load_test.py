@@ -0,0 +1,362 @@
+# Générateur de charge de l'API de prédiction : rejoue un journal de requêtes, échantillonne sensors_data.csv
+# ou synthétise des lectures, en boucle fermée (N clients concurrents) ou ouverte (débit d'arrivée fixe)
+#
+#   python load_test.py --source csv --clients 8 --duration 10
+#   python load_test.py --source replay --journal requests.jsonl --rate 200 --duration 30
+#   python load_test.py --source synth --rate 50 --batch-size 32 --output run.json
+#   python load_test.py --source csv --clients 8 --baseline run.json      # code de sortie 1 en cas de régression
+#
+# En boucle ouverte, la latence est mesurée depuis l'instant d'arrivée prévu : l'attente d'un client libre
+# est comptée, comme pour un vrai flux de capteurs qui n'attend pas la réponse précédente.
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from feature_schema import FEATURE_NAMES, FEATURES, SchemaError, build_matrix, build_row
+from inference_socket import InferenceClient, RemoteError
+
+# Plages tirées par simulate_sensors.py (régime nominal de l'unité)
+SIMULATOR_RANGES = {
+    'Débit_Acide_m3h': (29.5, 30.5),
+    'Débit_Vapeur_kgh': (3500.0, 3600.0),
+    'Température_Évaporateur_C': (92.0, 92.5),
+    'Vide_Bouilleur_torr': (58.5, 59.5),
+}
+SYNTH_ROWS = 10000
+LATENCY_QUANTILES = (50, 95, 99)
+
+
+# Lectures d'une entrée de journal : champ 'inputs' (voir request_journal.py) ou corps de requête brut ;
+# un enregistrement, une liste d'enregistrements ou un objet de colonnes
+def _lectures(entree):
+    donnees = entree.get('inputs', entree) if isinstance(entree, dict) else entree
+    if isinstance(donnees, dict) and all(isinstance(donnees.get(nom), list) for nom in FEATURE_NAMES):
+        return [dict(zip(FEATURE_NAMES, valeurs)) for valeurs in zip(*(donnees[nom] for nom in FEATURE_NAMES))]
+    if isinstance(donnees, dict):
+        return [donnees] if all(nom in donnees for nom in FEATURE_NAMES) else []
+    if isinstance(donnees, list):
+        return [ligne for ligne in donnees if isinstance(ligne, dict) and all(nom in ligne for nom in FEATURE_NAMES)]
+    return []
+
+
+# Lectures d'un journal JSONL, dans l'ordre ; les lignes sans lecture exploitable sont ignorées et comptées
+def load_journal(path):
+    lectures, ignorees = [], 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for ligne in f:
+            if not ligne.strip():
+                continue
+            try:
+                extraites = _lectures(json.loads(ligne))
+            except ValueError:
+                extraites = []
+            ignorees += not extraites
+            lectures.extend(extraites)
+    return lectures, ignorees
+
+
+def load_csv(path, seed):
+    import pandas as pd
+    lectures = pd.read_csv(path)[FEATURE_NAMES].to_dict('records')
+    random.Random(seed).shuffle(lectures)
+    return lectures
+
+
+def synthesize(ranges, n, seed):
+    rng = np.random.default_rng(seed)
+    if ranges == 'schema':
+        bornes = {f.name: (f.minimum, f.maximum) for f in FEATURES}
+    else:
+        bornes = SIMULATOR_RANGES
+    colonnes = {nom: rng.uniform(bas, haut, n).tolist() for nom, (bas, haut) in bornes.items()}
+    return [dict(zip(FEATURE_NAMES, valeurs)) for valeurs in zip(*(colonnes[nom] for nom in FEATURE_NAMES))]
+
+
+# Fabrique d'appels, une instance par thread (session HTTP ou connexion persistante) : appel(charge) retourne
+# 'ok', le code HTTP ou le nom de l'exception
+def http_caller(url, timeout):
+    session = requests.Session()
+
+    def appel(charge):
+        try:
+            reponse = session.post(url, json=charge, timeout=timeout)
+            return 'ok' if reponse.status_code == 200 else str(reponse.status_code)
+        except requests.RequestException as e:
+            return type(e).__name__
+    return appel
+
+
+def socket_caller(adresse, timeout):
+    client = InferenceClient(adresse, timeout=timeout)
+
+    def appel(charge):
+        try:
+            client.predict(build_matrix(charge) if isinstance(charge, list) else build_row(charge))
+            return 'ok'
+        except SchemaError:
+            return '400'
+        except RemoteError:
+            return '500'
+        except OSError as e:
+            return type(e).__name__
+    return appel
+
+
+# Charges envoyées dans l'ordre, en boucle : une lecture ou un lot de batch_size lectures consécutives
+class Payloads:
+    def __init__(self, lectures, batch_size=1):
+        self.lectures = lectures
+        self.batch_size = batch_size
+        self._indice = 0
+        self._verrou = threading.Lock()
+
+    def next(self):
+        with self._verrou:
+            i = self._indice
+            self._indice += self.batch_size
+        if self.batch_size == 1:
+            return self.lectures[i % len(self.lectures)]
+        return [self.lectures[(i + k) % len(self.lectures)] for k in range(self.batch_size)]
+
+
+# Résultats d'un essai : latences et issues, ajoutées depuis plusieurs threads (list.append est atomique)
+class Results:
+    def __init__(self):
+        self.latences = []
+        self.issues = []
+
+    def add(self, latence, issue):
+        self.latences.append(latence)
+        self.issues.append(issue)
+
+
+def run_closed(fabrique, charges, clients, duration, max_requests, resultats):
+    fin = time.perf_counter() + duration
+    restantes = [max_requests or float('inf')]
+    verrou = threading.Lock()
+
+    def client():
+        appel = fabrique()
+        while time.perf_counter() < fin:
+            with verrou:
+                if restantes[0] <= 0:
+                    return
+                restantes[0] -= 1
+            charge = charges.next()
+            debut = time.perf_counter()
+            issue = appel(charge)
+            resultats.add(time.perf_counter() - debut, issue)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_open(fabrique, charges, rate, duration, max_requests, resultats, max_workers, poisson, seed):
+    local = threading.local()
+    rng = random.Random(seed)
+
+    def envoyer(charge, prevu):
+        appel = getattr(local, 'appel', None)
+        if appel is None:
+            appel = local.appel = fabrique()
+        issue = appel(charge)
+        resultats.add(time.perf_counter() - prevu, issue)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executeur:
+        debut = time.perf_counter()
+        prevu = debut
+        envoyees = 0
+        while prevu < debut + duration and (not max_requests or envoyees < max_requests):
+            attente = prevu - time.perf_counter()
+            if attente > 0:
+                time.sleep(attente)
+            executeur.submit(envoyer, charges.next(), prevu)
+            envoyees += 1
+            prevu += rng.expovariate(rate) if poisson else 1.0 / rate
+
+
+# Rapport : débit, quantiles de latence et taux d'erreur
+def summarize(resultats, ecoule, parametres, batch_size):
+    ms = np.array(resultats.latences) * 1000.0
+    issues = Counter(resultats.issues)
+    n = len(ms)
+    erreurs = n - issues.get('ok', 0)
+    rapport = {
+        **parametres,
+        'requests': n,
+        'rows': n * batch_size,
+        'ok': issues.get('ok', 0),
+        'errors': erreurs,
+        'error_rate': erreurs / n if n else 0.0,
+        'errors_by_kind': {cle: valeur for cle, valeur in sorted(issues.items()) if cle != 'ok'},
+        'seconds': ecoule,
+        'throughput_rps': n / ecoule if ecoule > 0 else 0.0,
+        'rows_per_second': n * batch_size / ecoule if ecoule > 0 else 0.0,
+        'latency_ms': {
+            'mean': float(ms.mean()) if n else None,
+            **{f'p{q}': float(np.percentile(ms, q)) if n else None for q in LATENCY_QUANTILES},
+            'max': float(ms.max()) if n else None,
+        },
+    }
+    return rapport
+
+
+def _format_ms(valeur):
+    return f"{valeur:>9.2f}" if valeur is not None else f"{'-':>9}"
+
+
+def print_table(rapport):
+    latence = rapport['latency_ms']
+    charge = f"{rapport['clients']} clients" if rapport['loop'] == 'closed' else f"{rapport['rate']:g} req/s"
+    print(f"🎯 {rapport['target']} — source {rapport['source']}, boucle {rapport['loop']} ({charge}), "
+          f"lots de {rapport['batch_size']}")
+    print(f"{'requêtes':>9} {'erreurs':>8} {'taux err':>9} {'req/s':>9} {'lignes/s':>10} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print(f"{rapport['requests']:>9} {rapport['errors']:>8} {rapport['error_rate']:>9.2%} {rapport['throughput_rps']:>9.1f} "
+          f"{rapport['rows_per_second']:>10.1f} {_format_ms(latence['p50'])} {_format_ms(latence['p95'])} "
+          f"{_format_ms(latence['p99'])} {_format_ms(latence['max'])}")
+    if rapport['errors_by_kind']:
+        print(f"❌ Erreurs : {rapport['errors_by_kind']}")
+
+
+# Comparaison avec un essai de référence : régression si le débit baisse ou si p99 augmente de plus de la
+# tolérance relative, ou si le taux d'erreur augmente de plus d'un point
+def compare(rapport, reference, tolerance):
+    lignes, regressions = [], []
+    mesures = (
+        ('throughput_rps', rapport['throughput_rps'], reference['throughput_rps'], -1),
+        ('p50_ms', rapport['latency_ms']['p50'], reference['latency_ms']['p50'], 1),
+        ('p95_ms', rapport['latency_ms']['p95'], reference['latency_ms']['p95'], 1),
+        ('p99_ms', rapport['latency_ms']['p99'], reference['latency_ms']['p99'], 1),
+        ('error_rate', rapport['error_rate'], reference['error_rate'], 1),
+    )
+    for nom, valeur, base, sens in mesures:
+        if valeur is None or base is None:
+            continue
+        ecart = (valeur - base) / base if base else 0.0
+        if nom == 'error_rate':
+            regression = valeur - base > 0.01
+        elif nom in ('throughput_rps', 'p99_ms'):
+            regression = sens * ecart > tolerance
+        else:
+            regression = False
+        lignes.append((nom, base, valeur, ecart, regression))
+        if regression:
+            regressions.append(nom)
+    return lignes, regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Générateur de charge de l'API de prédiction")
+    parser.add_argument('--url', default='http://127.0.0.1:5000/predict',
+                        help="Route visée (/predict/batch par défaut si --batch-size > 1)")
+    parser.add_argument('--socket', help="Frontal binaire (chemin de socket Unix ou hôte:port) au lieu de --url")
+    parser.add_argument('--source', choices=('replay', 'csv', 'synth'), default='csv')
+    parser.add_argument('--journal', default='requests.jsonl', help="Journal JSONL rejoué (--source replay)")
+    parser.add_argument('--csv', default='sensors_data.csv')
+    parser.add_argument('--synth-ranges', choices=('simulator', 'schema'), default='simulator',
+                        help="Plages des lectures synthétiques : simulate_sensors.py ou schéma complet")
+    boucle = parser.add_mutually_exclusive_group()
+    boucle.add_argument('--clients', type=int, help="Boucle fermée : nombre de clients concurrents (8 par défaut)")
+    boucle.add_argument('--rate', type=float, help="Boucle ouverte : requêtes par seconde")
+    parser.add_argument('--poisson', action='store_true', help="Arrivées de Poisson au lieu d'un pas fixe (--rate)")
+    parser.add_argument('--max-workers', type=int, default=256, help="Requêtes simultanées au plus en boucle ouverte")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--requests', type=int, default=0, help="Nombre maximal de requêtes (0 = durée seule)")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Échauffement non mesuré (secondes)")
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="Rapport JSON sur la sortie standard au lieu du tableau")
+    parser.add_argument('--output', help="Écriture du rapport JSON dans ce fichier")
+    parser.add_argument('--baseline', help="Rapport JSON de référence à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Écart relatif toléré sur le débit et p99")
+    args = parser.parse_args(argv)
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate doit être positif")
+    if args.clients is None and args.rate is None:
+        args.clients = 8
+    if args.batch_size > 1 and args.url == parser.get_default('url'):
+        args.url = args.url + '/batch'
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.source == 'replay':
+        lectures, ignorees = load_journal(args.journal)
+        if ignorees:
+            print(f"⚠️ {ignorees} ligne(s) de {args.journal} sans lecture exploitable ignorée(s)", file=sys.stderr)
+    elif args.source == 'csv':
+        lectures = load_csv(args.csv, args.seed)
+    else:
+        lectures = synthesize(args.synth_ranges, SYNTH_ROWS, args.seed)
+    if not lectures:
+        print(f"❌ Aucune lecture à envoyer (source {args.source})", file=sys.stderr)
+        return 2
+
+    if args.socket:
+        fabrique = lambda: socket_caller(args.socket, args.timeout)
+    else:
+        fabrique = lambda: http_caller(args.url, args.timeout)
+    charges = Payloads(lectures, args.batch_size)
+    parametres = {
+        'target': args.socket or args.url,
+        'source': args.source,
+        'loop': 'closed' if args.clients else 'open',
+        'clients': args.clients,
+        'rate': args.rate,
+        'batch_size': args.batch_size,
+    }
+
+    def essai(duree, max_requetes, resultats):
+        if args.clients:
+            run_closed(fabrique, charges, args.clients, duree, max_requetes, resultats)
+        else:
+            run_open(fabrique, charges, args.rate, duree, max_requetes, resultats, args.max_workers, args.poisson, args.seed)
+
+    # Échauffement (connexions, allocations paresseuses côté serveur), hors mesure
+    if args.warmup > 0:
+        essai(args.warmup, 0, Results())
+    resultats = Results()
+    debut = time.perf_counter()
+    essai(args.duration, args.requests, resultats)
+    rapport = summarize(resultats, time.perf_counter() - debut, parametres, args.batch_size)
+
+    if args.json:
+        print(json.dumps(rapport, ensure_ascii=False))
+    else:
+        print_table(rapport)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            reference = json.load(f)
+        lignes, regressions = compare(rapport, reference, args.tolerance)
+        sortie = sys.stderr if args.json else sys.stdout
+        differents = [cle for cle in ('source', 'loop', 'clients', 'rate', 'batch_size') if reference.get(cle) != rapport[cle]]
+        if differents:
+            print(f"⚠️ Paramètres différents de la référence : {', '.join(differents)}", file=sortie)
+        print(f"{'mesure':<15} {'référence':>12} {'essai':>12} {'écart':>9}", file=sortie)
+        for nom, base, valeur, ecart, regression in lignes:
+            print(f"{nom:<15} {base:>12.4g} {valeur:>12.4g} {ecart:>+9.1%}" + ("  ⚠️ régression" if regression else ""), file=sortie)
+        if regressions:
+            print(f"❌ Régression : {', '.join(regressions)}", file=sortie)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# Métriques légères au format texte Prometheus (compteurs, jauges, histogrammes)
+#
+# Chaque série possède son propre verrou, tenu seulement le temps d'une addition : le
+# coût reste de l'ordre de la microseconde et la collecte peut rester active en charge.
+# Avec plusieurs workers (serve_api.py), chaque processus expose ses propres valeurs.
+import bisect
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes par défaut des histogrammes de latence (secondes)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquettes(noms, valeurs, extra=None):
+    paires = [f'{n}="{_echapper(v)}"' for n, v in zip(noms, valeurs)]
+    if extra:
+        paires.append(extra)
+    return '{' + ','.join(paires) + '}' if paires else ''
+
+
+def _nombre(valeur):
+    if valeur == float('inf'):
+        return '+Inf'
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+# Base commune : une série par combinaison de valeurs d'étiquettes
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._verrou = threading.Lock()
+
+    def labels(self, *valeurs):
+        serie = self._series.get(valeurs)
+        if serie is None:
+            with self._verrou:
+                serie = self._series.setdefault(valeurs, self._nouvelle_serie())
+        return serie
+
+    # Séries copiées sous le verrou : labels() peut en ajouter pendant le rendu
+    def render(self):
+        lignes = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._verrou:
+            series = list(self._series.items())
+        for valeurs, serie in sorted(series, key=lambda element: element[0]):
+            lignes.extend(self._rendre_serie(valeurs, serie))
+        return lignes
+
+
+class _Valeur:
+    def __init__(self):
+        self.valeur = 0.0
+        self._verrou = threading.Lock()
+
+    def inc(self, montant=1.0):
+        with self._verrou:
+            self.valeur += montant
+
+    def dec(self, montant=1.0):
+        with self._verrou:
+            self.valeur -= montant
+
+    def set(self, valeur):
+        self.valeur = float(valeur)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _nouvelle_serie(self):
+        return _Valeur()
+
+    def inc(self, montant=1.0):
+        self.labels().inc(montant)
+
+    def _rendre_serie(self, valeurs, serie):
+        return [f"{self.name}{_etiquettes(self.labelnames, valeurs)} {_nombre(serie.valeur)}"]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, montant=1.0):
+        self.labels().dec(montant)
+
+    def set(self, valeur):
+        self.labels().set(valeur)
+
+
+# Jauge calculée à la lecture (par exemple la mémoire du processus)
+class GaugeFunction(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, fonction):
+        super().__init__(name, documentation)
+        self.fonction = fonction
+
+    def render(self):
+        try:
+            valeur = self.fonction()
+        except Exception:
+            valeur = None
+        lignes = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if valeur is not None:
+            lignes.append(f"{self.name} {_nombre(float(valeur))}")
+        return lignes
+
+
+class _SerieHistogramme:
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self._verrou = threading.Lock()
+
+    def observe(self, valeur):
+        indice = bisect.bisect_left(self.bornes, valeur)
+        with self._verrou:
+            self.comptes[indice] += 1
+            self.somme += valeur
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _nouvelle_serie(self):
+        return _SerieHistogramme(self.buckets)
+
+    def observe(self, valeur):
+        self.labels().observe(valeur)
+
+    def _rendre_serie(self, valeurs, serie):
+        with serie._verrou:
+            comptes = list(serie.comptes)
+            somme = serie.somme
+        lignes = []
+        cumul = 0
+        for borne, compte in zip(self.buckets + (float('inf'),), comptes):
+            cumul += compte
+            le = f'le="{_nombre(float(borne))}"'
+            lignes.append(f"{self.name}_bucket{_etiquettes(self.labelnames, valeurs, le)} {cumul}")
+        lignes.append(f"{self.name}_sum{_etiquettes(self.labelnames, valeurs)} {_nombre(somme)}")
+        lignes.append(f"{self.name}_count{_etiquettes(self.labelnames, valeurs)} {cumul}")
+        return lignes
+
+
+# Registre des métriques d'un processus
+class Registry:
+    def __init__(self):
+        self._metriques = []
+
+    def register(self, metrique):
+        self._metriques.append(metrique)
+        return metrique
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def gauge_function(self, name, documentation, fonction):
+        return self.register(GaugeFunction(name, documentation, fonction))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lignes = []
+        for metrique in self._metriques:
+            lignes.extend(metrique.render())
+        return '\n'.join(lignes) + '\n'
+
+
+# Mémoire résidente du processus en octets (Linux : /proc, sinon getrusage ou psutil si disponible)
+def process_rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        import resource
+        # ru_maxrss est le pic (en Ko sous Linux, en octets sous macOS)
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pic if sys.platform == 'darwin' else pic * 1024
+    except ImportError:
+        return None
+
+
+# Type MIME du format texte Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# Exposition de /metrics (registre au format Prometheus) et /stats (JSON de stats(), si fourni) dans un thread
+def serve(port, registry, stats=None, name='metrics'):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                corps, type_ = registry.render().encode('utf-8'), CONTENT_TYPE
+            elif self.path == '/stats' and stats is not None:
+                corps, type_ = json.dumps(stats()).encode('utf-8'), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', type_)
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    threading.Thread(target=serveur.serve_forever, name=name, daemon=True).start()
+    return serveur
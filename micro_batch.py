@@ -0,0 +1,117 @@
+# Regroupement (micro-batching) de requêtes unitaires concurrentes en un seul appel vectorisé
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    # fonction_lot reçoit une liste d'éléments et retourne une séquence de résultats dans le même ordre
+    def __init__(self, fonction_lot, max_rows=64, max_wait_ms=2.0, name="micro-batch"):
+        if max_rows < 1:
+            raise ValueError("max_rows doit être supérieur ou égal à 1.")
+        self.fonction_lot = fonction_lot
+        self.max_rows = int(max_rows)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self._file = queue.Queue()
+        self._arret = threading.Event()
+        # Statistiques mises à jour par le thread de traitement sous _verrou, lues par stats() depuis d'autres threads
+        self._verrou = threading.Lock()
+        self._nb_lots = 0
+        self._nb_lignes = 0
+        self._taille_max_observee = 0
+        self._profondeur_max = 0
+        self._raisons = {'taille': 0, 'delai': 0}
+        self._tailles = {}
+        # Thread démon chargé de vider la file et d'appeler le modèle
+        self._thread = threading.Thread(target=self._boucle, name=name, daemon=True)
+        self._thread.start()
+
+    # Ajout d'un élément dans la file ; le résultat est livré via un Future
+    def submit(self, item):
+        if self._arret.is_set():
+            raise RuntimeError("Le micro-batcher est arrêté.")
+        future = Future()
+        self._file.put((item, future))
+        return future
+
+    # Version bloquante : attend le résultat de l'élément soumis
+    def predict(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    # Boucle du thread de traitement : collecte jusqu'à max_rows éléments ou jusqu'à expiration de la fenêtre
+    def _boucle(self):
+        while not self._arret.is_set():
+            try:
+                premier = self._file.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            lot = [premier]
+            self._profondeur_max = max(self._profondeur_max, self._file.qsize() + 1)
+            echeance = time.perf_counter() + self.max_wait
+            raison = 'delai'
+            while len(lot) < self.max_rows:
+                restant = echeance - time.perf_counter()
+                try:
+                    lot.append(self._file.get(timeout=restant) if restant > 0 else self._file.get_nowait())
+                except queue.Empty:
+                    break
+            if len(lot) >= self.max_rows:
+                raison = 'taille'
+            self._traiter(lot, raison)
+
+    # Appel unique de la fonction vectorisée puis distribution des résultats à chaque appelant
+    # (statistiques à jour avant la livraison des résultats)
+    def _traiter(self, lot, raison):
+        items = [item for item, _ in lot]
+        erreur = None
+        try:
+            resultats = self.fonction_lot(items)
+            if len(resultats) != len(items):
+                raise RuntimeError(f"{len(resultats)} résultats pour {len(items)} éléments.")
+        except Exception as e:
+            erreur = e
+        taille = len(lot)
+        with self._verrou:
+            self._nb_lots += 1
+            self._nb_lignes += taille
+            self._taille_max_observee = max(self._taille_max_observee, taille)
+            self._raisons[raison] += 1
+            self._tailles[taille] = self._tailles.get(taille, 0) + 1
+        if erreur is not None:
+            for _, future in lot:
+                future.set_exception(erreur)
+        else:
+            for (_, future), resultat in zip(lot, resultats):
+                future.set_result(resultat)
+
+    # Instantané des statistiques de file et de taille des lots
+    def stats(self):
+        with self._verrou:
+            nb_lots, nb_lignes, taille_max = self._nb_lots, self._nb_lignes, self._taille_max_observee
+            tailles, raisons = dict(self._tailles), dict(self._raisons)
+        return {
+            'max_rows': self.max_rows,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': self._file.qsize(),
+            'queue_depth_max': self._profondeur_max,
+            'batches': nb_lots,
+            'rows': nb_lignes,
+            'batch_size_mean': nb_lignes / nb_lots if nb_lots else 0.0,
+            'batch_size_max': taille_max,
+            'batch_size_histogram': dict(sorted(tailles.items())),
+            'flush_reasons': raisons,
+        }
+
+    # Arrêt du thread de traitement ; les éléments restants sont traités avant la sortie
+    def close(self, timeout=1.0):
+        self._arret.set()
+        self._thread.join(timeout)
+        restants = []
+        while True:
+            try:
+                restants.append(self._file.get_nowait())
+            except queue.Empty:
+                break
+        if restants:
+            self._traiter(restants, 'delai')
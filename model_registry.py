@@ -0,0 +1,246 @@
+# Registre multi-modèles : un modèle par unité de concentration et par version, chargé à la première
+# utilisation et gardé en mémoire dans une limite de nombre de modèles et d'octets (éviction LRU)
+#
+#   models/<unité>/<version>/modele_final.pkl + y_mean.txt   (ou modele_final_arrays/, voir fast_forest.py)
+#   models/<unité>/active   nom de la version servie (à défaut : la dernière version par ordre alphabétique)
+#   models/<unité>/shadow   version candidate notée en parallèle de la version servie (optionnel)
+#
+# Changer de version revient à réécrire le fichier `active` : la nouvelle version est chargée à la première
+# requête et l'ancienne sort du registre par éviction LRU.
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+MODELS_DIR = 'models'
+
+
+# Unité ou version inconnue (réponse HTTP 404)
+class UnknownModel(LookupError):
+    pass
+
+
+# Empreinte mémoire estimée d'un modèle chargé : tableaux de la forêt compilée et arbres scikit-learn
+# (pipeline dont la forêt est la dernière étape, ou forêt seule)
+def estimate_nbytes(modele):
+    total = 0
+    if modele.forest is not None:
+        total += sum(getattr(modele.forest, nom).nbytes for nom in ('feature', 'threshold', 'left', 'right', 'value', 'roots'))
+    if modele.model is not None:
+        etapes = getattr(modele.model, 'steps', None)
+        rf = etapes[-1][1] if etapes else modele.model
+        for estimateur in getattr(rf, 'estimators_', ()):
+            etat = estimateur.tree_.__getstate__()
+            total += etat['nodes'].nbytes + etat['values'].nbytes
+    return total
+
+
+# Un nom d'unité ou de version est un simple nom de répertoire
+def _nom_valide(nom):
+    return bool(nom) and nom not in ('.', '..') and not nom.startswith('.') and os.sep not in nom and '/' not in nom
+
+
+def _lire_nom(chemin):
+    try:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+# loader(répertoire, version) retourne un LoadedModel prêt à servir (chargé et préchauffé).
+# on_load(unité, version, modèle) et on_evict(unité, version, modèle) sont appelés hors verrou.
+class ModelRegistry:
+    def __init__(self, loader, root=MODELS_DIR, max_models=4, max_bytes=0, check_interval=1.0,
+                 on_load=None, on_evict=None):
+        if max_models < 1:
+            raise ValueError("max_models doit être supérieur ou égal à 1.")
+        self._loader = loader
+        self.root = root
+        self.max_models = int(max_models)
+        self.max_bytes = int(max_bytes)
+        self.check_interval = float(check_interval)
+        self.on_load = on_load
+        self.on_evict = on_evict
+        self._modeles = OrderedDict()
+        self._octets = {}
+        self._verrou = threading.Lock()
+        self._chargements = {}
+        # Versions active et candidate de chaque unité, relues au plus une fois par intervalle
+        self._resolutions = {}
+        self.hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+
+    # Versions disponibles d'une unité, par ordre alphabétique
+    def versions(self, unit):
+        repertoire = os.path.join(self.root, unit)
+        if not _nom_valide(unit) or not os.path.isdir(repertoire):
+            raise UnknownModel(f"Unité inconnue : {unit}")
+        return sorted(nom for nom in os.listdir(repertoire)
+                      if _nom_valide(nom) and os.path.isdir(os.path.join(repertoire, nom)))
+
+    def units(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(nom for nom in os.listdir(self.root) if _nom_valide(nom) and os.path.isdir(os.path.join(self.root, nom)))
+
+    # (version active, version candidate ou None) d'une unité
+    def resolve(self, unit):
+        maintenant = time.monotonic()
+        resolution = self._resolutions.get(unit)
+        if resolution is not None and resolution[2] > maintenant:
+            return resolution[0], resolution[1]
+        versions = self.versions(unit)
+        active = _lire_nom(os.path.join(self.root, unit, 'active')) or (versions[-1] if versions else None)
+        if active is None:
+            raise UnknownModel(f"Aucune version disponible pour l'unité {unit}")
+        shadow = _lire_nom(os.path.join(self.root, unit, 'shadow'))
+        if shadow == active:
+            shadow = None
+        self._resolutions[unit] = (active, shadow, maintenant + self.check_interval)
+        return active, shadow
+
+    # Modèle d'une unité (version active par défaut), chargé s'il n'est pas déjà en mémoire.
+    # Les chargements d'un même modèle sont sérialisés ; les autres modèles restent servis pendant ce temps.
+    # Le verrou de chargement est retiré dans tous les cas (version inconnue ou échec compris) : les noms d'unités
+    # venus de l'extérieur (topics MQTT, URL) ne laissent rien derrière eux.
+    def get(self, unit, version=None):
+        if version is None:
+            version = self.resolve(unit)[0]
+        cle = (unit, version)
+        with self._verrou:
+            modele = self._modeles.get(cle)
+            if modele is not None:
+                self._modeles.move_to_end(cle)
+                self.hits += 1
+                return modele
+            verrou_cle = self._chargements.setdefault(cle, threading.Lock())
+        with verrou_cle:
+            try:
+                with self._verrou:
+                    modele = self._modeles.get(cle)
+                    if modele is not None:
+                        self._modeles.move_to_end(cle)
+                        self.hits += 1
+                        return modele
+                repertoire = os.path.join(self.root, unit, version)
+                if not (_nom_valide(unit) and _nom_valide(version) and os.path.isdir(repertoire)):
+                    raise UnknownModel(f"Version inconnue : {unit}/{version}")
+                try:
+                    modele = self._loader(repertoire, version)
+                except Exception:
+                    with self._verrou:
+                        self.load_failures += 1
+                    raise
+                octets = estimate_nbytes(modele)
+                with self._verrou:
+                    self._modeles[cle] = modele
+                    self._octets[cle] = octets
+                    self.loads += 1
+                    evinces = self._evincer()
+            finally:
+                with self._verrou:
+                    if self._chargements.get(cle) is verrou_cle:
+                        del self._chargements[cle]
+        if self.on_load is not None:
+            self.on_load(unit, version, modele)
+        for (unite, version_evincee), ancien in evinces:
+            if self.on_evict is not None:
+                self.on_evict(unite, version_evincee, ancien)
+        return modele
+
+    # Éviction des modèles les moins récemment utilisés (le dernier chargé est toujours conservé)
+    def _evincer(self):
+        evinces = []
+        while len(self._modeles) > 1 and (
+                len(self._modeles) > self.max_models
+                or (self.max_bytes and sum(self._octets.values()) > self.max_bytes)):
+            cle, modele = self._modeles.popitem(last=False)
+            self._octets.pop(cle, None)
+            self.evictions += 1
+            evinces.append((cle, modele))
+        return evinces
+
+    @property
+    def resident_bytes(self):
+        return sum(self._octets.values())
+
+    def __len__(self):
+        return len(self._modeles)
+
+    # Dans un processus enfant (fork) : verrous neufs
+    def after_fork(self):
+        self._verrou = threading.Lock()
+        self._chargements = {}
+
+    # État exposé à l'exécution
+    def stats(self):
+        with self._verrou:
+            residents = [
+                {'unit': unite, 'version': version, 'bytes': self._octets.get((unite, version), 0), **modele.describe()}
+                for (unite, version), modele in self._modeles.items()
+            ]
+        return {
+            'root': self.root,
+            'max_models': self.max_models,
+            'max_bytes': self.max_bytes,
+            'resident': len(residents),
+            'resident_bytes': sum(r['bytes'] for r in residents),
+            'models': residents,
+            'hits': self.hits,
+            'loads': self.loads,
+            'load_failures': self.load_failures,
+            'evictions': self.evictions,
+        }
+
+
+# Notation différée (mode shadow) : fonction(*arguments) est exécutée par un thread dédié, hors du chemin
+# de la réponse. La file est bornée : quand elle est pleine, les éléments sont abandonnés et comptés.
+class ShadowScorer:
+    def __init__(self, fonction, max_queue=1024, name='shadow'):
+        self.fonction = fonction
+        self.max_queue = int(max_queue)
+        self.name = name
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self._demarrer()
+
+    def _demarrer(self):
+        self._file = queue.Queue(self.max_queue)
+        self._thread = threading.Thread(target=self._boucle, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, *arguments):
+        try:
+            self._file.put_nowait(arguments)
+            self.submitted += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _boucle(self):
+        while True:
+            arguments = self._file.get()
+            try:
+                self.fonction(*arguments)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Notation shadow : {e}")
+
+    # Les threads ne survivent pas à un fork : file et thread neufs dans l'enfant
+    def after_fork(self):
+        self._demarrer()
+
+    def stats(self):
+        return {
+            'queue_depth': self._file.qsize(),
+            'max_queue': self.max_queue,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'errors': self.errors,
+        }
@@ -0,0 +1,221 @@
+# Modèle servi par l'API : chargement en arrière-plan, préchauffage puis remplacement atomique
+#
+# Le modèle courant est un objet LoadedModel immuable, remplacé en une seule affectation : chaque
+# requête lit `store.current` une fois au début et termine sur ce modèle, même si un rechargement
+# a lieu pendant son traitement. Pendant un rechargement, l'ancien et le nouveau modèle coexistent
+# en mémoire ; l'ancien est libéré quand plus aucune requête ne le référence.
+#
+# Durée d'un remplacement (last_swap_seconds) : du début du chargement à la première requête notée par le
+# nouveau modèle (signalée par mark_served), donc chargement, préchauffage, remplacement et première requête.
+import hashlib
+import os
+import threading
+import time
+
+
+# Version d'un modèle : empreinte courte du contenu de ses fichiers sources
+def file_version(paths, taille_bloc=1 << 20):
+    empreinte = hashlib.sha256()
+    for chemin in paths:
+        with open(chemin, 'rb') as f:
+            for bloc in iter(lambda: f.read(taille_bloc), b''):
+                empreinte.update(bloc)
+    return empreinte.hexdigest()[:12]
+
+
+# Date de modification et taille des fichiers (None si absent)
+def files_signature(paths):
+    signature = []
+    for chemin in paths:
+        try:
+            etat = os.stat(chemin)
+            signature.append((etat.st_mtime_ns, etat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+# Aucun modèle en service : premier chargement en cours ou en échec (réponse HTTP 503)
+class ModelNotReady(RuntimeError):
+    pass
+
+
+# Modèle chargé : estimateur scikit-learn et/ou forêt compilée, y_mean et caches propres à cette version
+class LoadedModel:
+    def __init__(self, version, model=None, forest=None, y_mean=0.0, region_cache=None, quantized_cache=None,
+                 load_seconds=0.0, sources=()):
+        self.version = version
+        self.model = model
+        self.forest = forest
+        self.y_mean = y_mean
+        self.region_cache = region_cache
+        self.quantized_cache = quantized_cache
+        self.load_seconds = load_seconds
+        self.warmup_seconds = 0.0
+        # Bilan du préchauffage (lignes, tours, latence du premier appel et en régime établi)
+        self.warmup = {}
+        self.sources = tuple(sources)
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'engine': 'sklearn' if self.forest is None else 'fast_forest',
+            'y_mean': self.y_mean,
+            'sources': list(self.sources),
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'warmup': self.warmup,
+        }
+
+
+# Magasin du modèle courant. loader() retourne un LoadedModel ; warmup(modele) le prépare et lève une
+# exception s'il est inutilisable (le modèle courant est alors conservé) ; on_swap(ancien, nouveau, raison)
+# est appelé après chaque remplacement et on_failure(exception, raison) après chaque échec.
+class ModelStore:
+    def __init__(self, loader, warmup=None, watch_files=(), on_swap=None, on_failure=None):
+        self._loader = loader
+        self._warmup = warmup
+        self.watch_files = tuple(watch_files)
+        self.on_swap = on_swap
+        self.on_failure = on_failure
+        self.current = None
+        self._verrou = threading.Lock()
+        self._signature = None
+        self._arret = threading.Event()
+        self._veilleur = None
+        self._intervalle = 2.0
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        # None tant qu'aucun nouveau modèle n'a noté de requête
+        self.last_swap_seconds = None
+        # (modèle remplaçant, début de son chargement) en attente de sa première requête
+        self._premiere_requete = None
+
+    @property
+    def loading(self):
+        return self._verrou.locked()
+
+    # Modèle courant, ou ModelNotReady tant qu'aucun chargement n'a abouti
+    def require(self):
+        modele = self.current
+        if modele is None:
+            if self.last_error is not None and not self.loading:
+                raise ModelNotReady(f"Aucun modèle en service : {self.last_error}")
+            raise ModelNotReady("Modèle en cours de chargement.")
+        return modele
+
+    # Chargement, préchauffage et remplacement, dans le thread appelant (après un éventuel chargement en cours) ;
+    # retourne le nouveau modèle. En cas d'échec l'exception est propagée et le modèle courant reste en service.
+    def load(self, raison='démarrage'):
+        self._verrou.acquire()
+        return self._charger(raison)
+
+    # Chargement verrou pris ; le verrou est libéré avant on_swap
+    def _charger(self, raison):
+        try:
+            debut = time.perf_counter()
+            signature = files_signature(self.watch_files)
+            try:
+                nouveau = self._loader()
+                if self._warmup is not None:
+                    debut_prechauffage = time.perf_counter()
+                    self._warmup(nouveau)
+                    nouveau.warmup_seconds = time.perf_counter() - debut_prechauffage
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._signature = signature
+                if self.on_failure is not None:
+                    self.on_failure(e, raison)
+                raise
+            self._premiere_requete = (nouveau, debut)
+            ancien, self.current = self.current, nouveau
+            self._signature = signature
+            self.last_error = None
+            if ancien is not None:
+                self.reloads += 1
+        finally:
+            self._verrou.release()
+        if self.on_swap is not None:
+            self.on_swap(ancien, nouveau, raison)
+        return nouveau
+
+    # Rechargement dans un thread ; retourne False si un chargement est déjà en cours. Le verrou est pris ici
+    # (sans attente) : deux demandes simultanées ne peuvent pas lancer deux chargements
+    def reload_async(self, raison='admin'):
+        if not self._verrou.acquire(blocking=False):
+            return False
+        try:
+            threading.Thread(target=self._recharger, args=(raison,), name='model-reload', daemon=True).start()
+        except BaseException:
+            self._verrou.release()
+            raise
+        return True
+
+    # Rechargement en arrière-plan, verrou déjà pris : l'échec est signalé par on_failure et le modèle courant
+    # reste en service
+    def _recharger(self, raison):
+        try:
+            self._charger(raison)
+        except Exception:
+            pass
+
+    # Signalement d'une requête notée par modele : la première notée par un nouveau modèle fixe last_swap_seconds
+    def mark_served(self, modele):
+        attente = self._premiere_requete
+        if attente is not None and attente[0] is modele:
+            self._premiere_requete = None
+            self.last_swap_seconds = time.perf_counter() - attente[1]
+
+    # Surveillance des fichiers du modèle : rechargement quand leur signature a changé et est restée
+    # identique sur deux relevés consécutifs (fichier entièrement écrit)
+    def watch(self, interval=2.0):
+        if self._veilleur is not None and self._veilleur.is_alive():
+            return
+        self._arret.clear()
+        self._intervalle = float(interval)
+        self._veilleur = threading.Thread(target=self._surveiller, args=(self._intervalle,), name='model-watch', daemon=True)
+        self._veilleur.start()
+
+    def _surveiller(self, interval):
+        candidate = None
+        while not self._arret.wait(interval):
+            signature = files_signature(self.watch_files)
+            if signature == self._signature or None in signature:
+                candidate = None
+                continue
+            if signature != candidate:
+                candidate = signature
+                continue
+            candidate = None
+            try:
+                self.load('fichiers modifiés')
+            except Exception:
+                pass
+
+    def stop(self):
+        self._arret.set()
+
+    # Dans un processus enfant (fork) : verrou et événement neufs, et surveillance relancée si elle était demandée
+    def after_fork(self):
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        if self._veilleur is not None:
+            self._veilleur = None
+            self.watch(self._intervalle)
+
+    # État exposé à l'exécution
+    def stats(self):
+        return {
+            'current': self.current.describe() if self.current is not None else None,
+            'ready': self.current is not None,
+            'loading': self.loading,
+            'watching': self._veilleur is not None and self._veilleur.is_alive(),
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_swap_seconds': self.last_swap_seconds,
+        }
@@ -1,11 +1,45 @@
 # Importation de la bibliothèque paho.mqtt.client pour gérer les communications MQTT
 import paho.mqtt.client as mqtt
 import json
-# Importation de la bibliothèque requests pour effectuer des requêtes HTTP vers l'API
-import requests
+import os
+import threading
+import time
+from urllib.parse import quote
+import numpy as np
+from api_client import ApiClient, CircuitBreaker
+from fast_forest import ARTIFACT_DIR, load_artifact, load_fast_forest
+from feature_schema import FEATURE_NAMES, SchemaError, build_row, check_model_features
+from inference_socket import InferenceClient, RemoteError
+from micro_batch import MicroBatcher
+from model_registry import ModelRegistry, UnknownModel
+from model_store import LoadedModel, file_version
+from prediction_cache import MODEL_FILES, QuantizedCache, parse_resolutions
 
 # Définition de l'URL de l'API Flask pour les prédictions
 API_URL = "http://127.0.0.1:5000/predict"
+# Routes par unité de l'API ('/units/<unité>/predict' et '/units/<unité>/predict/batch')
+UNITS_URL = API_URL.rsplit('/', 1)[0] + '/units/'
+
+# URL de prédiction d'une unité ('' : modèle par défaut de l'API)
+def url_unite(unite, suffixe=''):
+    return f"{UNITS_URL}{quote(unite, safe='')}/predict{suffixe}" if unite else API_URL + suffixe
+
+# Client HTTP de l'API : connexions keep-alive réutilisées, délais de connexion et de lecture, nouvelles tentatives
+# à délai exponentiel et disjoncteur (voir api_client.py) ; compteurs affichés toutes les LISTENER_HTTP_STATS_EVERY requêtes
+api_client = ApiClient(
+    API_URL,
+    connect_timeout=float(os.environ.get('LISTENER_CONNECT_TIMEOUT_MS', '500')) / 1000,
+    read_timeout=float(os.environ.get('LISTENER_READ_TIMEOUT_MS', '2000')) / 1000,
+    retries=int(os.environ.get('LISTENER_RETRIES', '2')),
+    backoff=float(os.environ.get('LISTENER_BACKOFF_MS', '50')) / 1000,
+    backoff_max=float(os.environ.get('LISTENER_BACKOFF_MAX_MS', '1000')) / 1000,
+    pool_size=int(os.environ.get('LISTENER_POOL_SIZE', os.environ.get('LISTENER_WORKERS', '8'))),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('LISTENER_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.environ.get('LISTENER_BREAKER_RESET_S', '10')),
+    ),
+)
+HTTP_STATS_EVERY = int(os.environ.get('LISTENER_HTTP_STATS_EVERY', '100'))
 
 # Définition de l'adresse du broker MQTT (local)
 MQTT_BROKER = "localhost"
@@ -13,15 +47,332 @@ MQTT_BROKER = "localhost"
 # Définition du port du broker MQTT (port standard pour MQTT)
 MQTT_PORT = 1883
 
-# Définition du topic MQTT où les prédictions seront publiées
-PREDICTION_TOPIC = "emaphos/predictions"
+# Topic des lectures capteurs ; LISTENER_TOPIC=emaphos/+/sensors reçoit les lectures de toutes les unités (un '+'
+# par niveau d'arborescence, '#' refusé). L'unité est le ou les segments désignés par '+'.
+SENSOR_TOPIC = os.environ.get('LISTENER_TOPIC', 'emaphos/sensors')
+
+# Définition du topic MQTT où les prédictions seront publiées ; avec des '+', ils sont remplacés par l'unité de la
+# lecture (par défaut emaphos/+/sensors → emaphos/<unité>/predictions)
+PREDICTION_TOPIC = os.environ.get(
+    'LISTENER_PREDICTION_TOPIC',
+    SENSOR_TOPIC.rsplit('/', 1)[0] + '/predictions' if '+' in SENSOR_TOPIC else 'emaphos/predictions')
+if '#' in SENSOR_TOPIC or PREDICTION_TOPIC.count('+') not in (0, SENSOR_TOPIC.count('+')):
+    raise ValueError(f"Topics incompatibles : {SENSOR_TOPIC} → {PREDICTION_TOPIC} (un '+' par '+' du topic des "
+                     f"lectures, ou aucun ; '#' non pris en charge)")
+# Positions des '+' dans le topic des lectures
+_JOKERS = [i for i, segment in enumerate(SENSOR_TOPIC.split('/')) if segment == '+']
+
+# Unité d'un topic de lecture ('' sans '+') : segments désignés par '+', joints par '/'
+def unite_du_topic(topic):
+    segments = topic.split('/')
+    return '/'.join(segments[i] for i in _JOKERS if i < len(segments))
+
+# Topic de publication de la prédiction d'une unité
+def topic_prediction(unite):
+    if '+' not in PREDICTION_TOPIC:
+        return PREDICTION_TOPIC
+    valeurs = iter(unite.split('/'))
+    return '/'.join(next(valeurs, '_') if segment == '+' else segment for segment in PREDICTION_TOPIC.split('/'))
+
+# Bande d'incertitude optionnelle (LISTENER_UNCERTAINTY=1, API démarrée avec API_UNCERTAINTY=1) : l'écart-type et
+# les quantiles entre arbres sont publiés avec 'Densité_Sortie' ('Densité_Sortie_std', 'Densité_Sortie_quantiles')
+UNCERTAINTY_ENABLED = os.environ.get('LISTENER_UNCERTAINTY', '0') == '1'
+API_PARAMS = {'uncertainty': '1'} if UNCERTAINTY_ENABLED else None
+if UNCERTAINTY_ENABLED and os.environ.get('LISTENER_UNCERTAINTY_QUANTILES'):
+    API_PARAMS['quantiles'] = os.environ['LISTENER_UNCERTAINTY_QUANTILES']
+
+# Frontal binaire optionnel (LISTENER_SOCKET=/tmp/density_api.sock ou hôte:port, API lancée par serve_socket.py) :
+# les lectures passent par une connexion persistante au lieu de HTTP + JSON ; la réponse publiée garde la clé
+# 'Densité_Sortie' (sans 'model_version'). La bande d'incertitude n'est disponible que par HTTP.
+SOCKET_ADDRESS = os.environ.get('LISTENER_SOCKET', '')
+socket_client = InferenceClient(SOCKET_ADDRESS) if SOCKET_ADDRESS else None
+if socket_client is not None and UNCERTAINTY_ENABLED:
+    print("⚠️ LISTENER_UNCERTAINTY ignoré : le frontal binaire ne renvoie que la prédiction.")
+
+# Une connexion au frontal par thread (un InferenceClient n'est pas partagé entre threads, et async_listener.py
+# prédit depuis plusieurs threads) ; socket_client donne l'adresse et le délai
+_connexions = threading.local()
+
+def connexion_socket():
+    connexion = getattr(_connexions, 'client', None)
+    if connexion is None or connexion.address != socket_client.address:
+        connexion = _connexions.client = InferenceClient(socket_client.address, timeout=socket_client.timeout)
+    return connexion
+
+# Prédiction par le frontal binaire (modèle par défaut uniquement : le protocole ne porte pas d'unité) ;
+# retourne (résultat publié, succès)
+def predire_socket(data):
+    try:
+        return {'Densité_Sortie': connexion_socket().predict_one(build_row(data))}, True
+    except (SchemaError, RemoteError) as e:
+        return {'error': str(e)}, False
+
+# Mode embarqué optionnel (LISTENER_EMBEDDED=1) : le listener charge lui-même modele_final.pkl et y_mean.txt, compilés
+# en FastForest (identique bit à bit au modèle), ou l'artefact LISTENER_MODEL_ARTIFACT, et prédit sans aller-retour
+# HTTP ni double encodage JSON. La réponse publiée a la même forme que celle de l'API ('Densité_Sortie',
+# 'model_version', bande d'incertitude avec LISTENER_UNCERTAINTY=1). L'API reste le recours si le chargement échoue
+# ou si une prédiction lève une erreur autre qu'une lecture invalide.
+# Avec LISTENER_UNIT_MODELS=1, les lectures d'une unité (topics à '+') sont notées par le modèle de l'unité, chargé à
+# la première lecture depuis LISTENER_MODELS_DIR (même arborescence que le registre de l'API, voir model_registry.py,
+# au plus LISTENER_REGISTRY_MAX_MODELS en mémoire), sinon par la route '/units/<unité>/predict' de l'API.
+EMBEDDED_ENABLED = os.environ.get('LISTENER_EMBEDDED', '0') == '1'
+MODEL_ARTIFACT = os.environ.get('LISTENER_MODEL_ARTIFACT', '')
+UNCERTAINTY_QUANTILES = [float(q) for q in os.environ.get('LISTENER_UNCERTAINTY_QUANTILES', '0.05,0.95').split(',') if q.strip()]
+# Forêt et version du modèle embarqué (chargés par charger_modele_embarque)
+forest = None
+model_version = None
+# Nombre de prédictions embarquées en échec repassées par l'API
+fallbacks = 0
+
+# Chargement du modèle embarqué ; en cas d'échec, les lectures continuent de passer par l'API
+def charger_modele_embarque():
+    global forest, model_version
+    try:
+        if MODEL_ARTIFACT:
+            forest = load_artifact(MODEL_ARTIFACT)
+            sources = [os.path.join(MODEL_ARTIFACT, nom) for nom in sorted(os.listdir(MODEL_ARTIFACT))]
+        else:
+            forest = load_fast_forest(*MODEL_FILES)
+            sources = MODEL_FILES
+        check_model_features(forest)
+        model_version = file_version(sources)
+        print(f"✅ Modèle embarqué {model_version} : {forest.n_trees} arbres, prédictions sans appel API")
+    except Exception as e:
+        forest = None
+        print(f"⚠️ Modèle embarqué indisponible ({e}) : prédictions par l'API")
+
+# Chargement de la version d'une unité (artefact modele_final_arrays/ ou modele_final.pkl + y_mean.txt) en FastForest
+def charger_modele_unite(repertoire, version):
+    debut = time.perf_counter()
+    artefact = os.path.join(repertoire, ARTIFACT_DIR)
+    if os.path.isdir(artefact):
+        foret = load_artifact(artefact, check_sources=False)
+        sources = [os.path.join(artefact, nom) for nom in sorted(os.listdir(artefact))]
+    else:
+        sources = [os.path.join(repertoire, nom) for nom in MODEL_FILES]
+        foret = load_fast_forest(*sources)
+    check_model_features(foret)
+    print(f"✅ Modèle embarqué {repertoire} : {foret.n_trees} arbres")
+    return LoadedModel(version, forest=foret, y_mean=foret.y_mean, load_seconds=time.perf_counter() - debut, sources=sources)
+
+unit_models = ModelRegistry(
+    charger_modele_unite,
+    root=os.environ.get('LISTENER_MODELS_DIR', 'models'),
+    max_models=int(os.environ.get('LISTENER_REGISTRY_MAX_MODELS', '4')),
+)
+
+# Modèles par unité optionnels (LISTENER_UNIT_MODELS=1) : sans cette option, ou pour une unité sans modèle (absente de
+# LISTENER_MODELS_DIR, ou 404 de l'API), la lecture est notée par le modèle par défaut. Une unité sans modèle n'est
+# recherchée à nouveau qu'après LISTENER_UNIT_RETRY_S secondes.
+UNIT_MODELS_ENABLED = os.environ.get('LISTENER_UNIT_MODELS', '0') == '1'
+UNIT_RETRY_S = float(os.environ.get('LISTENER_UNIT_RETRY_S', '30'))
+_sans_modele = {}
+
+# Unité dont le modèle note la lecture ('' : modèle par défaut)
+def unite_notee(unite):
+    if not (UNIT_MODELS_ENABLED and unite):
+        return ''
+    echeance = _sans_modele.get(unite)
+    if echeance is None:
+        return unite
+    if echeance > time.monotonic():
+        return ''
+    _sans_modele.pop(unite, None)
+    return unite
+
+def noter_sans_modele(unite):
+    if unite not in _sans_modele:
+        print(f"⚠️ Aucun modèle pour l'unité {unite} : modèle par défaut")
+    _sans_modele[unite] = time.monotonic() + UNIT_RETRY_S
+
+# Forêt, version et unité notant une lecture ('' : modèle embarqué par défaut, aussi pour une unité sans modèle)
+def modele_embarque(unite):
+    if unite:
+        try:
+            modele = unit_models.get(unite)
+            return modele.forest, modele.version, unite
+        except UnknownModel:
+            noter_sans_modele(unite)
+    return forest, model_version, ''
+
+# Résultat publié pour une prédiction embarquée, de la même forme que la réponse de l'API
+def resultat_embarque(moyenne, ecart=None, bornes=None, version=None, unite=''):
+    result = {'Densité_Sortie': float(moyenne), 'model_version': version or model_version}
+    if unite:
+        result['unit'] = unite
+    if ecart is not None:
+        result['Densité_Sortie_std'] = float(ecart)
+        result['Densité_Sortie_quantiles'] = {f'{q:g}': float(b) for q, b in zip(UNCERTAINTY_QUANTILES, bornes)}
+    return result
+
+# Prédiction par le modèle embarqué de l'unité ; retourne (résultat publié, succès) comme l'API
+def predire_embarque(data, unite=''):
+    try:
+        row = build_row(data)
+    except SchemaError as e:
+        return {'error': str(e)}, False
+    foret, version, unite = modele_embarque(unite)
+    if UNCERTAINTY_ENABLED:
+        return resultat_embarque(*foret.predict_uncertainty(row, UNCERTAINTY_QUANTILES), version=version, unite=unite), True
+    return resultat_embarque(foret.predict_one(row), version=version, unite=unite), True
+
+# Prédiction par l'API Flask (requête POST, réponse JSON), sur la route de l'unité s'il y en a une (404 : unité sans
+# modèle, route par défaut)
+def predire_http(data, unite=''):
+    response = api_client.post(json=data, params=API_PARAMS, url=url_unite(unite))
+    if unite and response.status_code == 404:
+        noter_sans_modele(unite)
+        response = api_client.post(json=data, params=API_PARAMS)
+    if api_client.requests % HTTP_STATS_EVERY == 0:
+        print(f"Statistiques du client HTTP : {api_client.stats()}")
+    return response.json(), response.ok
+
+# Prédiction d'une lecture par le modèle embarqué, le frontal binaire ou l'API ; retourne (résultat publié, succès)
+def predire(data, unite=''):
+    global fallbacks
+    unite = unite_notee(unite)
+    if forest is not None:
+        try:
+            return predire_embarque(data, unite)
+        except Exception as e:
+            fallbacks += 1
+            print(f"⚠️ Prédiction embarquée en échec ({e}) : appel de l'API")
+    if socket_client is not None and not unite:
+        return predire_socket(data)
+    return predire_http(data, unite)
+
+# Cache approximatif optionnel (LISTENER_QCACHE=1) : une lecture arrondie déjà vue est republiée sans appel API
+QCACHE_ENABLED = os.environ.get('LISTENER_QCACHE', '0') == '1'
+cache = QuantizedCache(
+    parse_resolutions(os.environ.get('LISTENER_QCACHE_RESOLUTIONS', '')),
+    max_size=int(os.environ.get('LISTENER_QCACHE_SIZE', '4096')),
+    ttl=float(os.environ.get('LISTENER_QCACHE_TTL', '60')),
+) if QCACHE_ENABLED else None
+# Affichage des compteurs du cache tous les N messages
+QCACHE_STATS_EVERY = int(os.environ.get('LISTENER_QCACHE_STATS_EVERY', '100'))
+
+# Prédiction d'une lecture d'une unité, servie par le cache approximatif si possible (les lectures invalides sont
+# laissées au modèle ou à l'API ; l'unité du modèle fait partie de la clé, '' pour le modèle par défaut) ; retourne
+# (résultat publié, succès, servi par le cache)
+def predire_lecture(data, unite=''):
+    row = None
+    if cache is not None:
+        try:
+            row = build_row(data)
+            _, result = cache.lookup(row, unite_notee(unite))
+            if result is not None:
+                return result, True, True
+        except SchemaError:
+            row = None
+    debut = time.perf_counter()
+    # Prédiction embarquée, ou envoi des données reçues à l'API (frontal binaire ou Flask)
+    result, ok = predire(data, unite)
+    # Seules les prédictions réussies sont mises en cache
+    if row is not None and ok:
+        cache.store(row, result, time.perf_counter() - debut, unit=result.get('unit', ''))
+    return result, ok, False
+
+# Regroupement optionnel des lectures (LISTENER_MICROBATCH=1) : les lectures valides sont accumulées et prédites
+# d'un appel vectorisé par unité (modèle embarqué, frontal binaire ou '/predict/batch') dès que le lot atteint
+# LISTENER_MICROBATCH_MAX_ROWS lectures ou LISTENER_MICROBATCH_WAIT_MS ms après la première. on_message ne bloque
+# plus : face à un arriéré, la boucle réseau remplit les lots et le débit suit la taille des lots au lieu d'être
+# limité par l'aller-retour. Chaque prédiction est publiée séparément, dans l'ordre de réception (les lectures
+# invalides et celles servies par le cache sont publiées aussitôt). Tailles des lots et raisons de déclenchement
+# affichées tous les LISTENER_MICROBATCH_STATS_EVERY lots.
+MICROBATCH_ENABLED = os.environ.get('LISTENER_MICROBATCH', '0') == '1'
+MICROBATCH_MAX_ROWS = int(os.environ.get('LISTENER_MICROBATCH_MAX_ROWS', '256'))
+MICROBATCH_WAIT_MS = float(os.environ.get('LISTENER_MICROBATCH_WAIT_MS', '20'))
+MICROBATCH_STATS_EVERY = int(os.environ.get('LISTENER_MICROBATCH_STATS_EVERY', '100'))
+batcher = None
+lots = 0
+
+# Lot par '/predict/batch' ou '/units/<unité>/predict/batch' (colonnes JSON ; 404 : unité sans modèle, route par
+# défaut) ; une réponse d'erreur de l'API est publiée pour chaque lecture du lot
+def predire_lot_http(X, unite=''):
+    colonnes = dict(zip(FEATURE_NAMES, X.T.tolist()))
+    response = api_client.post(json=colonnes, params=API_PARAMS, url=url_unite(unite, '/batch'))
+    if unite and response.status_code == 404:
+        noter_sans_modele(unite)
+        unite = ''
+        response = api_client.post(json=colonnes, params=API_PARAMS, url=url_unite(unite, '/batch'))
+    corps = response.json()
+    if not response.ok:
+        return [corps] * len(X)
+    resultats = [{'Densité_Sortie': p, 'model_version': corps.get('model_version')} for p in corps['Densité_Sortie']]
+    if unite:
+        for resultat in resultats:
+            resultat['unit'] = unite
+    if 'Densité_Sortie_std' in corps:
+        for i, resultat in enumerate(resultats):
+            resultat['Densité_Sortie_std'] = corps['Densité_Sortie_std'][i]
+            resultat['Densité_Sortie_quantiles'] = {q: bornes[i] for q, bornes in corps['Densité_Sortie_quantiles'].items()}
+    return resultats
+
+# Prédiction des lignes validées d'une unité en un seul appel vectorisé ; retourne un résultat publié par ligne
+def predire_lot_unite(X, unite):
+    global fallbacks
+    if forest is not None:
+        try:
+            foret, version, unite = modele_embarque(unite)
+            if UNCERTAINTY_ENABLED:
+                moyennes, ecarts, bornes = foret.predict_uncertainty(X, UNCERTAINTY_QUANTILES)
+                return [resultat_embarque(m, e, b, version, unite) for m, e, b in zip(moyennes, ecarts, bornes.T)]
+            return [resultat_embarque(m, version=version, unite=unite) for m in foret.predict_many(X)]
+        except Exception as e:
+            fallbacks += 1
+            print(f"⚠️ Lot embarqué en échec ({e}) : appel de l'API")
+    if socket_client is not None and not unite:
+        return [{'Densité_Sortie': float(p)} for p in connexion_socket().predict(X)]
+    return predire_lot_http(X, unite)
+
+# Prédiction d'un lot de couples (unité, ligne validée), un appel vectorisé par modèle ; retourne un résultat publié
+# par lecture, dans l'ordre
+def predire_lot(elements):
+    global lots
+    lots += 1
+    if lots % MICROBATCH_STATS_EVERY == 0:
+        print(f"Statistiques des lots : {batcher.stats()}")
+    groupes = {}
+    for i, (unite, _) in enumerate(elements):
+        groupes.setdefault(unite_notee(unite), []).append(i)
+    resultats = [None] * len(elements)
+    for unite, indices in groupes.items():
+        for i, resultat in zip(indices, predire_lot_unite(np.vstack([elements[i][1] for i in indices]), unite)):
+            resultats[i] = resultat
+    return resultats
+
+# Publication d'une prédiction du lot, depuis le thread du regroupement
+def publier_lot(client, topic, row, future, debut):
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"Erreur lors de l'appel API : {e}")
+        return
+    if cache is not None and 'error' not in result:
+        cache.store(row, result, time.perf_counter() - debut, unit=result.get('unit', ''))
+    client.publish(topic, json.dumps(result))
+
+# Lecture d'une unité confiée au regroupement (sans attendre la prédiction) ; la prédiction est publiée sur topic
+def soumettre_lot(client, data, topic=PREDICTION_TOPIC, unite=''):
+    try:
+        row = build_row(data)
+    except SchemaError as e:
+        client.publish(topic, json.dumps({'error': str(e)}))
+        return
+    if cache is not None:
+        _, result = cache.lookup(row, unite_notee(unite))
+        if result is not None:
+            client.publish(topic, json.dumps(result))
+            return
+    debut = time.perf_counter()
+    batcher.submit((unite, row)).add_done_callback(lambda future: publier_lot(client, topic, row, future, debut))
 
 # Définition de la fonction de rappel exécutée lors de la connexion au broker MQTT
 def on_connect(client, userdata, flags, rc):
     # Affichage du code de retour (rc) pour indiquer le statut de la connexion (0 = succès)
     print(f"Connecté au broker MQTT avec code {rc}")
-    # Souscription au topic "emaphos/sensors" pour recevoir les données des capteurs
-    client.subscribe("emaphos/sensors")
+    # Souscription au topic des lectures (par défaut "emaphos/sensors") pour recevoir les données des capteurs
+    client.subscribe(SENSOR_TOPIC)
 
 # Définition de la fonction de rappel exécutée lors de la réception d'un message MQTT
 def on_message(client, userdata, msg):
@@ -29,35 +380,51 @@ def on_message(client, userdata, msg):
     data = json.loads(msg.payload.decode('utf-8'))
     # Affichage des données reçues pour le suivi
     print(f"Données reçues via MQTT : {data}")
+    # Unité de la lecture (topics à '+') : modèle qui la note et topic de publication
+    unite = unite_du_topic(msg.topic)
+    topic = topic_prediction(unite)
+    if batcher is not None:
+        soumettre_lot(client, data, topic, unite)
+        return
 
     try:
-        # Envoi des données reçues à l'API Flask via une requête POST
-        response = requests.post(API_URL, json=data)
-        # Extraction de la réponse JSON de l'API
-        result = response.json()
+        result, _, depuis_cache = predire_lecture(data, unite)
         # Affichage de la prédiction reçue pour le suivi
-        print(f"Prédiction reçue de l'API : {result}")
+        print(f"Prédiction servie par le cache : {result}" if depuis_cache else f"Prédiction reçue de l'API : {result}")
 
         # Conversion de la prédiction en chaîne JSON pour publication
         prediction_payload = json.dumps(result)
-        # Publication de la prédiction sur le topic MQTT "emaphos/predictions"
-        client.publish(PREDICTION_TOPIC, prediction_payload)
+        # Publication de la prédiction sur le topic MQTT de l'unité (par défaut "emaphos/predictions")
+        client.publish(topic, prediction_payload)
         # Affichage pour confirmer la publication
-        print(f"Prédiction publiée sur MQTT topic '{PREDICTION_TOPIC}'")
+        print(f"Prédiction publiée sur MQTT topic '{topic}'")
+        # Affichage périodique des compteurs du cache
+        if cache is not None and (cache.hits + cache.misses) % QCACHE_STATS_EVERY == 0:
+            print(f"Statistiques du cache : {cache.stats()}")
 
     except Exception as e:
         # Gestion des erreurs : affichage de l'erreur en cas de problème avec l'appel API
         print(f"Erreur lors de l'appel API : {e}")
 
-# Création d'une instance du client MQTT
-client = mqtt.Client()
+def main():
+    global batcher
+    if EMBEDDED_ENABLED:
+        charger_modele_embarque()
+    if MICROBATCH_ENABLED:
+        batcher = MicroBatcher(predire_lot, MICROBATCH_MAX_ROWS, MICROBATCH_WAIT_MS, name='listener-batch')
+
+    # Création d'une instance du client MQTT
+    client = mqtt.Client()
+
+    # Assignation des fonctions de rappel pour la connexion et la réception des messages
+    client.on_connect = on_connect
+    client.on_message = on_message
 
-# Assignation des fonctions de rappel pour la connexion et la réception des messages
-client.on_connect = on_connect
-client.on_message = on_message
+    # Connexion au broker MQTT avec l'adresse, le port et un timeout de 60 secondes
+    client.connect(MQTT_BROKER, MQTT_PORT, 60)
 
-# Connexion au broker MQTT avec l'adresse, le port et un timeout de 60 secondes
-client.connect(MQTT_BROKER, MQTT_PORT, 60)
+    # Lancement de la boucle infinie pour maintenir la connexion MQTT et traiter les messages
+    client.loop_forever()
 
-# Lancement de la boucle infinie pour maintenir la connexion MQTT et traiter les messages
-client.loop_forever()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
\ No newline at end of file
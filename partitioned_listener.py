@@ -0,0 +1,325 @@
+# Listener MQTT multi-unités : les lectures de toutes les unités (LISTENER_TOPIC=emaphos/+/sensors) sont notées en
+# parallèle, et dans l'ordre de réception pour chaque unité
+#
+#   boucle réseau paho → partition crc32(unité) % LISTENER_PARTITIONS → file bornée de la partition
+#                      → un worker par partition → publication sur emaphos/<unité>/predictions
+#
+# Toutes les lectures d'une unité passent par la même partition, vidée par un seul worker dans l'ordre de sa file :
+# les prédictions d'une unité sont publiées dans l'ordre de réception ('seq' croissant), tandis que les unités de
+# partitions différentes sont notées en même temps. Avec LISTENER_PARTITION_MODE=process (fork, Linux), chaque
+# partition est un processus : la notation embarquée (LISTENER_EMBEDDED=1) occupe alors tous les cœurs au lieu d'être
+# limitée par le GIL, et les résultats reviennent au processus principal qui publie. Avec des threads (par défaut),
+# le parallélisme vient des appels à l'API ou au frontal binaire, qui relâchent le GIL. File de partition pleine :
+# le message est abandonné et compté pour son unité. La notation est celle de mqtt_listener.py : modèle par défaut
+# ou, avec LISTENER_UNIT_MODELS=1, modèle de l'unité (registre embarqué LISTENER_MODELS_DIR, dont chaque partition ne
+# charge en mode processus que les modèles de ses unités, ou route '/units/<unité>/predict' de l'API), et cache
+# LISTENER_QCACHE ; chaque publication porte 'seq', le numéro de réception.
+#
+# Suivi par unité : messages reçus, publiés, en erreur, abandonnés, en attente, retard (de la réception à la
+# publication : dernier, moyen, maximal), durée moyenne de notation et débit (publications par seconde sur les
+# LISTENER_RATE_WINDOW dernières secondes), affichés toutes les LISTENER_STATS_INTERVAL secondes et exposés sur
+# http://0.0.0.0:<LISTENER_METRICS_PORT>/metrics (Prometheus, étiquette 'unit') et /stats (JSON).
+#
+#   LISTENER_TOPIC='emaphos/+/sensors' python partitioned_listener.py
+#   LISTENER_TOPIC='emaphos/+/sensors' LISTENER_EMBEDDED=1 LISTENER_PARTITION_MODE=process LISTENER_PARTITIONS=8 \
+#       LISTENER_METRICS_PORT=9101 python partitioned_listener.py
+import collections
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import zlib
+
+import paho.mqtt.client as mqtt
+
+import metrics
+import mqtt_listener as listener
+
+PARTITIONS = int(os.environ.get('LISTENER_PARTITIONS', str(os.cpu_count() or 4)))
+PARTITION_MODE = os.environ.get('LISTENER_PARTITION_MODE', 'thread')
+QUEUE_SIZE = int(os.environ.get('LISTENER_QUEUE_SIZE', '1000'))
+RATE_WINDOW = float(os.environ.get('LISTENER_RATE_WINDOW', '10'))
+STATS_INTERVAL = float(os.environ.get('LISTENER_STATS_INTERVAL', '10'))
+METRICS_PORT = int(os.environ.get('LISTENER_METRICS_PORT', '0'))
+PARTITION_MODES = ('thread', 'process')
+
+REGISTRY = metrics.Registry()
+RECEIVED = REGISTRY.counter('density_listener_unit_received_total', "Messages reçus par unité", ('unit',))
+MESSAGES = REGISTRY.counter('density_listener_unit_messages_total', "Messages traités par unité et résultat", ('unit', 'result'))
+LAG = REGISTRY.histogram('density_listener_unit_lag_seconds', "Retard de la réception à la publication, par unité", ('unit',))
+REGISTRY.gauge_function('process_resident_memory_bytes', "Mémoire résidente du processus", metrics.process_rss_bytes)
+
+
+# Numéro de partition d'une unité : stable d'un lancement et d'un processus à l'autre (contrairement à hash())
+def partition_of(unit, partitions):
+    return zlib.crc32(unit.encode('utf-8')) % partitions
+
+
+# Notation d'un message par le modèle de son unité ; retourne (publication JSON, succès)
+def _noter(score, seq, unit, payload):
+    try:
+        result, ok = score(json.loads(payload), unit)
+    except Exception as e:
+        result, ok = {'error': str(e)}, False
+    return json.dumps({**result, 'seq': seq}), ok
+
+
+# Worker d'une partition en mode processus : messages notés dans l'ordre de la file, résultats renvoyés au
+# processus principal ; None termine
+def _processus_partition(score, entree, sortie):
+    # Arrêt piloté par le processus principal (Ctrl+C atteint tout le groupe de processus)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        element = entree.get()
+        if element is None:
+            sortie.put(None)
+            return
+        seq, unit, payload, topic, recu = element
+        debut = time.monotonic()
+        texte, ok = _noter(score, seq, unit, payload)
+        sortie.put((unit, topic, texte, ok, recu, time.monotonic() - debut))
+
+
+# Compteurs d'une unité ; reçus et abandonnés par le thread réseau, le reste par le thread qui publie
+class UnitStats:
+    def __init__(self, partition, window=10.0):
+        self.partition = partition
+        self.window = float(window)
+        self.received = 0
+        self.published = 0
+        self.errors = 0
+        self.dropped = 0
+        self.lag_last = 0.0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.score_sum = 0.0
+        self._debut = time.monotonic()
+        self._publications = collections.deque()
+        self._verrou = threading.Lock()
+
+    def record(self, lag, score, ok):
+        with self._verrou:
+            self.published += 1
+            self.errors += not ok
+            self.lag_last = lag
+            self.lag_sum += lag
+            self.lag_max = max(self.lag_max, lag)
+            self.score_sum += score
+            self._publications.append(time.monotonic())
+
+    # Publications par seconde sur les window dernières secondes (ou depuis le premier message)
+    def rate(self):
+        with self._verrou:
+            maintenant = time.monotonic()
+            while self._publications and self._publications[0] < maintenant - self.window:
+                self._publications.popleft()
+            return len(self._publications) / max(min(self.window, maintenant - self._debut), 1e-3)
+
+    def stats(self):
+        publies = self.published or 1
+        return {
+            'partition': self.partition,
+            'received': self.received,
+            'published': self.published,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'pending': self.received - self.published - self.dropped,
+            'lag_ms_last': self.lag_last * 1000,
+            'lag_ms_mean': self.lag_sum / publies * 1000,
+            'lag_ms_max': self.lag_max * 1000,
+            'score_ms_mean': self.score_sum / publies * 1000,
+            'msg_per_s': self.rate(),
+        }
+
+
+class PartitionedBridge:
+    # publish(topic, texte) : publication non bloquante ; score(data, unité) : notation bloquante par le modèle de
+    # l'unité, retourne (résultat, succès)
+    # extra_stats() : compteurs ajoutés à stats() (client HTTP de l'API)
+    def __init__(self, publish, score, partitions=4, max_queue=1000, mode='thread', rate_window=10.0, extra_stats=None):
+        if mode not in PARTITION_MODES:
+            raise ValueError(f"Mode de partition inconnu : {mode} (attendu : {', '.join(PARTITION_MODES)})")
+        self.publish = publish
+        self.score = score
+        self.partitions = max(int(partitions), 1)
+        self.max_queue = max(int(max_queue), 1)
+        self.mode = mode
+        self.rate_window = float(rate_window)
+        self.extra_stats = extra_stats
+        self.seq = 0
+        self.units = {}
+        self._files = []
+        self._workers = []
+        self._resultats = None
+        self._collecteur = None
+        self._verrou = threading.Lock()
+
+    # Lancement des workers ; en mode processus, avant toute connexion (les processus sont créés par fork)
+    def start(self):
+        if self.mode == 'thread':
+            self._files = [queue.Queue(self.max_queue) for _ in range(self.partitions)]
+            self._workers = [threading.Thread(target=self._travailler, args=(file,), name=f'listener-partition-{i}', daemon=True)
+                             for i, file in enumerate(self._files)]
+        else:
+            contexte = multiprocessing.get_context('fork')
+            self._files = [contexte.Queue(self.max_queue) for _ in range(self.partitions)]
+            self._resultats = contexte.Queue()
+            self._workers = [contexte.Process(target=_processus_partition, args=(self.score, file, self._resultats),
+                                              name=f'listener-partition-{i}', daemon=True)
+                             for i, file in enumerate(self._files)]
+            self._collecteur = threading.Thread(target=self._collecter, name='listener-results', daemon=True)
+            self._collecteur.start()
+        for worker in self._workers:
+            worker.start()
+
+    def _unite(self, unit):
+        stats = self.units.get(unit)
+        if stats is None:
+            with self._verrou:
+                stats = self.units.setdefault(unit, UnitStats(partition_of(unit, self.partitions), self.rate_window))
+        return stats
+
+    # Depuis le thread réseau de paho : numérotation dans l'ordre de réception puis dépôt dans la file de la
+    # partition de l'unité ; la prédiction sera publiée sur topic
+    def submit(self, unit, payload, topic):
+        self.seq += 1
+        stats = self._unite(unit)
+        stats.received += 1
+        RECEIVED.labels(unit).inc()
+        try:
+            self._files[stats.partition].put_nowait((self.seq, unit, payload, topic, time.monotonic()))
+        except queue.Full:
+            stats.dropped += 1
+            MESSAGES.labels(unit, 'dropped').inc()
+
+    # Worker d'une partition en mode thread ; None termine
+    def _travailler(self, file):
+        while True:
+            element = file.get()
+            if element is None:
+                return
+            seq, unit, payload, topic, recu = element
+            debut = time.monotonic()
+            texte, ok = _noter(self.score, seq, unit, payload)
+            self._publier(unit, topic, texte, ok, recu, time.monotonic() - debut)
+
+    # Mode processus : publication des résultats des partitions, dans leur ordre d'arrivée (ordonné par partition)
+    def _collecter(self):
+        restants = self.partitions
+        while restants:
+            element = self._resultats.get()
+            if element is None:
+                restants -= 1
+                continue
+            self._publier(*element)
+
+    def _publier(self, unit, topic, texte, ok, recu, duree):
+        try:
+            self.publish(topic, texte)
+        except Exception as e:
+            ok = False
+            print(f"❌ Publication sur {topic} impossible : {e}")
+        retard = time.monotonic() - recu
+        self.units[unit].record(retard, duree, ok)
+        MESSAGES.labels(unit, 'ok' if ok else 'error').inc()
+        LAG.labels(unit).observe(retard)
+
+    # Arrêt : messages déjà en file traités (au plus drain s), puis fin des workers
+    def stop(self, drain=5.0):
+        echeance = time.monotonic() + drain
+        for file in self._files:
+            try:
+                file.put(None, timeout=max(echeance - time.monotonic(), 0.01))
+            except queue.Full:
+                pass
+        for worker in self._workers + ([self._collecteur] if self._collecteur is not None else []):
+            worker.join(max(echeance - time.monotonic(), 0.01))
+        restants = sum(stats['pending'] for stats in self.stats()['units'].values())
+        if restants:
+            print(f"⚠️ Arrêt avec {restants} message(s) non publié(s)")
+        for worker in self._workers:
+            if self.mode == 'process' and worker.is_alive():
+                worker.terminate()
+
+    def queue_depth(self):
+        return sum(file.qsize() for file in self._files)
+
+    def stats(self):
+        unites = {unit: stats.stats() for unit, stats in sorted(list(self.units.items()))}
+        return {
+            'mode': self.mode,
+            'partitions': self.partitions,
+            'received': sum(stats['received'] for stats in unites.values()),
+            'published': sum(stats['published'] for stats in unites.values()),
+            'errors': sum(stats['errors'] for stats in unites.values()),
+            'dropped': sum(stats['dropped'] for stats in unites.values()),
+            'partition_depth': [file.qsize() for file in self._files],
+            'max_queue': self.max_queue,
+            'units': unites,
+            **(self.extra_stats() if self.extra_stats is not None else {}),
+        }
+
+
+def afficher(stats):
+    resume = {cle: valeur for cle, valeur in stats.items() if cle != 'units'}
+    print(f"📊 {resume}")
+    for unit, s in stats['units'].items():
+        print(f"   {unit or '-'} (partition {s['partition']}) : {s['published']}/{s['received']} publiés, "
+              f"{s['errors']} erreurs, {s['dropped']} abandonnés, {s['pending']} en attente, "
+              f"{s['msg_per_s']:.1f} msg/s, retard {s['lag_ms_last']:.1f} ms (moyen {s['lag_ms_mean']:.1f}, "
+              f"max {s['lag_ms_max']:.1f})")
+
+
+def main():
+    if '+' not in listener.SENSOR_TOPIC:
+        print(f"⚠️ Topic {listener.SENSOR_TOPIC} sans '+' : une seule unité, une seule partition utilisée")
+    if listener.EMBEDDED_ENABLED:
+        listener.charger_modele_embarque()
+    client = mqtt.Client()
+    # En mode processus, le client HTTP du processus principal n'est pas utilisé : ses compteurs ne sont pas affichés
+    bridge = PartitionedBridge(
+        client.publish,
+        lambda data, unite: listener.predire_lecture(data, unite)[:2],
+        partitions=PARTITIONS, max_queue=QUEUE_SIZE, mode=PARTITION_MODE, rate_window=RATE_WINDOW,
+        extra_stats=(lambda: {'http': listener.api_client.stats()}) if PARTITION_MODE == 'thread' else None,
+    )
+    bridge.start()
+    REGISTRY.gauge_function('density_listener_queue_depth', "Messages en attente dans les files des partitions", bridge.queue_depth)
+
+    def on_connect(client, userdata, flags, rc):
+        print(f"Connecté au broker MQTT avec code {rc}")
+        client.subscribe(listener.SENSOR_TOPIC)
+
+    def on_message(client, userdata, msg):
+        unite = listener.unite_du_topic(msg.topic)
+        bridge.submit(unite, msg.payload, listener.topic_prediction(unite))
+
+    arret = threading.Event()
+    for signal_ in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_, lambda *_: arret.set())
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT, REGISTRY, bridge.stats, name='listener-metrics')
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(listener.MQTT_BROKER, listener.MQTT_PORT, 60)
+    client.loop_start()
+    print(f"🚀 Listener multi-unités : {listener.SENSOR_TOPIC} → {listener.PREDICTION_TOPIC}, {bridge.partitions} "
+          f"partitions ({bridge.mode}), files de {bridge.max_queue} messages")
+    try:
+        while not arret.wait(STATS_INTERVAL if STATS_INTERVAL > 0 else None):
+            afficher(bridge.stats())
+    finally:
+        # Plus de nouveaux messages, puis publication de ceux déjà en file avant la déconnexion
+        client.unsubscribe(listener.SENSOR_TOPIC)
+        bridge.stop()
+        client.disconnect()
+        client.loop_stop()
+        afficher(bridge.stats())
+        print("🛑 Arrêt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# Formats de charge utile négociés par l'API de prédiction (Content-Type de la requête)
+#
+#   application/json          format par défaut (orjson utilisé s'il est installé)
+#   application/octet-stream  float64 little-endian bruts : n_lignes x 4 en entrée (ordre du
+#                             schéma), n float64 en sortie ; lu sans copie avec np.frombuffer
+#   application/msgpack       même structure que le JSON, encodée en MessagePack (module msgpack)
+#
+# La réponse est renvoyée dans le format de la requête.
+import json
+
+import numpy as np
+
+from feature_schema import N_FEATURES, SchemaError, check_matrix
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+OCTET_STREAM = 'application/octet-stream'
+MSGPACK = 'application/msgpack'
+_ALIASES = {
+    '': JSON,
+    JSON: JSON,
+    OCTET_STREAM: OCTET_STREAM,
+    MSGPACK: MSGPACK,
+    'application/x-msgpack': MSGPACK,
+}
+
+# Type des valeurs brutes : float64 little-endian, quelle que soit la machine
+RAW_DTYPE = np.dtype('<f8')
+ROW_BYTES = RAW_DTYPE.itemsize * N_FEATURES
+
+
+# Format non pris en charge (réponse HTTP 415)
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+# Format canonique à partir du type MIME de la requête (sans paramètres)
+def negotiate(mimetype):
+    format_ = _ALIASES.get((mimetype or '').lower())
+    if format_ is None:
+        raise UnsupportedMediaType(f"Type de contenu non pris en charge : {mimetype}")
+    if format_ == MSGPACK and msgpack is None:
+        raise UnsupportedMediaType("MessagePack indisponible : installer le module 'msgpack'.")
+    return format_
+
+
+# Matrice (n, 4) vue directement sur les octets reçus, sans copie
+def raw_matrix(body):
+    if len(body) % ROW_BYTES:
+        raise SchemaError(f"Le corps binaire doit contenir un multiple de {ROW_BYTES} octets ({N_FEATURES} float64 par ligne).")
+    return check_matrix(np.frombuffer(body, dtype=RAW_DTYPE).reshape(-1, N_FEATURES))
+
+
+# Décodage du corps : objet Python (JSON / MessagePack) ou matrice (binaire brut)
+def decode(format_, body):
+    if format_ == OCTET_STREAM:
+        return raw_matrix(body)
+    try:
+        if format_ == MSGPACK:
+            return msgpack.unpackb(body, raw=False)
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError as e:
+        raise SchemaError(f"Corps de requête illisible : {e}") from None
+
+
+# Encodage d'une réponse dans le format de la requête ; retourne (octets, type MIME)
+def encode(format_, objet):
+    if format_ == MSGPACK:
+        return msgpack.packb(objet, use_bin_type=True), MSGPACK
+    if orjson is not None:
+        return orjson.dumps(objet, option=orjson.OPT_SERIALIZE_NUMPY), JSON
+    return json.dumps(objet, separators=(',', ':')).encode('utf-8'), JSON
+
+
+# Encodage binaire des prédictions : n float64 little-endian
+def encode_raw(predictions):
+    return np.ascontiguousarray(predictions, dtype=RAW_DTYPE).tobytes(), OCTET_STREAM
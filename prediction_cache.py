@@ -0,0 +1,258 @@
+# Caches de prédiction placés devant le modèle
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from feature_schema import FEATURE_NAMES
+
+# Résolutions par défaut des capteurs pour le cache approximatif (unités du schéma)
+DEFAULT_RESOLUTIONS = {
+    'Débit_Acide_m3h': 0.01,
+    'Débit_Vapeur_kgh': 1.0,
+    'Température_Évaporateur_C': 0.01,
+    'Vide_Bouilleur_torr': 0.01,
+}
+
+# Fichiers dont la modification invalide le cache approximatif
+MODEL_FILES = ('modele_final.pkl', 'y_mean.txt')
+
+
+# Cache exact par région : une forêt aléatoire est constante par morceaux, chaque entrée
+# appartient à un hyperrectangle (intersection des boîtes de ses feuilles dans tous les
+# arbres) où la prédiction ne change pas. Les régions récemment atteintes sont conservées
+# avec éviction LRU ; toute entrée située dans une boîte en cache reçoit la réponse exacte
+# sans parcourir les arbres.
+class RegionCache:
+    def __init__(self, forest, capacity=64):
+        if capacity < 1:
+            raise ValueError("capacity doit être supérieur ou égal à 1.")
+        self.forest = forest
+        self.capacity = int(capacity)
+        n_features = forest.n_features
+        # Emplacements vides : boîte impossible (lo = +inf), donc jamais atteinte
+        self._lo = np.full((self.capacity, n_features), np.inf)
+        self._hi = np.full((self.capacity, n_features), -np.inf)
+        self._valeurs = np.zeros(self.capacity)
+        # Horloge LRU : 0 signifie emplacement libre
+        self._acces = np.zeros(self.capacity, dtype=np.int64)
+        self._horloge = 0
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Recherche de la région contenant x ; retourne l'indice de l'emplacement ou -1
+    def _chercher(self, x):
+        dedans = ((x > self._lo) & (x <= self._hi)).all(axis=1)
+        indice = int(dedans.argmax())
+        return indice if dedans[indice] else -1
+
+    # Prédiction d'une ligne déjà validée (float64, dans l'ordre du schéma)
+    def predict_one(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        with self._verrou:
+            indice = self._chercher(x)
+            if indice >= 0:
+                self.hits += 1
+                self._horloge += 1
+                self._acces[indice] = self._horloge
+                return float(self._valeurs[indice])
+            self.misses += 1
+        # Parcours complet hors verrou, avec calcul de la région
+        prediction, lo, hi = self.forest.predict_one_region(x)
+        with self._verrou:
+            # Une autre requête a pu insérer la même région entre-temps
+            if self._chercher(x) < 0:
+                indice = int(self._acces.argmin())
+                if self._acces[indice]:
+                    self.evictions += 1
+                self._horloge += 1
+                self._lo[indice] = lo
+                self._hi[indice] = hi
+                self._valeurs[indice] = prediction
+                self._acces[indice] = self._horloge
+        return prediction
+
+    # Prédiction d'une matrice : les lignes dans une région en cache sont servies directement,
+    # les autres sont prédites en un seul appel vectorisé (sans insertion dans le cache)
+    def predict_many(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        resultat = np.empty(X.shape[0])
+        trouve = np.zeros(X.shape[0], dtype=bool)
+        with self._verrou:
+            for debut in range(0, X.shape[0], 1024):
+                bloc = X[debut:debut + 1024, None, :]
+                dedans = ((bloc > self._lo) & (bloc <= self._hi)).all(axis=2)
+                indices = dedans.argmax(axis=1)
+                succes = dedans[np.arange(len(indices)), indices]
+                trouve[debut:debut + 1024] = succes
+                resultat[debut:debut + 1024][succes] = self._valeurs[indices[succes]]
+                if succes.any():
+                    self._horloge += 1
+                    self._acces[indices[succes]] = self._horloge
+            self.hits += int(trouve.sum())
+            self.misses += int((~trouve).sum())
+        if not trouve.all():
+            resultat[~trouve] = self.forest.predict_many(X[~trouve])
+        return resultat
+
+    # Vidage complet du cache (par exemple après changement de modèle)
+    def clear(self):
+        with self._verrou:
+            self._lo.fill(np.inf)
+            self._hi.fill(-np.inf)
+            self._acces.fill(0)
+
+    # Compteurs de succès, d'échecs et d'évictions
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'capacity': self.capacity,
+            'size': int(np.count_nonzero(self._acces)),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+# Lecture des résolutions depuis une chaîne "0.01,1,0.01,0.01" (ordre du schéma) ou "nom=valeur,..."
+def parse_resolutions(texte):
+    resolutions = dict(DEFAULT_RESOLUTIONS)
+    if not texte:
+        return resolutions
+    morceaux = [m.strip() for m in texte.split(',') if m.strip()]
+    if all('=' in m for m in morceaux):
+        for morceau in morceaux:
+            nom, valeur = morceau.split('=', 1)
+            if nom.strip() not in resolutions:
+                raise ValueError(f"Variable inconnue : {nom.strip()}")
+            resolutions[nom.strip()] = float(valeur)
+    elif len(morceaux) == len(FEATURE_NAMES):
+        resolutions = dict(zip(FEATURE_NAMES, (float(m) for m in morceaux)))
+    else:
+        raise ValueError(f"{len(FEATURE_NAMES)} résolutions attendues, reçu : {texte!r}")
+    if any(r <= 0 for r in resolutions.values()):
+        raise ValueError("Les résolutions doivent être strictement positives.")
+    return resolutions
+
+
+# Cache approximatif : la clé est la ligne arrondie à une résolution par capteur. Taille
+# bornée (LRU), durée de vie par entrée, invalidation automatique quand les fichiers du
+# modèle changent, et compteurs de succès, d'évictions et de latence économisée.
+class QuantizedCache:
+    def __init__(self, resolutions=None, max_size=4096, ttl=60.0, watch_files=MODEL_FILES, check_interval=1.0):
+        if max_size < 1:
+            raise ValueError("max_size doit être supérieur ou égal à 1.")
+        resolutions = resolutions or DEFAULT_RESOLUTIONS
+        self.resolutions = np.array([resolutions[nom] for nom in FEATURE_NAMES], dtype=np.float64)
+        self.max_size = int(max_size)
+        self.ttl = float(ttl)
+        self.watch_files = tuple(watch_files)
+        self.check_interval = float(check_interval)
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self._signature = self._signature_fichiers()
+        self._prochaine_verification = time.monotonic() + self.check_interval
+        # Coût moyen d'un calcul (moyenne glissante), utilisé pour estimer la latence économisée
+        self._cout_moyen = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+
+    # Date de modification et taille des fichiers surveillés (None si absent)
+    def _signature_fichiers(self):
+        signature = []
+        for chemin in self.watch_files:
+            try:
+                etat = os.stat(chemin)
+                signature.append((etat.st_mtime_ns, etat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    # Vidage du cache si le modèle ou y_mean a changé (au plus une vérification par intervalle)
+    def _verifier_fichiers(self, maintenant):
+        if maintenant < self._prochaine_verification:
+            return
+        self._prochaine_verification = maintenant + self.check_interval
+        signature = self._signature_fichiers()
+        if signature != self._signature:
+            self._signature = signature
+            self._entrees.clear()
+            self.invalidations += 1
+
+    # Clé de cache : indices de quantification de chaque capteur, précédés de l'unité s'il y en a une (chaque
+    # unité a son propre modèle : une lecture identique d'une autre unité n'est pas servie par le cache)
+    def key(self, row, unit=None):
+        cle = tuple(np.rint(np.asarray(row, dtype=np.float64) / self.resolutions).astype(np.int64).tolist())
+        return (unit,) + cle if unit else cle
+
+    # Recherche d'une valeur ; retourne (trouvé, valeur)
+    def lookup(self, row, unit=None):
+        cle = self.key(row, unit)
+        maintenant = time.monotonic()
+        with self._verrou:
+            self._verifier_fichiers(maintenant)
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                valeur, expiration = entree
+                if expiration >= maintenant:
+                    self._entrees.move_to_end(cle)
+                    self.hits += 1
+                    self.latency_saved += self._cout_moyen
+                    return True, valeur
+                del self._entrees[cle]
+                self.expirations += 1
+            self.misses += 1
+        return False, None
+
+    # Insertion d'une valeur calculée en `cost` secondes
+    def store(self, row, value, cost=0.0, unit=None):
+        cle = self.key(row, unit)
+        with self._verrou:
+            self._cout_moyen += (float(cost) - self._cout_moyen) * 0.1 if self._cout_moyen else float(cost)
+            self._entrees[cle] = (value, time.monotonic() + self.ttl)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.max_size:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    # Recherche puis, en cas d'échec, calcul via fonction(row) et insertion
+    def get_or_compute(self, row, fonction):
+        trouve, valeur = self.lookup(row)
+        if trouve:
+            return valeur
+        debut = time.perf_counter()
+        valeur = fonction(row)
+        self.store(row, valeur, time.perf_counter() - debut)
+        return valeur
+
+    # Vidage manuel du cache
+    def clear(self):
+        with self._verrou:
+            self._entrees.clear()
+            self.invalidations += 1
+
+    # Compteurs exposés à l'exécution
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'max_size': self.max_size,
+            'size': len(self._entrees),
+            'ttl_s': self.ttl,
+            'resolutions': dict(zip(FEATURE_NAMES, self.resolutions.tolist())),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'latency_saved_s': self.latency_saved,
+        }
@@ -0,0 +1,266 @@
+# Journal des requêtes de notation (entrées, sortie, version du modèle, latence), écrit hors du chemin de la requête
+#
+# Les requêtes déposent leurs enregistrements dans une file bornée en mémoire ; un thread d'écriture les
+# sérialise et les écrit par lots (une écriture par lot), change de fichier au-delà d'une taille ou d'une
+# durée, et la file pleine fait attendre brièvement les requêtes puis abandonne (et compte) l'enregistrement.
+#
+# Formats :
+#   jsonl   un objet JSON par requête ; rejouable par load_test.py --source replay
+#   binary  enregistrements de taille fixe RECORD_DTYPE, un par ligne d'entrée : read_binary(chemin) retourne
+#           un tableau structuré dont chaque champ est une colonne (ts, inputs, output, latency_ms, ...)
+#
+# Fichiers remplacés : <chemin>.<AAAAMMJJ-HHMMSS> à côté du fichier courant.
+#
+# Chaque enregistrement est sérialisé séparément : un enregistrement impossible à sérialiser (corps brut non JSON...)
+# est écarté et compté dans `unserializable` sans perdre le reste du lot ; en JSON, les valeurs non sérialisables
+# (octets d'un corps MessagePack...) sont d'abord écrites sous forme de repr().
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from feature_schema import FEATURE_NAMES, N_FEATURES, SchemaError, build_matrix, build_row
+
+JSONL = 'jsonl'
+BINARY = 'binary'
+FORMATS = (JSONL, BINARY)
+
+RECORD_DTYPE = np.dtype([
+    ('ts', '<f8'),
+    ('latency_ms', '<f4'),
+    ('status', '<u2'),
+    ('batch', 'u1'),
+    ('inputs', '<f8', (N_FEATURES,)),
+    ('output', '<f8'),
+    ('model_version', 'S12'),
+    ('unit', 'S16'),
+])
+
+_FIN = object()
+
+
+# Enregistrements binaires d'un fichier du journal
+def read_binary(path):
+    return np.fromfile(path, dtype=RECORD_DTYPE)
+
+
+# Entrées sous forme JSON : une matrice (corps binaire) devient une liste d'enregistrements nommés
+def _entrees_json(entrees):
+    if isinstance(entrees, np.ndarray):
+        lignes = np.asarray(entrees, dtype=np.float64).reshape(-1, N_FEATURES).tolist()
+        return [dict(zip(FEATURE_NAMES, ligne)) for ligne in lignes]
+    return entrees
+
+
+# Entrées sous forme de matrice ; une entrée invalide ou absente donne une ligne de NaN
+def _entrees_matrice(entrees):
+    try:
+        if isinstance(entrees, np.ndarray):
+            return np.asarray(entrees, dtype=np.float64).reshape(-1, N_FEATURES)
+        if isinstance(entrees, list) or (isinstance(entrees, dict) and isinstance(entrees.get(FEATURE_NAMES[0]), list)):
+            return build_matrix(entrees)
+        if entrees is not None:
+            return build_row(entrees)[None, :]
+    except SchemaError:
+        pass
+    return np.full((1, N_FEATURES), np.nan)
+
+
+class RequestJournal:
+    def __init__(self, path='requests.jsonl', format_=JSONL, max_queue=10000, batch_size=512, flush_interval=0.5,
+                 rotate_bytes=64 << 20, rotate_seconds=0.0, block_timeout=0.05, fsync=False):
+        if format_ not in FORMATS:
+            raise ValueError(f"Format de journal inconnu : {format_} (attendu : {', '.join(FORMATS)})")
+        self.path = path
+        self.format = format_
+        self.max_queue = int(max_queue)
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = float(flush_interval)
+        self.rotate_bytes = int(rotate_bytes)
+        self.rotate_seconds = float(rotate_seconds)
+        self.block_timeout = float(block_timeout)
+        self.fsync = fsync
+        self.records = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.errors = 0
+        self.unserializable = 0
+        self.batches = 0
+        self.rotations = 0
+        self.bytes_written = 0
+        self.last_error = None
+        self._fichier = None
+        self._ouvert_le = 0.0
+        self._demarrer()
+
+    def _demarrer(self):
+        self._file = queue.Queue(self.max_queue)
+        self._thread = threading.Thread(target=self._boucle, name='request-journal', daemon=True)
+        self._thread.start()
+
+    # Dépôt d'un enregistrement ; file pleine : attente d'au plus block_timeout, puis abandon (retourne False)
+    def record(self, ts, endpoint, status, latency, model_version=None, unit=None, inputs=None, output=None, batch=False):
+        element = (ts, endpoint, status, latency, model_version, unit, inputs, output, batch)
+        try:
+            self._file.put_nowait(element)
+        except queue.Full:
+            self.blocked += 1
+            try:
+                self._file.put(element, timeout=self.block_timeout)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        self.records += 1
+        return True
+
+    def _boucle(self):
+        while True:
+            try:
+                premier = self._file.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._verifier_rotation()
+                continue
+            # Lot complété jusqu'à batch_size enregistrements ou flush_interval secondes après le premier
+            lot = [premier]
+            echeance = time.monotonic() + self.flush_interval
+            while len(lot) < self.batch_size and premier is not _FIN and lot[-1] is not _FIN:
+                restant = echeance - time.monotonic()
+                try:
+                    lot.append(self._file.get(timeout=restant) if restant > 0 else self._file.get_nowait())
+                except queue.Empty:
+                    break
+            fin = any(element is _FIN for element in lot)
+            lot = [element for element in lot if element is not _FIN]
+            if lot:
+                self._ecrire(lot)
+            if fin:
+                self._fermer()
+                return
+
+    def _ecrire(self, lot):
+        donnees, n = self._serialiser(lot)
+        if not n:
+            return
+        try:
+            self._verifier_rotation()
+            if self._fichier is None:
+                self._ouvrir()
+            self._fichier.write(donnees)
+            self._fichier.flush()
+            if self.fsync:
+                os.fsync(self._fichier.fileno())
+            self.written += n
+            self.batches += 1
+            self.bytes_written += len(donnees)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"❌ Journal des requêtes : {e}")
+
+    # Octets du lot et nombre d'enregistrements sérialisés, un à la fois ; ceux en échec sont écartés et comptés
+    def _serialiser(self, lot):
+        serialiser = self._serialiser_jsonl if self.format == JSONL else self._serialiser_binaire
+        morceaux = []
+        for element in lot:
+            try:
+                morceaux.append(serialiser(*element))
+            except Exception as e:
+                self.unserializable += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"❌ Journal des requêtes : enregistrement écarté ({e})")
+        return b''.join(morceaux), len(morceaux)
+
+    def _serialiser_jsonl(self, ts, endpoint, status, latence, version, unite, entrees, sortie, _):
+        objet = {'ts': ts, 'endpoint': endpoint, 'status': status, 'latency_ms': latence * 1000.0,
+                 'model_version': version}
+        if unite:
+            objet['unit'] = unite
+        objet['inputs'] = _entrees_json(entrees)
+        objet['output'] = sortie.tolist() if isinstance(sortie, np.ndarray) else sortie
+        return (json.dumps(objet, ensure_ascii=False, default=repr) + '\n').encode('utf-8')
+
+    def _serialiser_binaire(self, ts, _, status, latence, version, unite, entrees, sortie, lot_):
+        X = _entrees_matrice(entrees)
+        bloc = np.zeros(len(X), dtype=RECORD_DTYPE)
+        bloc['ts'] = ts
+        bloc['latency_ms'] = latence * 1000.0
+        bloc['status'] = status
+        bloc['batch'] = lot_
+        bloc['inputs'] = X
+        sorties = np.asarray(sortie if sortie is not None else np.nan, dtype=np.float64).ravel()
+        bloc['output'] = sorties if len(sorties) == len(X) else np.nan
+        bloc['model_version'] = (version or '').encode('utf-8')[:12]
+        bloc['unit'] = (unite or '').encode('utf-8')[:16]
+        return bloc.tobytes()
+
+    def _ouvrir(self):
+        repertoire = os.path.dirname(self.path)
+        if repertoire:
+            os.makedirs(repertoire, exist_ok=True)
+        self._fichier = open(self.path, 'ab')
+        self._ouvert_le = time.time()
+
+    def _fermer(self):
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+
+    # Changement de fichier au-delà de rotate_bytes octets ou de rotate_seconds secondes (0 = désactivé)
+    def _verifier_rotation(self):
+        if self._fichier is None:
+            return
+        trop_gros = self.rotate_bytes and self._fichier.tell() >= self.rotate_bytes
+        trop_vieux = self.rotate_seconds and time.time() - self._ouvert_le >= self.rotate_seconds and self._fichier.tell()
+        if not (trop_gros or trop_vieux):
+            return
+        self._fermer()
+        cible = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+        n = 1
+        while os.path.exists(cible):
+            cible = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.{n}"
+            n += 1
+        try:
+            os.replace(self.path, cible)
+            self.rotations += 1
+        except OSError as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    # Écriture des enregistrements en attente puis fermeture du fichier
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            try:
+                self._file.put(_FIN, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    # Dans un processus enfant (fork) : file et thread neufs, et un fichier par processus (<chemin>.<pid>)
+    # pour que les workers n'écrivent ni ne renomment le même fichier
+    def after_fork(self):
+        racine, extension = os.path.splitext(self.path)
+        self.path = f"{racine}.{os.getpid()}{extension}"
+        self._fichier = None
+        self._demarrer()
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'format': self.format,
+            'queue_depth': self._file.qsize(),
+            'max_queue': self.max_queue,
+            'records': self.records,
+            'written': self.written,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'batches': self.batches,
+            'bytes_written': self.bytes_written,
+            'rotations': self.rotations,
+            'errors': self.errors,
+            'unserializable': self.unserializable,
+            'last_error': self.last_error,
+        }
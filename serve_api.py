@@ -0,0 +1,83 @@
+# Lancement de production de l'API de prédiction (gunicorn, multi-processus)
+#
+# Le modèle (modele_final.pkl) et y_mean.txt sont chargés une seule fois dans le processus
+# parent en important api_model, puis gunicorn crée N workers par fork : les pages du modèle
+# sont partagées en copie à l'écriture. Pas de rechargeur ni de débogueur.
+#
+#   python serve_api.py --workers 4 --threads 4 --bind 0.0.0.0:5000
+#
+# Redémarrage progressif des workers sans coupure : kill -HUP <pid du maître>
+# (les requêtes en cours se terminent dans la limite de --graceful-timeout).
+# Non disponible sous Windows (pas de fork) : utiliser `python api_model.py` en développement.
+import argparse
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+# Application gunicorn dont l'objet WSGI est déjà chargé dans le processus parent
+class PreloadedApplication(BaseApplication):
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for cle, valeur in self.options.items():
+            if cle in self.cfg.settings and valeur is not None:
+                self.cfg.set(cle, valeur)
+
+    def load(self):
+        return self.application
+
+
+# Options en ligne de commande, avec valeurs par défaut lues dans l'environnement
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur de production de l'API de prédiction de densité")
+    parser.add_argument('--bind', default=os.environ.get('API_BIND', '0.0.0.0:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('API_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('API_THREADS', '4')))
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('API_TIMEOUT', '30')))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('API_GRACEFUL_TIMEOUT', '30')))
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('API_KEEPALIVE', '5')))
+    # Recyclage périodique des workers (0 = désactivé)
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('API_MAX_REQUESTS', '0')))
+    parser.add_argument('--max-requests-jitter', type=int, default=int(os.environ.get('API_MAX_REQUESTS_JITTER', '0')))
+    parser.add_argument('--log-level', default=os.environ.get('API_LOG_LEVEL', 'info'))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Import = chargement unique du modèle et de y_mean dans le processus parent, toujours synchrone : les workers
+    # sont créés avec le modèle déjà chargé et préchauffé (API_BACKGROUND_LOAD est ignoré)
+    os.environ['API_BACKGROUND_LOAD'] = '0'
+    import api_model
+    # La surveillance des fichiers du modèle (API_MODEL_WATCH=1) tourne dans chaque worker, pas dans le maître
+    api_model.store.stop()
+
+    # Les objets chargés ne bougeront plus : on les retire du suivi du ramasse-miettes pour
+    # éviter que ses passages ne recopient les pages partagées dans chaque worker
+    gc.collect()
+    gc.freeze()
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'keepalive': args.keepalive,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'loglevel': args.log_level,
+        'preload_app': True,
+    }
+    print(f"🚀 Lancement de {args.workers} worker(s) x {args.threads} thread(s) sur http://{args.bind} ...")
+    PreloadedApplication(api_model.app, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# Frontal binaire de l'API de prédiction sur socket Unix (même machine) ou TCP, sans HTTP ni JSON
+#
+# Protocole à trames préfixées par leur longueur (voir inference_socket.py) : n x 4 float64 en entrée,
+# n float64 en sortie, connexions persistantes et requêtes en pipeline. Le modèle est celui d'api_model
+# (mêmes variables API_*, rechargement à chaud API_MODEL_WATCH compris) ; un thread par connexion.
+#
+#   python serve_socket.py                                   # socket Unix /tmp/density_api.sock
+#   python serve_socket.py --bind 127.0.0.1:5001             # TCP
+#
+# Client : inference_socket.InferenceClient (LISTENER_SOCKET=... pour mqtt_listener.py).
+import argparse
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+
+import numpy as np
+
+from feature_schema import N_FEATURES, SchemaError, check_matrix
+from inference_socket import (DEFAULT_ADDRESS, MAX_ROWS, RAW_DTYPE, REQUEST_HEADER, ROW_BYTES, STATUS_ERROR,
+                              STATUS_INVALID, encode_error, encode_response, parse_address, read_exact)
+
+# Module api_model, importé dans main() (chargement du modèle)
+api = None
+
+
+# Compteurs du serveur, affichés à l'arrêt
+class SocketStats:
+    def __init__(self):
+        self.connections = 0
+        self.active = 0
+        self.frames = 0
+        self.rows = 0
+        self.invalid = 0
+        self.errors = 0
+        self._verrou = threading.Lock()
+
+    def add(self, **increments):
+        with self._verrou:
+            for nom, valeur in increments.items():
+                setattr(self, nom, getattr(self, nom) + valeur)
+
+    def snapshot(self):
+        return {nom: getattr(self, nom) for nom in ('connections', 'active', 'frames', 'rows', 'invalid', 'errors')}
+
+
+STATS = SocketStats()
+
+
+# Prédictions d'une matrice validée avec le modèle courant : une ligne seule suit le chemin de '/predict'
+# (cache approximatif, cache par région, regroupement), un lot celui de '/predict/batch'
+def predire(X):
+    modele = api.store.require()
+    api.store.mark_served(modele)
+    if len(X) == 1:
+        row = X[0]
+        if modele.quantized_cache is not None:
+            return [modele.quantized_cache.get_or_compute(row, lambda r: api.predire_ligne(r, modele))]
+        return [api.predire_ligne(row, modele)]
+    return api.predire_matrice(X, modele)
+
+
+# Connexion persistante : trames lues et traitées dans l'ordre jusqu'à la fermeture par le client
+class InferenceHandler(socketserver.StreamRequestHandler):
+    rbufsize = 65536
+
+    def setup(self):
+        # Réponses envoyées sans délai de Nagle (TCP seulement)
+        self.disable_nagle_algorithm = self.request.family == socket.AF_INET
+        super().setup()
+
+    def handle(self):
+        STATS.add(connections=1, active=1)
+        try:
+            while True:
+                entete = read_exact(self.rfile, REQUEST_HEADER.size)
+                if entete is None:
+                    return
+                (n,) = REQUEST_HEADER.unpack(entete)
+                if n > MAX_ROWS:
+                    # Trame illisible : impossible de resynchroniser le flux, la connexion est fermée
+                    STATS.add(invalid=1)
+                    self.wfile.write(encode_error(STATUS_INVALID, f"Au plus {MAX_ROWS} lignes par trame, reçu : {n}."))
+                    return
+                corps = read_exact(self.rfile, n * ROW_BYTES)
+                if corps is None:
+                    return
+                self.wfile.write(self.traiter(n, corps))
+        except (ConnectionError, socket.timeout):
+            pass
+        finally:
+            STATS.add(active=-1)
+
+    def traiter(self, n, corps):
+        try:
+            X = check_matrix(np.frombuffer(corps, dtype=RAW_DTYPE).reshape(n, N_FEATURES))
+            reponse = encode_response(predire(X) if n else ())
+            STATS.add(frames=1, rows=n)
+            return reponse
+        except SchemaError as e:
+            STATS.add(invalid=1)
+            return encode_error(STATUS_INVALID, str(e))
+        except Exception as e:
+            print(f"❌ Erreur : {e}")
+            STATS.add(errors=1)
+            return encode_error(STATUS_ERROR, str(e))
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+# Serveur lié à l'adresse (chemin de socket Unix ou hôte:port) ; un ancien fichier de socket est remplacé
+def create_server(adresse, mode=0o660):
+    famille, cible = parse_address(adresse)
+    if famille == socket.AF_INET:
+        return ThreadingTCPServer(cible, InferenceHandler)
+    if os.path.exists(cible) and stat.S_ISSOCK(os.stat(cible).st_mode):
+        os.unlink(cible)
+    serveur = ThreadingUnixServer(cible, InferenceHandler)
+    os.chmod(cible, mode)
+    return serveur
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Frontal binaire (socket Unix ou TCP) de l'API de prédiction de densité")
+    parser.add_argument('--bind', default=os.environ.get('API_SOCKET', DEFAULT_ADDRESS),
+                        help="Chemin de socket Unix ou hôte:port")
+    parser.add_argument('--mode', default=os.environ.get('API_SOCKET_MODE', '660'),
+                        help="Permissions du fichier de socket Unix (octal)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global api
+    args = parse_args(argv)
+    # Import = chargement et préchauffage du modèle
+    import api_model
+    api = api_model
+    serveur = create_server(args.bind, int(args.mode, 8))
+    # Arrêt propre sur SIGTERM comme sur Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"🚀 Frontal binaire en écoute sur {args.bind} ...")
+    debut = time.perf_counter()
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+        if serveur.address_family == socket.AF_UNIX and os.path.exists(args.bind):
+            os.unlink(args.bind)
+        print(f"🛑 Arrêt après {time.perf_counter() - debut:.0f} s : {STATS.snapshot()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+# Les modules de l'application sont à la racine du dépôt : importables depuis les tests quel que soit le répertoire courant
+import os
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+# Avertissement déjà filtré par api_model (tableaux NumPy construits selon le schéma), rétabli par pytest à chaque test
+def pytest_configure(config):
+    config.addinivalue_line('filterwarnings', 'ignore:X does not have valid feature names')
+
+
+# Module api_model importé une fois : il charge et préchauffe le modèle depuis la racine du dépôt
+@pytest.fixture(scope='session')
+def api():
+    if not os.path.exists(os.path.join(RACINE, 'modele_final.pkl')):
+        pytest.skip("modele_final.pkl absent")
+    repertoire = os.getcwd()
+    os.chdir(RACINE)
+    try:
+        import api_model
+    finally:
+        os.chdir(repertoire)
+    return api_model
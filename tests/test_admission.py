@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, Rejected
+
+
+def test_place_libre_puis_file_pleine_429():
+    controleur = AdmissionController(max_in_flight=1, max_queue=0)
+    assert controleur.acquire() == 0.0
+    with pytest.raises(Rejected) as refus:
+        controleur.acquire()
+    assert (refus.value.status, refus.value.reason) == (429, 'queue_full')
+    assert refus.value.retry_after >= 1
+    controleur.release(0.01)
+    assert controleur.acquire() == 0.0
+    assert controleur.stats()['shed'] == {'queue_full': 1, 'timeout': 0, 'deadline': 0}
+
+
+def test_attente_trop_longue_503():
+    controleur = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+    controleur.acquire()
+    debut = time.monotonic()
+    with pytest.raises(Rejected) as refus:
+        controleur.acquire()
+    assert (refus.value.status, refus.value.reason) == (503, 'timeout')
+    assert time.monotonic() - debut >= 0.05
+    assert controleur.waiting == 0
+
+
+def test_echeance_impossible_503():
+    controleur = AdmissionController(max_in_flight=2)
+    controleur.service_seconds = 0.5
+    with pytest.raises(Rejected) as refus:
+        controleur.acquire(deadline=time.monotonic() + 0.1)
+    assert (refus.value.status, refus.value.reason) == (503, 'deadline')
+    assert controleur.in_flight == 0
+
+
+def test_requete_en_attente_admise_a_la_liberation():
+    controleur = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=2.0)
+    controleur.acquire()
+    attentes = []
+    attente = threading.Thread(target=lambda: attentes.append(controleur.acquire()))
+    attente.start()
+    while not controleur.waiting:
+        time.sleep(0.001)
+    time.sleep(0.02)
+    controleur.release(0.02)
+    attente.join(2)
+    assert attentes and attentes[0] >= 0.02
+    assert controleur.in_flight == 1 and controleur.queued == 1
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+import requests
+
+from api_client import ApiClient, CircuitBreaker, CircuitOpen
+
+
+class Reponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.ok = status_code < 400
+
+
+# Client dont la session renvoie les réponses (ou lève les exceptions) données, dans l'ordre
+def client_scripte(*issues, **options):
+    client = ApiClient('http://127.0.0.1:9/predict', backoff=0.001, backoff_max=0.01, **options)
+    issues = list(issues)
+
+    def post(url, **_):
+        issue = issues.pop(0)
+        if isinstance(issue, BaseException):
+            raise issue
+        return issue
+
+    client.session.post = post
+    return client
+
+
+def test_disjoncteur_transitions():
+    disjoncteur = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert disjoncteur.allow()
+    disjoncteur.record_failure()
+    assert disjoncteur.state == 'closed' and disjoncteur.allow()
+    disjoncteur.record_failure()
+    assert disjoncteur.state == 'open' and not disjoncteur.allow()
+    time.sleep(0.06)
+    # Demi-ouverture : un seul appel d'essai à la fois
+    assert disjoncteur.allow() and disjoncteur.state == 'half_open'
+    assert not disjoncteur.allow()
+    disjoncteur.record_failure()
+    assert disjoncteur.state == 'open' and disjoncteur.opened == 2
+    time.sleep(0.06)
+    assert disjoncteur.allow()
+    disjoncteur.record_success()
+    assert disjoncteur.state == 'closed' and disjoncteur.failures == 0
+    assert disjoncteur.allow() and disjoncteur.allow()
+    assert disjoncteur.stats()['rejected'] == 2
+
+
+def test_nouvelles_tentatives_puis_succes():
+    client = client_scripte(Reponse(503), requests.ConnectionError('refusée'), Reponse(200), retries=2)
+    assert client.post(json={}).status_code == 200
+    stats = client.stats()
+    assert (stats['attempts'], stats['retries'], stats['failures']) == (3, 2, 0)
+    assert stats['errors'] == {'503': 1, 'connection': 1}
+
+
+def test_tentatives_epuisees_ouvrent_le_circuit():
+    client = client_scripte(*[requests.ConnectTimeout('délai')] * 2, retries=1,
+                            breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    with pytest.raises(requests.ConnectTimeout):
+        client.post(json={})
+    with pytest.raises(CircuitOpen):
+        client.post(json={})
+    assert client.stats()['breaker']['state'] == 'open'
+
+
+def test_erreur_imprevue_pendant_l_essai_ne_bloque_pas_le_disjoncteur():
+    client = client_scripte(TypeError("corps non sérialisable"), KeyboardInterrupt(), Reponse(200),
+                            breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.01))
+    client.breaker.record_failure()
+    for exception in (TypeError, KeyboardInterrupt):
+        time.sleep(0.02)
+        with pytest.raises(exception):
+            client.post(json={})
+        assert client.breaker.state == 'open'
+    time.sleep(0.02)
+    assert client.post(json={}).status_code == 200
+    assert client.breaker.state == 'closed'
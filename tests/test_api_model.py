@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from model_registry import ModelRegistry
+
+
+def test_readyz_attend_le_regime_etabli(api, monkeypatch):
+    client = api.app.test_client()
+    modele = api.store.current
+    monkeypatch.setitem(modele.warmup, 'steady', False)
+    reponse = client.get('/readyz')
+    assert reponse.status_code == 503 and reponse.get_json()['status'] == 'warming'
+    monkeypatch.setattr(api, 'WARMUP_ALLOW_UNSTEADY', True)
+    assert client.get('/readyz').status_code == 200
+    monkeypatch.setattr(api, 'WARMUP_ALLOW_UNSTEADY', False)
+    monkeypatch.setitem(modele.warmup, 'steady', True)
+    assert client.get('/readyz').get_json()['status'] == 'ready'
+    assert client.get('/healthz').status_code == 200
+
+
+LECTURE = {'Débit_Acide_m3h': 30.0, 'Débit_Vapeur_kgh': 3550.0, 'Température_Évaporateur_C': 92.2, 'Vide_Bouilleur_torr': 59.0}
+
+
+# Flux NDJSON de n lectures ; les lignes listées dans invalides sont hors plage, les lignes vides sont ignorées
+def flux(n, invalides=()):
+    lignes = []
+    for i in range(n):
+        lecture = dict(LECTURE, **{'Débit_Acide_m3h': 500.0 if i in invalides else 10.0 + i})
+        lignes.append(json.dumps(lecture))
+    return ('\n'.join(lignes[:2] + [''] + lignes[2:]) + '\n').encode('utf-8')
+
+
+def test_flux_par_blocs_avec_erreurs_et_bilan(api):
+    client = api.app.test_client()
+    reponse = client.post('/predict/stream?chunk=4&summary=1', data=flux(10, invalides=(3,)), buffered=False)
+    assert reponse.status_code == 200 and reponse.mimetype == 'application/x-ndjson'
+    morceaux = [morceau for morceau in reponse.response if morceau]
+    # 10 lignes par blocs de 4 (4, 4, 2), puis la ligne de bilan
+    assert [morceau.count(b'\n') for morceau in morceaux] == [4, 4, 2, 1]
+    sorties = [json.loads(ligne) for ligne in b''.join(morceaux).splitlines()]
+    # Ligne 3 (4e ligne du corps après la ligne vide) hors plage, à sa place dans la sortie
+    assert 'Débit_Acide_m3h' in sorties[3]['error'] and sorties[3]['ligne'] == 4
+    X = np.array([[10.0 + i, 3550.0, 92.2, 59.0] for i in range(10) if i != 3])
+    attendues = api.predire_matrice(X, api.store.current)
+    assert [s['Densité_Sortie'] for s in sorties[:10] if 'error' not in s] == [float(p) for p in attendues]
+    bilan = sorties[10]['summary']
+    assert (bilan['rows'], bilan['errors'], bilan['model_version']) == (10, 1, api.store.current.version)
+    assert reponse.headers['X-Model-Version'] == api.store.current.version
+
+
+def test_flux_parametres_invalides_et_unites(api, tmp_path, monkeypatch):
+    client = api.app.test_client()
+    assert client.post('/predict/stream?chunk=0', data=flux(1)).status_code == 400
+    assert client.post('/units/inconnue/predict/stream', data=flux(1)).status_code == 404
+    version = tmp_path / 'u1' / 'v1'
+    version.mkdir(parents=True)
+    for nom in ('modele_final.pkl', 'y_mean.txt'):
+        shutil.copy(os.path.join(os.path.dirname(api.__file__), nom), version / nom)
+    monkeypatch.setattr(api, 'unit_models', ModelRegistry(api.charger_modele_unite, root=str(tmp_path)))
+    reponse = client.post('/units/u1/predict/stream?summary=1', data=flux(3))
+    assert reponse.status_code == 200
+    assert (reponse.headers['X-Model-Unit'], reponse.headers['X-Model-Version']) == ('u1', 'v1')
+    sorties = [json.loads(ligne) for ligne in reponse.data.splitlines()]
+    assert len(sorties) == 4 and sorties[3]['summary']['model_version'] == 'v1'
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from async_listener import AsyncBridge
+
+
+# Pont démarré dans sa propre boucle asyncio, comme sous paho : submit() et stop() viennent d'un autre thread
+def demarrer(bridge, drain=5.0):
+    fil = threading.Thread(target=lambda: asyncio.run(bridge.run(drain=drain)), daemon=True)
+    fil.start()
+    while not bridge.ready():
+        time.sleep(0.001)
+    return fil
+
+
+def arreter(bridge, fil):
+    bridge.stop()
+    fil.join(10)
+    assert not fil.is_alive()
+
+
+def collecteur():
+    publications = []
+    return publications, lambda topic, texte: publications.append((topic, json.loads(texte)))
+
+
+# Notation bloquée sur le premier message : les suivants s'accumulent dans la file
+def notation_bloquee():
+    commence, libere = threading.Event(), threading.Event()
+
+    def score(data, unite):
+        commence.set()
+        libere.wait(10)
+        return {'x': data['x'], 'unit': unite}, True
+    return commence, libere, score
+
+
+@pytest.mark.parametrize('politique, attendus', [('drop_new', [1, 2, 3]), ('drop_oldest', [1, 4, 5])])
+def test_file_pleine(politique, attendus):
+    publications, publier = collecteur()
+    commence, libere, score = notation_bloquee()
+    bridge = AsyncBridge(publier, score, workers=1, max_queue=2, policy=politique)
+    fil = demarrer(bridge)
+    bridge.submit(json.dumps({'x': 1}), 't')
+    assert commence.wait(5)
+    for x in range(2, 6):
+        bridge.submit(json.dumps({'x': x}), 't', 'u1')
+    while bridge.received < 5:
+        time.sleep(0.001)
+    libere.set()
+    arreter(bridge, fil)
+    assert [r['seq'] for _, r in publications] == attendus
+    assert [r['x'] for _, r in publications] == attendus
+    assert [r['unit'] for _, r in publications] == [''] + ['u1'] * 2
+    stats = bridge.stats()
+    assert (stats['received'], stats['dropped'], stats['published'], stats['max_depth']) == (5, 2, 3, 2)
+
+
+def test_politique_inconnue():
+    with pytest.raises(ValueError, match='drop_new'):
+        AsyncBridge(print, print, policy='drop_all')
+
+
+def test_delai_depasse_publie_une_erreur():
+    publications, publier = collecteur()
+    commence, libere, score = notation_bloquee()
+    bridge = AsyncBridge(publier, score, workers=1, timeout=0.05)
+    fil = demarrer(bridge)
+    bridge.submit(json.dumps({'x': 1}), 't')
+    while bridge.published < 1:
+        time.sleep(0.001)
+    libere.set()
+    bridge.submit(json.dumps({'x': 2}), 't')
+    arreter(bridge, fil)
+    assert publications[0] == ('t', {'error': 'Délai de notation dépassé (50 ms).', 'seq': 1})
+    assert publications[1] == ('t', {'x': 2, 'unit': '', 'seq': 2})
+    assert (bridge.timeouts, bridge.errors, bridge.published) == (1, 1, 2)
+
+
+def test_numeros_de_reception_et_erreurs():
+    publications, publier = collecteur()
+
+    def score(data, unite):
+        if data['x'] % 5 == 0:
+            raise RuntimeError('capteur hors service')
+        return {'x': data['x']}, data['x'] % 7 != 0
+    bridge = AsyncBridge(publier, score, workers=4)
+    fil = demarrer(bridge)
+    for x in range(1, 31):
+        bridge.submit(json.dumps({'x': x}) if x != 30 else b'{pas du json', f't{x}')
+    arreter(bridge, fil)
+    # Publication possiblement dans le désordre : chaque message garde le numéro de sa réception
+    par_seq = {r['seq']: (topic, r) for topic, r in publications}
+    assert sorted(par_seq) == list(range(1, 31))
+    for seq, (topic, r) in par_seq.items():
+        assert topic == f't{seq}'
+        if seq % 5 == 0:
+            assert 'error' in r
+        else:
+            assert r['x'] == seq
+    assert par_seq[5][1]['error'] == 'capteur hors service'
+    # 5, 10, 15, 20, 25, 30 (exceptions et JSON invalide) plus 7, 14, 21, 28 (échecs de notation)
+    assert (bridge.errors, bridge.published, bridge.dropped) == (10, 30, 0)
+
+
+def test_arret_traite_les_messages_en_file():
+    publications, publier = collecteur()
+
+    def score(data, unite):
+        time.sleep(0.005)
+        return {'x': data['x']}, True
+    bridge = AsyncBridge(publier, score, workers=1, max_queue=100)
+    fil = demarrer(bridge)
+    for x in range(40):
+        bridge.submit(json.dumps({'x': x}), 't')
+    arreter(bridge, fil)
+    assert [r['seq'] for _, r in publications] == list(range(1, 41))
+    assert bridge.stats()['queue_depth'] == 0
+
+
+def test_arret_borne_par_drain(capsys):
+    publications, publier = collecteur()
+    commence, libere, score = notation_bloquee()
+    bridge = AsyncBridge(publier, score, workers=1, max_queue=100)
+    fil = demarrer(bridge, drain=0.05)
+    for x in range(5):
+        bridge.submit(json.dumps({'x': x}), 't')
+    assert commence.wait(5)
+    while bridge.received < 5:
+        time.sleep(0.001)
+    arreter(bridge, fil)
+    libere.set()
+    assert publications == [] and bridge.stats()['queue_depth'] == 4
+    assert 'Arrêt avec 4 message(s) non traité(s)' in capsys.readouterr().out
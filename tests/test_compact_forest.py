@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from compact_forest import _bornes_arbres, assemble, collapse_tree, compact, greedy_order, rmse, tree_values
+from fast_forest import FastForest
+from feature_schema import FEATURES
+
+Y_MEAN = 1700.0
+
+
+# Lectures tirées dans les plages du schéma
+def lectures(n, graine):
+    rng = np.random.default_rng(graine)
+    return np.column_stack([rng.uniform(f.minimum, f.maximum, n) for f in FEATURES])
+
+
+def cible(X, graine):
+    bruit = np.random.default_rng(graine).normal(0.0, 2.0, len(X))
+    return X @ np.array([0.5, 0.01, -0.3, 0.05]) + bruit
+
+
+@pytest.fixture(scope='module')
+def donnees():
+    X_train, X_test = lectures(400, 0), lectures(150, 1)
+    modele = Pipeline([('scaler', StandardScaler()), ('rf', RandomForestRegressor(n_estimators=12, max_depth=8, random_state=0))])
+    modele.fit(X_train, cible(X_train, 2))
+    return FastForest.from_pipeline(modele, Y_MEAN), X_train, X_test, cible(X_test, 3) + Y_MEAN
+
+
+def test_tolerance_nulle_et_tous_les_arbres_reproduisent_la_foret(donnees):
+    foret, X_train, X_test, _ = donnees
+    arbres = [collapse_tree(foret, debut, fin, 0.0) for debut, fin in _bornes_arbres(foret)]
+    assert sum(len(arbre[4]) for arbre in arbres) <= len(foret.value)
+    ordre = greedy_order(tree_values(foret, X_train), tree_values(foret, X_train).mean(axis=0))
+    assert sorted(ordre) == list(range(foret.n_trees))
+    for dtype, tolerance in ((np.float64, 1e-9), (np.float32, 1e-3)):
+        reconstruite = assemble([arbres[i] for i in ordre], foret.y_mean, foret.feature_names, dtype=dtype)
+        assert reconstruite.n_trees == foret.n_trees
+        np.testing.assert_allclose(reconstruite.predict_many(X_test), foret.predict_many(X_test), atol=tolerance, rtol=0)
+
+
+def test_fusion_reduit_les_noeuds(donnees):
+    foret, _, X_test, _ = donnees
+    debut, fin = _bornes_arbres(foret)[0]
+    complet, fusionne = collapse_tree(foret, debut, fin, 0.0), collapse_tree(foret, debut, fin, 5.0)
+    assert len(fusionne[4]) < len(complet[4])
+    assert fusionne[5] <= complet[5]
+    # Chaque prédiction de l'arbre fusionné reste à la tolérance près de celle de l'arbre d'origine
+    ecart = assemble([fusionne], 0.0, foret.feature_names, np.float64).predict_many(X_test) \
+        - assemble([complet], 0.0, foret.feature_names, np.float64).predict_many(X_test)
+    assert np.abs(ecart).max() <= 5.0
+
+
+def test_compaction_sous_la_limite(donnees):
+    foret, X_train, X_test, y_test = donnees
+    compacte, rapport = compact(foret, X_train, X_test, y_test, 0.5, tolerances=(0.0, 1.0, 4.0), verbose=False)
+    limite = rmse(foret.predict_many(X_test), y_test) + 0.5
+    assert rapport['rmse_full'] == pytest.approx(limite - 0.5)
+    assert rapport['rmse_compact'] == rmse(compacte.predict_many(X_test), y_test) <= limite
+    assert compacte.n_trees == rapport['n_trees'] <= foret.n_trees
+    assert len(compacte.value) < len(foret.value)
+    assert compacte.threshold.dtype == np.float32
+
+
+def test_budget_intenable(donnees):
+    foret, X_train, X_test, y_test = donnees
+    with pytest.raises(ValueError, match='budget'):
+        compact(foret, X_train, X_test, y_test, -1.0, tolerances=(0.0,), verbose=False)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from fast_forest import FastForest
+from feature_schema import FEATURES, FEATURE_NAMES
+
+Y_MEAN = 1700.0
+
+
+# Lectures tirées dans les plages du schéma
+def lectures(n, graine):
+    rng = np.random.default_rng(graine)
+    return np.column_stack([rng.uniform(f.minimum, f.maximum, n) for f in FEATURES])
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    X = lectures(400, 0)
+    y = X @ np.array([0.5, 0.01, -0.3, 0.05]) + np.random.default_rng(1).normal(0, 1, len(X))
+    modele = Pipeline([('scaler', StandardScaler()), ('rf', RandomForestRegressor(n_estimators=12, max_depth=8, random_state=0))])
+    return modele.fit(X, y)
+
+
+def test_predict_many_identique_a_sklearn(pipeline):
+    forest = FastForest.from_pipeline(pipeline, Y_MEAN)
+    X = lectures(500, 2)
+    np.testing.assert_array_equal(forest.predict_many(X), pipeline.predict(X) + Y_MEAN)
+
+
+def test_predict_one_identique_a_sklearn(pipeline):
+    forest = FastForest.from_pipeline(pipeline, Y_MEAN)
+    for x in lectures(50, 3):
+        assert forest.predict_one(x) == pipeline.predict(x[None, :])[0] + Y_MEAN
+
+
+def test_seuils_exacts(pipeline):
+    # Valeurs placées exactement sur les seuils de l'arbre (après repliement du StandardScaler)
+    forest = FastForest.from_pipeline(pipeline, Y_MEAN)
+    internes = np.isfinite(forest.threshold)
+    X = np.tile(lectures(1, 4), (internes.sum(), 1))
+    X[np.arange(len(X)), forest.feature[internes]] = forest.threshold[internes]
+    np.testing.assert_array_equal(forest.predict_many(X), pipeline.predict(X) + Y_MEAN)
+
+
+def test_ligne_invalide(pipeline):
+    forest = FastForest.from_pipeline(pipeline, Y_MEAN)
+    assert forest.feature_names == FEATURE_NAMES
+    with pytest.raises(ValueError):
+        forest.predict_one([1.0, 2.0])
+    with pytest.raises(ValueError):
+        forest.predict_one([np.nan, 1.0, 1.0, 1.0])
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from feature_schema import FEATURE_NAMES, N_FEATURES, SchemaError, build_matrix, build_row
+
+LECTURE = {'Débit_Acide_m3h': 30.0, 'Débit_Vapeur_kgh': 3550.0, 'Température_Évaporateur_C': 92.2, 'Vide_Bouilleur_torr': 59.0}
+
+
+def colonnes(**remplacements):
+    data = {nom: [valeur, valeur] for nom, valeur in LECTURE.items()}
+    data.update(remplacements)
+    return data
+
+
+def test_lignes_et_colonnes():
+    attendu = np.array([[LECTURE[nom] for nom in FEATURE_NAMES]] * 2)
+    np.testing.assert_array_equal(build_matrix([LECTURE, LECTURE]), attendu)
+    np.testing.assert_array_equal(build_matrix(colonnes()), attendu)
+    np.testing.assert_array_equal(build_row(LECTURE), attendu[0])
+    assert build_matrix({nom: [] for nom in FEATURE_NAMES}).shape == (0, N_FEATURES)
+
+
+@pytest.mark.parametrize('lot', [
+    [{**LECTURE, 'Débit_Acide_m3h': 'x'}],
+    [{**LECTURE, 'Débit_Acide_m3h': True}],
+    [{**LECTURE, 'Débit_Acide_m3h': float('nan')}],
+    [{**LECTURE, 'Débit_Acide_m3h': 1000.0}],
+    [{nom: valeur for nom, valeur in LECTURE.items() if nom != 'Vide_Bouilleur_torr'}],
+    [[30.0, 3550.0, 92.2, 59.0]],
+    colonnes(Débit_Acide_m3h=[30.0]),
+    colonnes(Débit_Acide_m3h=30.0),
+    colonnes(Débit_Acide_m3h=['a', 'b']),
+    colonnes(Débit_Acide_m3h=[30.0, float('inf')]),
+    # Colonnes imbriquées ou irrégulières
+    colonnes(Débit_Acide_m3h=[[1, 2], [3, 4]]),
+    colonnes(Débit_Acide_m3h=[30.0, [2]]),
+    {nom: [[1, 2]] for nom in FEATURE_NAMES},
+    b'{pas du json',
+    42,
+])
+def test_lot_invalide(lot):
+    with pytest.raises(SchemaError):
+        build_matrix(lot)
+
+
+def test_predict_batch_colonne_imbriquee(api):
+    client = api.app.test_client()
+    reponse = client.post('/predict/batch', json={nom: [[1, 2]] for nom in FEATURE_NAMES})
+    assert reponse.status_code == 400
+    assert 'error' in reponse.get_json()
+    assert client.post('/predict/batch', json=colonnes()).status_code == 200
@@ -0,0 +1,41 @@
+import threading
+
+import numpy as np
+import pytest
+
+import serve_socket
+from feature_schema import SchemaError
+from inference_socket import InferenceClient
+
+
+# Serveur réel sur socket Unix ; la prédiction est remplacée par la somme des colonnes (sans modèle)
+@pytest.fixture
+def adresse(tmp_path, monkeypatch):
+    monkeypatch.setattr(serve_socket, 'predire', lambda X: X.sum(axis=1))
+    chemin = str(tmp_path / 'inference.sock')
+    serveur = serve_socket.create_server(chemin)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    yield chemin
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def test_pipeline_de_trames_plus_grandes_que_les_tampons(adresse):
+    # 16 trames de 20 000 lignes (640 Ko en envoi, 160 Ko en réponse) envoyées d'une seule fenêtre
+    rng = np.random.default_rng(0)
+    matrices = [rng.uniform(0, 50, (20000, 4)) for _ in range(16)]
+    with InferenceClient(adresse, timeout=5.0, window=64) as client:
+        resultats = client.predict_pipelined(matrices)
+    assert len(resultats) == 16
+    for X, y in zip(matrices, resultats):
+        np.testing.assert_array_equal(y, X.sum(axis=1))
+
+
+def test_erreur_de_donnees_apres_toutes_les_reponses(adresse):
+    valide = np.array([[30.0, 3550.0, 92.2, 59.0]])
+    with InferenceClient(adresse, timeout=5.0, window=2) as client:
+        with pytest.raises(SchemaError):
+            client.predict_pipelined([valide, valide * -1, valide, valide])
+        # Connexion toujours synchronisée après l'erreur
+        assert client.predict_one(valide[0]) == valide.sum()
+        assert client.reconnects == 0
@@ -0,0 +1,40 @@
+import metrics
+
+
+def test_format_d_exposition():
+    registre = metrics.Registry()
+    requetes = registre.counter('app_requests_total', "Requêtes traitées", ('endpoint', 'status'))
+    requetes.labels('/predict', '200').inc()
+    requetes.labels('/predict', '200').inc(2)
+    requetes.labels('/a"b\\c\nd', '500').inc()
+    registre.gauge('app_in_flight', "En cours").set(3)
+    duree = registre.histogram('app_seconds', "Durée", ('stage',), buckets=(0.1, 1.0))
+    for valeur in (0.05, 0.5, 5.0):
+        duree.labels('parse').observe(valeur)
+    registre.gauge_function('app_rss_bytes', "Mémoire", lambda: 1024)
+    assert registre.render().splitlines() == [
+        '# HELP app_requests_total Requêtes traitées',
+        '# TYPE app_requests_total counter',
+        'app_requests_total{endpoint="/a\\"b\\\\c\\nd",status="500"} 1.0',
+        'app_requests_total{endpoint="/predict",status="200"} 3.0',
+        '# HELP app_in_flight En cours',
+        '# TYPE app_in_flight gauge',
+        'app_in_flight 3.0',
+        '# HELP app_seconds Durée',
+        '# TYPE app_seconds histogram',
+        'app_seconds_bucket{stage="parse",le="0.1"} 1',
+        'app_seconds_bucket{stage="parse",le="1.0"} 2',
+        'app_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'app_seconds_sum{stage="parse"} 5.55',
+        'app_seconds_count{stage="parse"} 3',
+        '# HELP app_rss_bytes Mémoire',
+        '# TYPE app_rss_bytes gauge',
+        'app_rss_bytes 1024.0',
+    ]
+
+
+def test_jauge_calculee_en_echec():
+    registre = metrics.Registry()
+    registre.gauge_function('app_broken', "Indisponible", lambda: 1 / 0)
+    assert registre.render() == '# HELP app_broken Indisponible\n# TYPE app_broken gauge\n'
+
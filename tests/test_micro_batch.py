@@ -0,0 +1,49 @@
+import pytest
+
+from micro_batch import MicroBatcher
+
+
+def test_declenchement_par_taille():
+    lots = []
+    batcher = MicroBatcher(lambda items: lots.append(list(items)) or [2 * x for x in items], max_rows=4, max_wait_ms=10000)
+    futures = [batcher.submit(x) for x in range(8)]
+    # Sans déclenchement par taille, la fenêtre de 10 s ferait dépasser le délai
+    assert [f.result(2) for f in futures] == [0, 2, 4, 6, 8, 10, 12, 14]
+    assert lots == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    stats = batcher.stats()
+    assert stats['flush_reasons'] == {'taille': 2, 'delai': 0} and stats['batch_size_histogram'] == {4: 2}
+    batcher.close()
+
+
+def test_declenchement_par_delai():
+    batcher = MicroBatcher(lambda items: items, max_rows=64, max_wait_ms=20)
+    assert batcher.predict('a', timeout=2) == 'a'
+    assert batcher.stats()['flush_reasons'] == {'taille': 0, 'delai': 1}
+    batcher.close()
+
+
+def test_resultats_dans_l_ordre_de_soumission():
+    batcher = MicroBatcher(lambda items: [x * x for x in items], max_rows=16, max_wait_ms=5)
+    futures = [batcher.submit(x) for x in range(200)]
+    assert [f.result(5) for f in futures] == [x * x for x in range(200)]
+    assert batcher.stats()['rows'] == 200
+    batcher.close()
+
+
+def test_exception_livree_a_chaque_appelant():
+    def echec(items):
+        raise ValueError("modèle indisponible")
+
+    batcher = MicroBatcher(echec, max_rows=3, max_wait_ms=10000)
+    futures = [batcher.submit(x) for x in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match="indisponible"):
+            future.result(2)
+    # Nombre de résultats incorrect : erreur pour tout le lot
+    batcher.fonction_lot = lambda items: items[:-1]
+    futures = [batcher.submit(x) for x in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(2)
+    batcher.close()
+
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import ModelRegistry, ShadowScorer, UnknownModel, estimate_nbytes
+from model_store import LoadedModel
+
+
+@pytest.fixture(scope='module')
+def foret():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1, (100, 4))
+    return RandomForestRegressor(n_estimators=3, max_depth=3, random_state=0).fit(X, X[:, 0])
+
+
+# Unités a, b, c avec les versions v1 et v2 ; l'unité a sert v1 (fichier active), les autres leur dernière version
+@pytest.fixture
+def racine(tmp_path):
+    for unite in 'abc':
+        for version in ('v1', 'v2'):
+            (tmp_path / unite / version).mkdir(parents=True)
+    (tmp_path / 'a' / 'active').write_text('v1\n')
+    return str(tmp_path)
+
+
+class Chargeur:
+    def __init__(self, foret):
+        self.foret = foret
+        self.appels = []
+
+    def __call__(self, repertoire, version):
+        self.appels.append(repertoire)
+        return LoadedModel(version, model=self.foret)
+
+
+def test_chargement_a_la_premiere_utilisation(racine, foret):
+    chargeur = Chargeur(foret)
+    charges = []
+    registre = ModelRegistry(chargeur, root=racine, on_load=lambda *args: charges.append(args[:2]))
+    assert registre.units() == ['a', 'b', 'c'] and chargeur.appels == []
+    assert registre.get('a').version == 'v1'
+    assert registre.get('b').version == 'v2'
+    registre.get('a')
+    assert (registre.loads, registre.hits, len(registre)) == (2, 1, 2)
+    assert charges == [('a', 'v1'), ('b', 'v2')]
+    assert registre.get('a', 'v2').version == 'v2'
+
+
+def test_eviction_lru(racine, foret):
+    evinces = []
+    registre = ModelRegistry(Chargeur(foret), root=racine, max_models=2,
+                             on_evict=lambda unite, version, modele: evinces.append(unite))
+    registre.get('a')
+    registre.get('b')
+    registre.get('a')
+    registre.get('c')
+    assert evinces == ['b']
+    registre.get('b')
+    assert evinces == ['b', 'a']
+    assert registre.evictions == 2 and len(registre) == 2
+
+
+def test_plafond_memoire(racine, foret):
+    octets = estimate_nbytes(LoadedModel('v1', model=foret))
+    registre = ModelRegistry(Chargeur(foret), root=racine, max_models=10, max_bytes=int(octets * 1.5))
+    registre.get('a')
+    registre.get('b')
+    assert len(registre) == 1 and registre.resident_bytes == octets
+    # Un modèle seul plus gros que le plafond est tout de même conservé
+    registre.max_bytes = 1
+    registre.get('c')
+    assert len(registre) == 1
+
+
+def test_empreinte_pipeline_ou_foret_seule(foret):
+    pipeline = Pipeline([('scaler', StandardScaler()), ('rf', foret)])
+    seule = estimate_nbytes(LoadedModel('v1', model=foret))
+    assert seule > 0 and estimate_nbytes(LoadedModel('v1', model=pipeline)) == seule
+
+
+def test_echecs_sans_verrou_residuel(racine, foret):
+    registre = ModelRegistry(Chargeur(foret), root=racine)
+    with pytest.raises(UnknownModel):
+        registre.get('inconnue')
+    with pytest.raises(UnknownModel):
+        registre.get('a', 'v9')
+    registre._loader = lambda repertoire, version: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        registre.get('b')
+    assert registre._chargements == {} and registre.load_failures == 1
+
+
+def test_notation_shadow():
+    notes, demarre, libere = [], threading.Event(), threading.Event()
+
+    def noter(valeur):
+        if valeur == 'bloque':
+            demarre.set()
+            libere.wait(5)
+        elif valeur == 'erreur':
+            raise ValueError(valeur)
+        notes.append(valeur)
+
+    scorer = ShadowScorer(noter, max_queue=1)
+    assert scorer.submit('bloque')
+    assert demarre.wait(5)
+    # Thread occupé et file d'une place : le troisième élément est abandonné
+    assert scorer.submit('erreur')
+    assert not scorer.submit('abandonne')
+    libere.set()
+    attendre(lambda: scorer.errors == 1)
+    assert scorer.submit('ok')
+    attendre(lambda: 'ok' in notes)
+    assert notes == ['bloque', 'ok']
+    assert scorer.stats() == {'queue_depth': 0, 'max_queue': 1, 'submitted': 3, 'dropped': 1, 'errors': 1}
+
+
+def attendre(condition, limite=5.0):
+    echeance = time.monotonic() + limite
+    while not condition() and time.monotonic() < echeance:
+        time.sleep(0.01)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from model_store import LoadedModel, ModelStore
+
+
+def test_remplacement_et_premiere_requete():
+    versions = iter(['v1', 'v2'])
+    store = ModelStore(lambda: LoadedModel(next(versions)))
+    ancien = store.load()
+    assert store.last_swap_seconds is None
+    store.mark_served(ancien)
+    premier = store.last_swap_seconds
+    assert premier is not None
+    nouveau = store.load('admin')
+    store.mark_served(ancien)
+    assert store.last_swap_seconds == premier
+    time.sleep(0.01)
+    store.mark_served(nouveau)
+    assert store.last_swap_seconds >= 0.01
+    assert (store.current.version, store.reloads) == ('v2', 1)
+
+
+def test_echec_conserve_le_modele_courant():
+    store = ModelStore(lambda: LoadedModel('v1'))
+    store.load()
+    store._loader = lambda: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        store.load('admin')
+    assert store.current.version == 'v1' and store.failures == 1 and not store.loading
+
+
+def test_un_seul_rechargement_a_la_fois():
+    libere = threading.Event()
+    chargements = []
+
+    def charger():
+        chargements.append(1)
+        libere.wait(5)
+        return LoadedModel(f'v{len(chargements)}')
+
+    store = ModelStore(charger)
+    resultats = []
+    demandes = [threading.Thread(target=lambda: resultats.append(store.reload_async())) for _ in range(8)]
+    for demande in demandes:
+        demande.start()
+    for demande in demandes:
+        demande.join()
+    assert sorted(resultats) == [False] * 7 + [True]
+    libere.set()
+    fin = time.monotonic() + 5
+    while store.current is None and time.monotonic() < fin:
+        time.sleep(0.01)
+    assert chargements == [1] and not store.loading
+    assert store.reload_async()
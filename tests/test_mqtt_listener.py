@@ -0,0 +1,125 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+import mqtt_listener as listener
+from fast_forest import ARTIFACT_DIR, FastForest, save_artifact
+from feature_schema import FEATURE_NAMES
+from model_registry import ModelRegistry
+from partitioned_listener import PartitionedBridge
+from prediction_cache import QuantizedCache
+
+LECTURE = dict(zip(FEATURE_NAMES, [30.0, 3550.0, 92.2, 59.0]))
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    rng = np.random.default_rng(0)
+    X = rng.uniform([0, 0, 0, 0], [100, 10000, 200, 760], (200, 4))
+    modele = Pipeline([('scaler', StandardScaler()), ('rf', RandomForestRegressor(n_estimators=4, max_depth=4, random_state=0))])
+    return modele.fit(X, X[:, 0])
+
+
+# Registre embarqué à deux unités, de même forêt et de y_mean différents ; modèle par défaut de y_mean nul
+@pytest.fixture
+def embarque(pipeline, tmp_path, monkeypatch):
+    for unite, y_mean in (('u1', 1000.0), ('u2', 2000.0)):
+        version = tmp_path / unite / 'v1'
+        version.mkdir(parents=True)
+        save_artifact(FastForest.from_pipeline(pipeline, y_mean), str(version / ARTIFACT_DIR), source_files=())
+    monkeypatch.setattr(listener, 'unit_models', ModelRegistry(listener.charger_modele_unite, root=str(tmp_path)))
+    monkeypatch.setattr(listener, 'UNIT_MODELS_ENABLED', True)
+    monkeypatch.setattr(listener, '_sans_modele', {})
+    monkeypatch.setattr(listener, 'forest', FastForest.from_pipeline(pipeline, 0.0))
+    monkeypatch.setattr(listener, 'model_version', 'defaut')
+    return listener.forest.predict_one(np.array(list(LECTURE.values())))
+
+
+def test_chaque_unite_notee_par_son_modele(embarque):
+    defaut, _ = listener.predire(LECTURE)
+    u1, ok = listener.predire(LECTURE, 'u1')
+    u2, _ = listener.predire(LECTURE, 'u2')
+    assert ok and defaut == {'Densité_Sortie': embarque, 'model_version': 'defaut'}
+    assert u1 == {'Densité_Sortie': pytest.approx(embarque + 1000.0), 'model_version': 'v1', 'unit': 'u1'}
+    assert u2['Densité_Sortie'] == pytest.approx(embarque + 2000.0)
+    # Unité sans modèle : notée par le modèle par défaut
+    assert listener.predire(LECTURE, 'inconnue') == (defaut, True)
+    assert 'inconnue' in listener._sans_modele
+
+
+def test_modele_par_defaut_sans_option(embarque, monkeypatch):
+    monkeypatch.setattr(listener, 'UNIT_MODELS_ENABLED', False)
+    assert listener.predire(LECTURE, 'u1') == ({'Densité_Sortie': embarque, 'model_version': 'defaut'}, True)
+
+
+def test_lot_regroupe_par_unite_dans_l_ordre(embarque):
+    row = np.array(list(LECTURE.values()))
+    resultats = listener.predire_lot([('u2', row), ('u1', row), ('u2', row), ('', row), ('inconnue', row)])
+    assert [r['Densité_Sortie'] - embarque for r in resultats] == pytest.approx([2000.0, 1000.0, 2000.0, 0.0, 0.0])
+    assert [r.get('unit') for r in resultats] == ['u2', 'u1', 'u2', None, None]
+
+
+class ReponseFactice:
+    def __init__(self, corps, status_code=200):
+        self.corps = corps
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+    def json(self):
+        return self.corps
+
+
+class ClientFactice:
+    requests = 1
+
+    def __init__(self):
+        self.urls = []
+
+    # Seule l'unité u1 a un modèle dans l'API ; url=None : route par défaut
+    def post(self, json=None, params=None, url=None):
+        url = url or listener.API_URL
+        self.urls.append(url)
+        if '/units/' in url and '/u1/' not in url:
+            return ReponseFactice({'error': 'Unité inconnue'}, 404)
+        if '/units/' in url:
+            return ReponseFactice({'Densité_Sortie': float(len(self.urls)), 'model_version': 'v1', 'unit': 'u1'})
+        return ReponseFactice({'Densité_Sortie': float(len(self.urls)), 'model_version': 'defaut'})
+
+
+def test_route_et_cache_de_l_unite_par_l_api(monkeypatch):
+    client = ClientFactice()
+    monkeypatch.setattr(listener, 'UNIT_MODELS_ENABLED', True)
+    monkeypatch.setattr(listener, '_sans_modele', {})
+    monkeypatch.setattr(listener, 'forest', None)
+    monkeypatch.setattr(listener, 'socket_client', None)
+    monkeypatch.setattr(listener, 'api_client', client)
+    monkeypatch.setattr(listener, 'cache', QuantizedCache(watch_files=()))
+    u1 = {'Densité_Sortie': 1.0, 'model_version': 'v1', 'unit': 'u1'}
+    assert listener.predire_lecture(LECTURE, 'u1') == (u1, True, False)
+    # u2 sans modèle : 404 puis route par défaut, qui note ensuite u2 directement (et partage son cache)
+    assert listener.predire_lecture(LECTURE, 'u2') == ({'Densité_Sortie': 3.0, 'model_version': 'defaut'}, True, False)
+    assert listener.predire_lecture(LECTURE, 'u1') == (u1, True, True)
+    assert listener.predire_lecture(LECTURE, 'u2')[2]
+    assert listener.predire_lecture(LECTURE)[2]
+    assert client.urls == ['http://127.0.0.1:5000/units/u1/predict', 'http://127.0.0.1:5000/units/u2/predict',
+                           'http://127.0.0.1:5000/predict']
+
+
+def test_partitions_transmettent_l_unite():
+    publications = []
+    bridge = PartitionedBridge(lambda topic, texte: publications.append((topic, json.loads(texte))),
+                               lambda data, unite: ({'unit': unite, 'x': data['x']}, True), partitions=2)
+    bridge.start()
+    for i in range(20):
+        bridge.submit(f'u{i % 3}', json.dumps({'x': i}), f't{i % 3}')
+    bridge.stop()
+    assert len(publications) == 20
+    for topic, resultat in publications:
+        assert topic == 't' + resultat['unit'][1:] and int(resultat['unit'][1:]) == resultat['x'] % 3
+    for unite in ('u0', 'u1', 'u2'):
+        seqs = [r['seq'] for _, r in publications if r['unit'] == unite]
+        assert seqs == sorted(seqs)
@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+
+import payload_codecs
+from feature_schema import FEATURE_NAMES, SchemaError
+from payload_codecs import JSON, MSGPACK, OCTET_STREAM, UnsupportedMediaType
+
+X = np.array([[30.0, 3550.0, 92.2, 59.0], [29.5, 3500.0, 92.0, 58.5]])
+
+
+def test_negociation():
+    assert payload_codecs.negotiate(None) == JSON
+    assert payload_codecs.negotiate('APPLICATION/JSON') == JSON
+    assert payload_codecs.negotiate('application/octet-stream') == OCTET_STREAM
+    with pytest.raises(UnsupportedMediaType):
+        payload_codecs.negotiate('text/csv')
+
+
+def test_aller_retour_binaire():
+    corps = np.ascontiguousarray(X, dtype='<f8').tobytes()
+    np.testing.assert_array_equal(payload_codecs.decode(OCTET_STREAM, corps), X)
+    octets, type_ = payload_codecs.encode_raw(np.array([1731.5, 1729.25]))
+    assert type_ == OCTET_STREAM
+    np.testing.assert_array_equal(np.frombuffer(octets, dtype='<f8'), [1731.5, 1729.25])
+
+
+@pytest.mark.parametrize('corps', [b'\x00' * 31, np.full((1, 4), np.nan).tobytes(), np.full((1, 4), -1.0).tobytes()])
+def test_binaire_invalide(corps):
+    with pytest.raises(SchemaError):
+        payload_codecs.decode(OCTET_STREAM, corps)
+
+
+@pytest.mark.parametrize('format_', [JSON, MSGPACK])
+def test_aller_retour_objet(format_):
+    if format_ == MSGPACK and payload_codecs.msgpack is None:
+        pytest.skip("msgpack non installé")
+    objet = {'Densité_Sortie': [1731.5, 1729.25], 'model_version': 'abc', 'lignes': [dict(zip(FEATURE_NAMES, X[0].tolist()))]}
+    octets, type_ = payload_codecs.encode(format_, objet)
+    assert type_ == format_
+    assert payload_codecs.decode(format_, octets) == objet
+
+
+def test_json_illisible():
+    with pytest.raises(SchemaError):
+        payload_codecs.decode(JSON, b'{pas du json')
+    assert json.loads(payload_codecs.encode(JSON, {'a': 1})[0]) == {'a': 1}
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from fast_forest import FastForest
+from feature_schema import FEATURES
+from prediction_cache import QuantizedCache, RegionCache
+
+LIGNE = np.array([30.0, 3550.0, 92.2, 59.0])
+
+
+def test_lecture_proche_servie_par_le_cache():
+    cache = QuantizedCache(max_size=2, ttl=60.0, watch_files=())
+    assert cache.lookup(LIGNE) == (False, None)
+    cache.store(LIGNE, {'Densité_Sortie': 1.0})
+    assert cache.lookup(LIGNE + 1e-6) == (True, {'Densité_Sortie': 1.0})
+    cache.store(LIGNE + 10, 2.0)
+    cache.store(LIGNE + 20, 3.0)
+    assert cache.evictions == 1
+
+
+def test_vidage_quand_les_fichiers_du_modele_changent(tmp_path):
+    surveille, autre = tmp_path / 'modele_final.pkl', tmp_path / 'autre.pkl'
+    surveille.write_bytes(b'v1')
+    autre.write_bytes(b'v1')
+    cache = QuantizedCache(watch_files=[str(surveille)], check_interval=0.0)
+    cache.store(LIGNE, 1.0)
+    autre.write_bytes(b'version 2')
+    assert cache.lookup(LIGNE) == (True, 1.0)
+    surveille.write_bytes(b'version 2')
+    os.utime(surveille, ns=(0, 1))
+    assert cache.lookup(LIGNE) == (False, None)
+    assert cache.invalidations == 1
+
+
+def test_unites_separees_dans_le_cache():
+    cache = QuantizedCache(watch_files=())
+    cache.store(LIGNE, 1.0, unit='u1')
+    assert cache.lookup(LIGNE, 'u1') == (True, 1.0)
+    assert cache.lookup(LIGNE, 'u2') == (False, None)
+    assert cache.lookup(LIGNE) == (False, None)
+
+
+# Lectures tirées dans les plages du schéma
+def lectures(n, graine):
+    rng = np.random.default_rng(graine)
+    return np.column_stack([rng.uniform(f.minimum, f.maximum, n) for f in FEATURES])
+
+
+@pytest.fixture(scope='module')
+def foret():
+    X = lectures(300, 0)
+    modele = Pipeline([('scaler', StandardScaler()), ('rf', RandomForestRegressor(n_estimators=8, max_depth=5, random_state=0))])
+    return FastForest.from_pipeline(modele.fit(X, X @ np.array([0.5, 0.01, -0.3, 0.05])), 1700.0)
+
+
+# Lignes placées exactement sur les bornes de la région de chaque ligne (x == hi reste dans la région, x == lo en sort)
+def lignes_aux_bornes(foret, X):
+    bornes = []
+    for x in X:
+        _, lo, hi = foret.predict_one_region(x)
+        for j in range(len(x)):
+            for valeur in (lo[j], hi[j]):
+                if np.isfinite(valeur):
+                    y = x.copy()
+                    y[j] = valeur
+                    bornes.append(y)
+    return np.array(bornes)
+
+
+def test_region_identique_a_la_foret(foret):
+    cache = RegionCache(foret, capacity=16)
+    X = lectures(20, 1)
+    # Lignes répétées et lignes sur les bornes des régions déjà en cache
+    lignes = np.vstack([X, X, lignes_aux_bornes(foret, X)])
+    for x in lignes:
+        assert cache.predict_one(x) == foret.predict_one(x)
+    assert cache.hits > 0
+    np.testing.assert_array_equal(cache.predict_many(lignes), foret.predict_many(lignes))
+
+
+def test_region_eviction_lru_et_vidage(foret):
+    a, b, c = lectures(3, 2)
+    cache = RegionCache(foret, capacity=2)
+    for x in (a, b, a, c):
+        cache.predict_one(x)
+    # b, le moins récemment utilisé, a laissé sa place à c
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    cache.predict_one(a)
+    cache.predict_one(b)
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 4, 2)
+    cache.clear()
+    assert cache.stats()['size'] == 0
+    assert cache.predict_one(b) == foret.predict_one(b)
+    assert cache.misses == 5
@@ -0,0 +1,54 @@
+import json
+import os
+
+import numpy as np
+
+from feature_schema import FEATURE_NAMES
+from request_journal import BINARY, JSONL, RequestJournal, read_binary
+
+LECTURE = dict(zip(FEATURE_NAMES, [30.0, 3550.0, 92.2, 59.0]))
+
+
+def enregistrer(journal, n, **champs):
+    for i in range(n):
+        journal.record(1000.0 + i, '/predict', 200, 0.001, 'v1', inputs=LECTURE, output=1731.0 + i, **champs)
+
+
+def test_rotation_par_taille(tmp_path):
+    chemin = tmp_path / 'journal.jsonl'
+    journal = RequestJournal(str(chemin), batch_size=1, flush_interval=0.01, rotate_bytes=300)
+    enregistrer(journal, 10)
+    journal.close()
+    fichiers = sorted(os.listdir(tmp_path))
+    assert journal.rotations >= 1 and len(fichiers) == journal.rotations + 1
+    assert all(nom == 'journal.jsonl' or nom.startswith('journal.jsonl.') for nom in fichiers)
+    lignes = [json.loads(ligne) for nom in fichiers for ligne in (tmp_path / nom).read_text(encoding='utf-8').splitlines()]
+    assert sorted(ligne['output'] for ligne in lignes) == [1731.0 + i for i in range(10)]
+    assert journal.written == 10 and journal.errors == 0
+
+
+def test_enregistrement_non_serialisable_ecarte_seul(tmp_path):
+    chemin = tmp_path / 'journal.jsonl'
+    journal = RequestJournal(str(chemin), batch_size=64, flush_interval=0.05)
+    enregistrer(journal, 2)
+    # Corps MessagePack brut (octets) : écrit sous forme de repr() ; clé non textuelle : écarté
+    journal.record(1.0, '/predict', 400, 0.001, inputs={'corps': b'\x81\xa1a'})
+    journal.record(2.0, '/predict', 400, 0.001, inputs={(1, 2): 'x'})
+    enregistrer(journal, 2)
+    journal.close()
+    lignes = [json.loads(ligne) for ligne in chemin.read_text(encoding='utf-8').splitlines()]
+    assert len(lignes) == 5
+    assert lignes[2]['inputs'] == {'corps': repr(b'\x81\xa1a')}
+    assert (journal.written, journal.unserializable, journal.errors) == (5, 1, 0)
+
+
+def test_format_binaire(tmp_path):
+    chemin = tmp_path / 'journal.bin'
+    journal = RequestJournal(str(chemin), format_=BINARY, flush_interval=0.01)
+    journal.record(5.0, '/predict/batch', 200, 0.002, 'v1', unit='u1', inputs=np.array([[30.0, 3550.0, 92.2, 59.0]] * 3),
+                   output=np.array([1.0, 2.0, 3.0]), batch=True)
+    journal.close()
+    enregistrements = read_binary(str(chemin))
+    assert len(enregistrements) == 3 and journal.written == 1
+    np.testing.assert_array_equal(enregistrements['output'], [1.0, 2.0, 3.0])
+    assert enregistrements['unit'][0] == b'u1' and journal.format != JSONL